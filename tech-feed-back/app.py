@@ -6,13 +6,19 @@ from flask_migrate import Migrate
 from config import config
 from database import db
 from kafka_producer import init_kafka_producer
+from view_buffer import init_view_buffer
+from counter_folder import init_counter_folder
 
 # Initialisation des extensions
 jwt = JWTManager()
 migrate = Migrate()
 
-def create_app(config_name=None):
-    """Factory pour créer l'application Flask"""
+def create_app(config_name=None, background_workers=None):
+    """
+    Factory pour créer l'application Flask
+    background_workers : démarre les threads d'écriture des vues et de report
+    des compteurs (None = BACKGROUND_WORKERS ; False pour les scripts)
+    """
     app = Flask(__name__)
     
     # Configuration
@@ -30,10 +36,27 @@ def create_app(config_name=None):
     # Initialisation du producteur Kafka
     init_kafka_producer(app)
     
+    # Threads de fond des processus qui servent des requêtes (web, recommandeur)
+    if background_workers is None:
+        background_workers = app.config.get('BACKGROUND_WORKERS', True)
+    if background_workers:
+        # Écriture différée des vues de contenus
+        init_view_buffer(app)
+        
+        # Report périodique des compteurs répartis (vues, likes)
+        init_counter_folder(app)
+    
     # Import des modèles (ils utilisent maintenant la même instance db)
     from models.user import User
     from models.content import Content
+    from models.tag import Tag
+    from models.content_counter import ContentCounter
     from models.interaction import Interaction
+    from models.interaction_event import InteractionEvent
+    from models.user_recommendation import UserRecommendation
+    from models.user_profile import UserProfile
+    from models.recommendation_snapshot import RecommendationSnapshot
+    from models.refresh_job import RefreshJob
     
     # Import et enregistrement des blueprints
     from routes.auth import auth_bp
@@ -74,6 +97,9 @@ def create_app(config_name=None):
     with app.app_context():
         db.create_all()
         
+        # Partitions mensuelles du journal des interactions (PostgreSQL)
+        InteractionEvent.ensure_partitions(months_ahead=app.config.get('INTERACTION_EVENTS_PRECREATE_MONTHS', 2))
+        
         # Création des données initiales si nécessaire
         create_initial_data()
     
@@ -0,0 +1,10 @@
+"""
+Benchmarks du moteur de recommandations TechFeed
+
+    python -m benchmarks generate --users 10000 --contents 5000 --interactions 1000000
+    python -m benchmarks run --output results.json
+    python -m benchmarks compare baseline.json results.json
+
+La base utilisée est BENCHMARK_DATABASE_URL (ou --database-url), SQLite
+benchmark.db par défaut ; elle est vidée par `generate`.
+"""
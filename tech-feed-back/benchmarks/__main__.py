@@ -0,0 +1,111 @@
+"""
+Interface en ligne de commande des benchmarks (python -m benchmarks)
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+
+def _create_app(database_url):
+    # L'URL doit être connue avant l'import de la configuration
+    if database_url:
+        os.environ['BENCHMARK_DATABASE_URL'] = database_url
+    from app import create_app
+    return create_app('benchmark')
+
+
+def generate(args):
+    from benchmarks.synthetic import generate_dataset
+
+    reference_date = datetime.fromisoformat(args.reference_date) if args.reference_date else None
+    app = _create_app(args.database_url)
+    with app.app_context():
+        generate_dataset(
+            users=args.users,
+            contents=args.contents,
+            interactions=args.interactions,
+            seed=args.seed,
+            reference_date=reference_date,
+            batch_size=args.batch_size
+        )
+    return 0
+
+
+def run(args):
+    from benchmarks.runner import run_benchmarks, save_report
+
+    app = _create_app(args.database_url)
+    with app.app_context():
+        report = run_benchmarks(
+            calls=args.calls,
+            sample=args.sample,
+            memory_calls=args.memory_calls,
+            limit=args.limit,
+            seed=args.seed,
+            cases=args.cases
+        )
+    save_report(report, args.output)
+    print(f"✅ Résultats écrits dans {args.output}")
+    return 0
+
+
+def compare(args):
+    from benchmarks.runner import compare_reports, load_report
+
+    lines, regressions = compare_reports(
+        load_report(args.baseline), load_report(args.current),
+        threshold=args.threshold, min_delta_ms=args.min_delta_ms
+    )
+    for line in lines:
+        print(line)
+    if regressions:
+        print(f"❌ Régressions: {', '.join(regressions)}")
+        return 1
+    print("✅ Aucune régression")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Benchmarks du moteur de recommandations")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help="Génère un jeu de données synthétique")
+    generate_parser.add_argument('--database-url', help="Base cible (défaut: BENCHMARK_DATABASE_URL)")
+    generate_parser.add_argument('--users', type=int, default=1000, help="Utilisateurs (1k à 1M)")
+    generate_parser.add_argument('--contents', type=int, default=1000, help="Contenus (100 à 100k)")
+    generate_parser.add_argument('--interactions', type=int, default=100000,
+                                 help="Interactions (jusqu'à 10M)")
+    generate_parser.add_argument('--seed', type=int, default=42)
+    generate_parser.add_argument('--reference-date', help="Date « actuelle » du jeu (ISO 8601)")
+    generate_parser.add_argument('--batch-size', type=int, default=10000, help="Lignes par insertion")
+    generate_parser.set_defaults(handler=generate)
+
+    run_parser = subparsers.add_parser('run', help="Mesure les méthodes du moteur")
+    run_parser.add_argument('--database-url', help="Base mesurée (défaut: BENCHMARK_DATABASE_URL)")
+    run_parser.add_argument('--output', default='benchmark_results.json')
+    run_parser.add_argument('--calls', type=int, default=200, help="Appels mesurés par cas")
+    run_parser.add_argument('--sample', type=int, default=200, help="Utilisateurs/contenus échantillonnés")
+    run_parser.add_argument('--memory-calls', type=int, default=5, help="Appels de la passe mémoire")
+    run_parser.add_argument('--limit', type=int, default=10)
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--cases', nargs='*', help="Cas à mesurer (tous par défaut)")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = subparsers.add_parser('compare', help="Compare deux résultats")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help="Hausse relative tolérée des latences")
+    compare_parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                                help="Hausse absolue ignorée (bruit)")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Mesure des méthodes publiques du RecommendationEngine
+Chaque cas est appelé sur un échantillon reproductible d'utilisateurs ou de
+contenus : latences (p50/p99), requêtes SQL par appel et pic mémoire
+(tracemalloc, mesuré dans une passe séparée pour ne pas fausser les temps)
+"""
+
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import sqlalchemy
+from sqlalchemy import event
+
+from database import db
+from models.content import Content
+from models.interaction import Interaction
+from models.user import User
+
+# Taille des lots passés à recommend_many
+BATCH_SIZE = 32
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+class QueryCounter:
+    """Compte les requêtes SQL exécutées sur le moteur de la base"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def build_cases(user_ids, content_ids, categories, limit):
+    """
+    Cas mesurés : {nom: (fonction(engine, i), nombre d'appels maximal)}
+    `i` est l'indice de l'appel, utilisé pour choisir l'entrée dans l'échantillon
+    """
+    from recommendations.cache import get_recommendation_cache
+
+    def personalized(engine, i):
+        # Le cache est vidé pour mesurer le calcul et non la lecture du cache
+        get_recommendation_cache().clear()
+        return engine.get_personalized_recommendations(user_ids[i % len(user_ids)], limit=limit)
+
+    def recommend_many(engine, i):
+        get_recommendation_cache().clear()
+        start = (i * BATCH_SIZE) % len(user_ids)
+        return engine.recommend_many(user_ids[start:start + BATCH_SIZE], limit=limit)
+
+    return {
+        'personalized': (personalized, None),
+        'recommend_many': (recommend_many, max(1, len(user_ids) // BATCH_SIZE)),
+        'similar': (lambda engine, i: engine.get_similar_content_recommendations(
+            content_ids[i % len(content_ids)], limit=5), None),
+        'related': (lambda engine, i: engine.get_related_content_recommendations(
+            content_ids[i % len(content_ids)], limit=5), None),
+        'trending': (lambda engine, i: engine.get_trending_recommendations(days=7, limit=limit), None),
+        'popular': (lambda engine, i: engine.get_popular_recommendations(limit=limit), None),
+        'popular_category': (lambda engine, i: engine.get_popular_recommendations(
+            limit=limit, category=categories[i % len(categories)]), None),
+        'category': (lambda engine, i: engine.get_category_recommendations(
+            categories[i % len(categories)], limit=limit, sort_by='engagement'), None),
+        'collaborative': (lambda engine, i: engine.get_collaborative_recommendations(
+            user_ids[i % len(user_ids)], limit=limit), None)
+    }
+
+
+def warm_up(user_ids, log=print):
+    """Construit les structures en mémoire et retourne leurs durées de construction (ms)"""
+    from models.user_profile import UserProfile
+    from recommendations.catalog import get_content_catalog
+    from recommendations.collaborative import get_like_matrix
+    from recommendations.covisitation import get_covisitation_index
+    from recommendations.tfidf import get_tfidf_index
+    from recommendations.trending import get_trending_counters
+
+    timings = {}
+    for name, build in (('catalog', get_content_catalog), ('like_matrix', get_like_matrix),
+                        ('covisitation', lambda: get_covisitation_index(wait=True)), ('tfidf', get_tfidf_index),
+                        ('trending', get_trending_counters),
+                        ('user_profiles', lambda: UserProfile.get_many(user_ids))):
+        started = time.perf_counter()
+        build()
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        db.session.remove()
+        log(f"🔥 {name}: {timings[name]} ms")
+    return timings
+
+
+def run_case(function, calls, memory_calls):
+    """Mesure un cas : latences et requêtes par appel, puis pic mémoire"""
+    from recommendations.engine import RecommendationEngine
+
+    durations = []
+    queries = []
+    with QueryCounter(db.engine) as counter:
+        for i in range(calls):
+            engine = RecommendationEngine()
+            before = counter.count
+            started = time.perf_counter()
+            function(engine, i)
+            durations.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.count - before)
+            db.session.remove()
+
+    peaks = []
+    for i in range(memory_calls):
+        engine = RecommendationEngine()
+        tracemalloc.start()
+        try:
+            function(engine, i)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+            db.session.remove()
+
+    return {
+        'calls': calls,
+        'p50_ms': round(percentile(durations, 50), 3),
+        'p99_ms': round(percentile(durations, 99), 3),
+        'mean_ms': round(float(np.mean(durations)), 3),
+        'max_ms': round(max(durations), 3),
+        'queries_mean': round(float(np.mean(queries)), 2),
+        'queries_max': int(max(queries)),
+        'peak_memory_kb': round(max(peaks) / 1024, 1) if peaks else None
+    }
+
+
+def git_commit():
+    """Commit courant du dépôt (None hors d'un dépôt git)"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(calls=200, sample=200, memory_calls=5, limit=10, seed=42, cases=None, log=print):
+    """
+    Exécute les cas sur la base courante (dans un contexte d'application)
+    Retourne le rapport JSON-sérialisable {metadata, warm_up_ms, results}
+    """
+    from recommendations.engine import RecommendationEngine
+
+    rng = random.Random(seed)
+    user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(
+        User.is_active == True).order_by(User.id)]
+    content_ids = [content_id for (content_id,) in db.session.query(Content.id).filter(
+        Content.is_published == True).order_by(Content.id)]
+    categories = sorted(category for (category,) in db.session.query(Content.category).distinct())
+    if not user_ids or not content_ids:
+        raise ValueError("Base vide : générez d'abord un jeu de données (python -m benchmarks generate)")
+
+    sampled_users = rng.sample(user_ids, min(sample, len(user_ids)))
+    sampled_contents = rng.sample(content_ids, min(sample, len(content_ids)))
+
+    metadata = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sqlalchemy': sqlalchemy.__version__,
+        'database': db.engine.dialect.name,
+        'dataset': {
+            'users': len(user_ids),
+            'contents': len(content_ids),
+            'interactions': db.session.query(db.func.count(Interaction.id)).scalar()
+        },
+        'calls': calls,
+        'sample': sample,
+        'limit': limit,
+        'seed': seed
+    }
+    db.session.remove()
+    log(f"📊 Jeu de données: {metadata['dataset']}")
+
+    warm_up_ms = warm_up(sampled_users, log=log)
+
+    results = {}
+    for name, (function, max_calls) in build_cases(
+            sampled_users, sampled_contents, categories, limit).items():
+        if cases and name not in cases:
+            continue
+        # Un appel non mesuré pour amorcer les caches partagés (tendances, TF-IDF...)
+        function(RecommendationEngine(), 0)
+        db.session.remove()
+        results[name] = run_case(function, min(calls, max_calls or calls), memory_calls)
+        log(f"⏱️  {name}: p50 {results[name]['p50_ms']} ms, p99 {results[name]['p99_ms']} ms, "
+            f"{results[name]['queries_mean']} requêtes")
+
+    return {'metadata': metadata, 'warm_up_ms': warm_up_ms, 'results': results}
+
+
+def compare_reports(baseline, current, threshold=0.2, min_delta_ms=0.5):
+    """
+    Compare deux rapports ; retourne (lignes, régressions)
+    Une régression est une hausse relative du p50 ou du p99 supérieure à
+    `threshold` (et d'au moins `min_delta_ms`), ou une hausse du nombre moyen
+    de requêtes
+    """
+    lines = []
+    regressions = []
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            lines.append(f"{name}: nouveau cas")
+            continue
+
+        problems = []
+        for metric in ('p50_ms', 'p99_ms'):
+            before, after = previous[metric], result[metric]
+            if after - before > min_delta_ms and after > before * (1 + threshold):
+                problems.append(f"{metric} {before} -> {after}")
+        if result['queries_mean'] > previous['queries_mean']:
+            problems.append(f"requêtes {previous['queries_mean']} -> {result['queries_mean']}")
+
+        ratio = result['p50_ms'] / previous['p50_ms'] if previous['p50_ms'] else float('inf')
+        lines.append(f"{name}: p50 {previous['p50_ms']} -> {result['p50_ms']} ms (x{ratio:.2f}), "
+                     f"p99 {previous['p99_ms']} -> {result['p99_ms']} ms"
+                     + (f"  ⚠️  {', '.join(problems)}" if problems else ""))
+        if problems:
+            regressions.append(name)
+    return lines, regressions
+
+
+def save_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
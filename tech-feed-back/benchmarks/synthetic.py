@@ -0,0 +1,190 @@
+"""
+Génération d'un jeu de données synthétique reproductible
+Popularité des contenus et activité des utilisateurs suivent des lois de
+puissance (Zipf) ; les utilisateurs consultent surtout leurs catégories
+préférées. Les lignes sont insérées par lots via SQLAlchemy Core (SQLite ou
+PostgreSQL selon BENCHMARK_DATABASE_URL)
+"""
+
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from werkzeug.security import generate_password_hash
+
+from database import db
+from models.content import Content
+from models.interaction import Interaction
+from models.interaction_event import InteractionEvent
+from models.tag import Tag
+from models.user import User
+
+CATEGORIES = ['IA', 'DevOps', 'Cyber', 'Mobile', 'Frontend', 'Backend', 'Data', 'Cloud']
+DIFFICULTIES = ['beginner', 'intermediate', 'advanced']
+
+# Répartition des types d'interaction
+INTERACTION_TYPES = ['view', 'like', 'favorite', 'bookmark', 'share', 'dislike']
+INTERACTION_PROBABILITIES = [0.70, 0.15, 0.05, 0.05, 0.03, 0.02]
+
+# Mot de passe commun des utilisateurs synthétiques (haché une seule fois)
+PASSWORD = 'benchmark'
+
+
+def zipf_weights(n, exponent, rng):
+    """Poids normalisés 1/rang^exposant attribués dans un ordre aléatoire"""
+    weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** exponent
+    weights = weights[rng.permutation(n)]
+    return weights / weights.sum()
+
+
+def _insert(table, rows, batch_size):
+    """Insère des lignes (dicts) par lots"""
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[start:start + batch_size])
+    db.session.commit()
+
+
+def generate_dataset(users=1000, contents=1000, interactions=100000, seed=42,
+                     tags=500, content_exponent=1.1, user_exponent=1.0, affinity=0.7,
+                     reference_date=None, batch_size=10000, log=print):
+    """
+    Remplace les données de la base par un jeu synthétique
+
+    users, contents, interactions: tailles cibles (les doublons
+    utilisateur/contenu/type sont retirés, le nombre final d'interactions
+    peut donc être légèrement inférieur)
+    affinity: probabilité qu'une interaction porte sur une catégorie préférée
+    reference_date: date « actuelle » du jeu (aujourd'hui à minuit par défaut)
+    Retourne un résumé du jeu généré
+    """
+    rng = np.random.default_rng(seed)
+    now = reference_date or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    started = time.perf_counter()
+
+    db.drop_all()
+    db.create_all()
+
+    # Contenus : catégorie, 2 à 5 tags (Zipf), ancienneté sur un an
+    tag_names = np.array([f'tag-{i}' for i in range(tags)])
+    tag_weights = zipf_weights(tags, 1.0, rng)
+    category_weights = zipf_weights(len(CATEGORIES), 0.5, rng)
+    content_categories = rng.choice(len(CATEGORIES), size=contents, p=category_weights)
+    content_ages = rng.uniform(0, 365 * 86400, size=contents)
+    content_tag_counts = rng.integers(2, 6, size=contents)
+    content_popularity = zipf_weights(contents, content_exponent, rng)
+
+    # Utilisateurs : 1 à 3 catégories préférées, activité Zipf
+    user_preference_counts = rng.integers(1, 4, size=users)
+    user_preferences = [
+        rng.choice(len(CATEGORIES), size=count, replace=False, p=category_weights)
+        for count in user_preference_counts
+    ]
+    user_activity = zipf_weights(users, user_exponent, rng)
+
+    # Interactions : utilisateur selon l'activité, contenu selon la popularité
+    # (globale, ou restreinte à une catégorie préférée avec `affinity`)
+    preference_matrix = np.array([np.resize(p, 3) for p in user_preferences], dtype=np.int64)
+    category_members = [np.flatnonzero(content_categories == c) for c in range(len(CATEGORIES))]
+
+    def draw(count):
+        user_index = rng.choice(users, size=count, p=user_activity)
+        content_index = rng.choice(contents, size=count, p=content_popularity)
+
+        preferred = np.flatnonzero(rng.random(count) < affinity)
+        chosen = rng.integers(0, 3, size=len(preferred)) % user_preference_counts[user_index[preferred]]
+        target_category = preference_matrix[user_index[preferred], chosen]
+        for category, members in enumerate(category_members):
+            mask = preferred[target_category == category]
+            if len(members) and len(mask):
+                weights = content_popularity[members] / content_popularity[members].sum()
+                content_index[mask] = rng.choice(members, size=len(mask), p=weights)
+
+        type_index = rng.choice(len(INTERACTION_TYPES), size=count, p=INTERACTION_PROBABILITIES)
+        return (user_index.astype(np.int64) * contents + content_index) * len(INTERACTION_TYPES) + type_index
+
+    # Tirages successifs jusqu'à `interactions` clés distinctes (contrainte
+    # unique utilisateur/contenu/type), bornés si l'espace est trop petit
+    keys = np.zeros(0, dtype=np.int64)
+    for _ in range(20):
+        missing = interactions - len(keys)
+        if missing <= 0:
+            break
+        keys = np.unique(np.concatenate([keys, draw(int(missing * 1.2) + 1)]))
+    keys = keys[rng.permutation(len(keys))[:interactions]]
+    type_index = keys % len(INTERACTION_TYPES)
+    content_index = (keys // len(INTERACTION_TYPES)) % contents
+    user_index = keys // (len(INTERACTION_TYPES) * contents)
+    # Interactions surtout récentes (âge exponentiel, moyenne 20 jours, borné à 90)
+    interaction_ages = np.minimum(rng.exponential(20 * 86400, size=len(keys)), 90 * 86400)
+
+    view_counts = np.bincount(content_index[type_index == 0], minlength=contents)
+    like_counts = np.bincount(content_index[type_index == 1], minlength=contents)
+
+    log(f"📊 Données tirées en {time.perf_counter() - started:.1f} s, insertion...")
+
+    password_hash = generate_password_hash(PASSWORD)
+    _insert(User.__table__, [{
+        'email': f'bench-{i}@example.com',
+        'name': f'Bench {i}',
+        'password_hash': password_hash,
+        'preferences': json.dumps([CATEGORIES[c] for c in user_preferences[i]]),
+        'is_admin': False,
+        'is_active': True,
+        'created_at': now,
+        'updated_at': now
+    } for i in range(users)], batch_size)
+
+    _insert(Content.__table__, [{
+        'title': f'Contenu {i} ({CATEGORIES[content_categories[i]]})',
+        'excerpt': ' '.join(rng.choice(tag_names, size=8, p=tag_weights).tolist()),
+        'content': '',
+        'author': f'Auteur {i % 97}',
+        'category': CATEGORIES[content_categories[i]],
+        'tags': json.dumps(sorted(set(
+            rng.choice(tag_names, size=content_tag_counts[i], p=tag_weights).tolist()))),
+        'difficulty_level': DIFFICULTIES[i % len(DIFFICULTIES)],
+        'is_featured': bool(i % 20 == 0),
+        'is_published': True,
+        'view_count': int(view_counts[i]),
+        'like_count': int(like_counts[i]),
+        'engagement_score': Content.compute_engagement_score(
+            int(view_counts[i]), int(like_counts[i]),
+            now - timedelta(seconds=float(content_ages[i])), now),
+        'created_at': now - timedelta(seconds=float(content_ages[i])),
+        'updated_at': now - timedelta(seconds=float(content_ages[i])),
+        'published_at': now - timedelta(seconds=float(content_ages[i]))
+    } for i in range(contents)], batch_size)
+
+    # Les ids sont attribués dans l'ordre d'insertion
+    user_ids = np.array([u for (u,) in db.session.query(User.id).order_by(User.id)], dtype=np.int64)
+    content_ids = np.array([c for (c,) in db.session.query(Content.id).order_by(Content.id)],
+                           dtype=np.int64)
+
+    for start in range(0, len(keys), batch_size):
+        end = min(start + batch_size, len(keys))
+        _insert(Interaction.__table__, [{
+            'user_id': int(user_ids[u]),
+            'content_id': int(content_ids[c]),
+            'interaction_type': INTERACTION_TYPES[t],
+            'created_at': now - timedelta(seconds=float(age)),
+            'updated_at': now - timedelta(seconds=float(age))
+        } for u, c, t, age in zip(user_index[start:end], content_index[start:end],
+                                  type_index[start:end], interaction_ages[start:end])], batch_size)
+
+    # Contenus insérés hors ORM : index des tags reconstruit depuis la colonne JSON
+    Tag.rebuild_index(batch_size=batch_size)
+
+    # Interactions insérées hors ORM : journal amorcé depuis la table
+    InteractionEvent.backfill(batch_size=batch_size)
+
+    summary = {
+        'users': users,
+        'contents': contents,
+        'interactions': int(len(keys)),
+        'seed': seed,
+        'reference_date': now.isoformat(),
+        'seconds': round(time.perf_counter() - started, 1)
+    }
+    log(f"✅ Jeu synthétique généré: {summary}")
+    return summary
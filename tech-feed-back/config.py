@@ -34,6 +34,113 @@ class Config:
     # Recommandations
     RECOMMENDATIONS_COUNT = 10
     
+    # Catalogue en mémoire des contenus (secondes)
+    CATALOG_REFRESH_INTERVAL = int(os.environ.get('CATALOG_REFRESH_INTERVAL', 5))
+    CATALOG_FULL_REBUILD_INTERVAL = int(os.environ.get('CATALOG_FULL_REBUILD_INTERVAL', 3600))
+    
+    # Index de co-visitation (voisins conservés par contenu, historique par utilisateur)
+    COVISITATION_MAX_NEIGHBOURS = 50
+    COVISITATION_HISTORY_SIZE = 200
+    # Construction en tâche de fond, bornée aux interactions récentes (jours, lignes)
+    COVISITATION_BACKGROUND_BUILD = True
+    COVISITATION_BUILD_DAYS = 30
+    COVISITATION_BUILD_MAX_ROWS = 200000
+    
+    # Relecture par chaque processus des interactions écrites par les autres
+    # (journal interaction_events) : intervalle (0 = à chaque accès) et marge de
+    # relecture (secondes)
+    INTERACTION_LOG_SYNC_INTERVAL = float(os.environ.get('INTERACTION_LOG_SYNC_INTERVAL', 5))
+    INTERACTION_LOG_SYNC_OVERLAP = 30
+    
+    # Compteurs de tendances en mémoire (fenêtre maximale, jours)
+    TRENDING_MAX_DAYS = 30
+    
+    # Cache des recommandations personnalisées (secondes, nombre d'entrées)
+    RECOMMENDATION_CACHE_TTL = int(os.environ.get('RECOMMENDATION_CACHE_TTL', 300))
+    RECOMMENDATION_CACHE_SIZE = 10000
+    # Vérification de la version de l'utilisateur (ligne users, écritures des autres
+    # workers) avant de servir une entrée ; inutile avec un seul processus
+    RECOMMENDATION_CACHE_SHARED_VERSIONS = True
+    
+    # Cohortes de démarrage à froid (rafraîchissement en secondes, 0 = désactivé)
+    COHORT_REFRESH_INTERVAL = int(os.environ.get('COHORT_REFRESH_INTERVAL', 60))
+    COHORT_CACHE_SIZE = 5000
+    
+    # Classement en deux étapes : candidats bornés par source, puis scoring
+    RECOMMENDATION_TWO_STAGE = os.environ.get('RECOMMENDATION_TWO_STAGE', 'true').lower() == 'true'
+    RETRIEVAL_CANDIDATES = {
+        'preferences': 300,
+        'collaborative': 100,
+        'trending': 100,
+        'fresh': 100,
+        'featured': 50
+    }
+    # Threads exécutant les générateurs en parallèle (0 = séquentiel)
+    RETRIEVAL_WORKERS = int(os.environ.get('RETRIEVAL_WORKERS', 4))
+    # Poids du score de contenu et des scores de source (normalisés dans [0, 1]) dans le score final
+    RECOMMENDATION_BLEND_WEIGHTS = {
+        'content': 1.0,
+        'collaborative': 1.0,
+        'trending': 0.5
+    }
+    
+    # Diversification MMR (1 = pertinence seule) et part maximale d'une catégorie
+    MMR_LAMBDA = float(os.environ.get('MMR_LAMBDA', 0.7))
+    MMR_MAX_CATEGORY_SHARE = 1 / 3
+    
+    # Pagination de /for-you : classement figé (contenus, durée de vie en secondes)
+    RECOMMENDATION_SNAPSHOT_SIZE = 200
+    RECOMMENDATION_SNAPSHOT_TTL = int(os.environ.get('RECOMMENDATION_SNAPSHOT_TTL', 600))
+    
+    # Budget de temps maximal des routes de recommandations (ms, 0 = sans limite)
+    RECOMMENDATION_BUDGET_MS = int(os.environ.get('RECOMMENDATION_BUDGET_MS', 250))
+    
+    # Rafraîchissement asynchrone (/refresh) : threads, anti-rebond et abandon d'un job (secondes)
+    REFRESH_WORKERS = 2
+    REFRESH_DEBOUNCE_SECONDS = int(os.environ.get('REFRESH_DEBOUNCE_SECONDS', 30))
+    REFRESH_JOB_TIMEOUT = 300
+    
+    # Recommandations précalculées (table user_recommendations)
+    PRECOMPUTED_RECOMMENDATIONS_COUNT = 50
+    PRECOMPUTED_RECOMMENDATIONS_MAX_AGE = int(os.environ.get('PRECOMPUTED_RECOMMENDATIONS_MAX_AGE', 86400))
+    
+    # Index TF-IDF des contenus (persisté dans instance/tfidf_index par défaut)
+    TFIDF_TOP_K = 20
+    TFIDF_MAX_FEATURES = 50000
+    TFIDF_PERSIST = True
+    TFIDF_INDEX_DIR = os.environ.get('TFIDF_INDEX_DIR')
+    
+    # Intervalle (secondes) de vérification des nouvelles versions d'artefacts de modèles
+    MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 5))
+    
+    # Processus recommandeur partagé (socket Unix, None = calcul dans chaque worker)
+    RECOMMENDER_SOCKET = os.environ.get('RECOMMENDER_SOCKET')
+    RECOMMENDER_POOL_SIZE = 8
+    RECOMMENDER_TIMEOUT = float(os.environ.get('RECOMMENDER_TIMEOUT', 1.0))
+    RECOMMENDER_RETRY_INTERVAL = 5.0
+    
+    # Threads de fond (écriture des vues, report des compteurs) démarrés par
+    # create_app ; les scripts et les benchmarks ne les démarrent pas
+    BACKGROUND_WORKERS = os.environ.get('BACKGROUND_WORKERS', 'true').lower() == 'true'
+    
+    # Écriture différée des vues (ms entre deux écritures, 0 = écriture dans la requête)
+    # et nombre maximal d'interactions de vue en attente
+    VIEW_FLUSH_INTERVAL_MS = int(os.environ.get('VIEW_FLUSH_INTERVAL_MS', 1000))
+    VIEW_BUFFER_MAX = 10000
+    
+    # Compteurs répartis des vues et likes : lignes par contenu et intervalle
+    # (secondes) de report dans la table des contenus (0 = fold_content_counters.py)
+    CONTENT_COUNTER_SHARDS = 8
+    COUNTER_FOLD_INTERVAL = int(os.environ.get('COUNTER_FOLD_INTERVAL', 10))
+    
+    # Nombre maximal d'interactions par POST /api/interaction/batch
+    INTERACTION_BATCH_MAX = 500
+    
+    # Journal des interactions (interaction_events) : partitions mensuelles créées
+    # d'avance et rétention (mois) appliquée par maintain_interaction_events.py
+    INTERACTION_EVENTS_PRECREATE_MONTHS = 2
+    INTERACTION_EVENTS_RETENTION_MONTHS = int(os.environ.get('INTERACTION_EVENTS_RETENTION_MONTHS', 13))
+    
     # Kafka Configuration
     KAFKA_BOOTSTRAP_SERVERS = os.environ.get('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092')
     KAFKA_ENABLED = os.environ.get('KAFKA_ENABLED', 'true').lower() == 'true'
@@ -53,10 +160,24 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
+    TFIDF_PERSIST = False
+    VIEW_FLUSH_INTERVAL_MS = 0
+    COUNTER_FOLD_INTERVAL = 0
+    COVISITATION_BACKGROUND_BUILD = False
+    INTERACTION_LOG_SYNC_INTERVAL = 0
+    RECOMMENDATION_BUDGET_MS = 0
+
+class BenchmarkConfig(ProductionConfig):
+    """Configuration pour les benchmarks du moteur (python -m benchmarks)"""
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCHMARK_DATABASE_URL', 'sqlite:///benchmark.db')
+    KAFKA_ENABLED = False
+    TFIDF_PERSIST = False
+    BACKGROUND_WORKERS = False
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'benchmark': BenchmarkConfig,
     'default': DevelopmentConfig
 } 
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+Report périodique des compteurs répartis dans la table des contenus
+Les vues et likes s'écrivent dans content_counters (plusieurs lignes par
+contenu) ; un thread par processus reporte toutes les
+COUNTER_FOLD_INTERVAL secondes leurs incréments dans `contents.view_count`
+et `like_count` (et les scores d'engagement), lus par les tris et le
+catalogue en mémoire. Avec plusieurs workers, les reports simultanés se
+partagent les lignes (FOR UPDATE SKIP LOCKED sous PostgreSQL).
+"""
+
+import logging
+import threading
+import time
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+
+class CounterFolder(threading.Thread):
+    """Thread de fond reportant les compteurs répartis toutes les `interval` secondes"""
+
+    def __init__(self, app, interval=10, batch_size=1000):
+        super().__init__(name='counter-folder', daemon=True)
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+
+    def run(self):
+        from models.content_counter import ContentCounter
+
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    try:
+                        ContentCounter.fold(batch_size=self.batch_size)
+                    except Exception:
+                        db.session.rollback()
+                        raise
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                logger.warning(f"Erreur report des compteurs: {e}")
+
+
+# Thread global (un par processus)
+counter_folder = None
+
+def init_counter_folder(app):
+    """Démarre le report périodique si COUNTER_FOLD_INTERVAL est non nul"""
+    global counter_folder
+    interval = app.config.get('COUNTER_FOLD_INTERVAL', 10)
+    if not interval or counter_folder is not None:
+        return
+    counter_folder = CounterFolder(app, interval)
+    counter_folder.start()
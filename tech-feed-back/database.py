@@ -1,4 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
  
 # Instance globale de SQLAlchemy
-db = SQLAlchemy() 
\ No newline at end of file
+db = SQLAlchemy()
+
+def dialect_insert(table):
+    """
+    INSERT du dialecte de la base courante, avec ON CONFLICT
+    (on_conflict_do_nothing / on_conflict_do_update) sous PostgreSQL et
+    SQLite ; None pour les autres bases
+    """
+    name = db.session.get_bind().dialect.name
+    if name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(table)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Script de report des compteurs répartis TechFeed
+Les vues et likes sont écrits dans content_counters et reportés
+périodiquement dans `contents` par un thread de chaque worker
+(COUNTER_FOLD_INTERVAL) ; ce script fait le même report à la demande, par
+exemple en cron quand le thread est désactivé ou avant une sauvegarde.
+"""
+
+import argparse
+import os
+import time
+
+from app import create_app
+from models.content_counter import ContentCounter
+
+def fold(config_name=None, batch_size=1000):
+    """Reporte les compteurs ; retourne le nombre de contenus mis à jour"""
+    app = create_app(config_name, background_workers=False)
+    with app.app_context():
+        return ContentCounter.fold(batch_size=batch_size)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report des compteurs répartis dans la table des contenus')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='nombre de lignes de compteurs par transaction')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'),
+                        help='configuration Flask (development, production, testing)')
+    args = parser.parse_args()
+
+    print("🚀 Report des compteurs TechFeed...")
+    started = time.perf_counter()
+    updated = fold(config_name=args.config, batch_size=args.batch_size)
+    print(f"🎉 {updated} contenus mis à jour en {time.perf_counter() - started:.1f} s")
@@ -49,7 +49,7 @@ def create_database():
 
 def init_tables_and_data():
     """Initialiser les tables et les données de base"""
-    app = create_app()
+    app = create_app(background_workers=False)
     
     with app.app_context():
         try:
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Script de maintenance du journal des interactions TechFeed
+À lancer quotidiennement (cron) : crée d'avance les partitions mensuelles de
+interaction_events et supprime celles sorties de la rétention (sous
+PostgreSQL ; ailleurs, suppression des évènements expirés). Avec
+--backfill, amorce un journal vide depuis la table interactions (première
+mise en place).
+"""
+
+import argparse
+import os
+import time
+
+from app import create_app
+from models.interaction_event import InteractionEvent
+
+def maintain(config_name=None, retention_months=None, months_ahead=None, backfill=False):
+    """Applique création des partitions, amorçage éventuel et rétention"""
+    app = create_app(config_name, background_workers=False)
+    retention_months = retention_months or app.config.get('INTERACTION_EVENTS_RETENTION_MONTHS', 13)
+    if months_ahead is None:
+        months_ahead = app.config.get('INTERACTION_EVENTS_PRECREATE_MONTHS', 2)
+
+    with app.app_context():
+        created = InteractionEvent.ensure_partitions(months_ahead=months_ahead)
+        print(f"📅 {len(created)} partitions créées")
+        if backfill:
+            since = InteractionEvent.retention_cutoff(retention_months)
+            print(f"📥 {InteractionEvent.backfill(since=since)} évènements amorcés depuis interactions")
+        removed = InteractionEvent.apply_retention(retention_months)
+        unit = 'partitions' if InteractionEvent.is_partitioned() else 'évènements'
+        print(f"🧹 {removed} {unit} expirés supprimés (rétention {retention_months} mois)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Maintenance du journal des interactions (partitions, rétention)')
+    parser.add_argument('--retention-months', type=int, default=None,
+                        help='mois conservés (INTERACTION_EVENTS_RETENTION_MONTHS par défaut)')
+    parser.add_argument('--months-ahead', type=int, default=None,
+                        help='partitions créées d\'avance (INTERACTION_EVENTS_PRECREATE_MONTHS par défaut)')
+    parser.add_argument('--backfill', action='store_true',
+                        help='amorcer un journal vide depuis la table interactions')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'),
+                        help='configuration Flask (development, production, testing)')
+    args = parser.parse_args()
+
+    print("🚀 Maintenance du journal des interactions TechFeed...")
+    started = time.perf_counter()
+    maintain(config_name=args.config, retention_months=args.retention_months,
+             months_ahead=args.months_ahead, backfill=args.backfill)
+    print(f"🎉 Maintenance terminée en {time.perf_counter() - started:.1f} s")
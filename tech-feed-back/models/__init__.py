@@ -1,5 +1,12 @@
 from .user import User
+from .tag import Tag
+from .content_counter import ContentCounter
 from .content import Content
 from .interaction import Interaction
+from .interaction_event import InteractionEvent
+from .user_recommendation import UserRecommendation
+from .user_profile import UserProfile
+from .recommendation_snapshot import RecommendationSnapshot
+from .refresh_job import RefreshJob
  
-__all__ = ['User', 'Content', 'Interaction'] 
\ No newline at end of file
+__all__ = ['User', 'Tag', 'Content', 'ContentCounter', 'Interaction', 'InteractionEvent', 'UserRecommendation', 'UserProfile', 'RecommendationSnapshot', 'RefreshJob'] 
\ No newline at end of file
@@ -1,6 +1,8 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 from database import db
+from .tag import Tag, content_tags
+from .content_counter import ContentCounter
 
 class Content(db.Model):
     """Modèle pour les contenus/articles"""
@@ -12,7 +14,7 @@ class Content(db.Model):
     content = db.Column(db.Text, nullable=True)
     author = db.Column(db.String(100), nullable=True)
     category = db.Column(db.String(50), nullable=False, index=True)
-    tags = db.Column(db.Text, nullable=True)  # JSON string des tags
+    tags = db.Column(db.Text, nullable=True)  # JSON string des tags (copie lue par to_dict, indexée dans content_tags)
     image_url = db.Column(db.String(500), nullable=True)
     external_url = db.Column(db.String(500), nullable=True)
     duration = db.Column(db.Integer, nullable=True)  # Durée de lecture en minutes
@@ -21,12 +23,23 @@ class Content(db.Model):
     is_featured = db.Column(db.Boolean, default=False)
     view_count = db.Column(db.Integer, default=0)
     like_count = db.Column(db.Integer, default=0)
+    engagement_score = db.Column(db.Float, nullable=False, default=0.0)  # Tenu à jour par les compteurs et refresh_engagement_scores.py
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     published_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relations
     interactions = db.relationship('Interaction', backref='content', lazy='dynamic', cascade='all, delete-orphan')
+    tag_objects = db.relationship('Tag', secondary=content_tags, lazy='select')
+    
+    # Index pour les tris par engagement (ORDER BY engagement_score DESC LIMIT)
+    __table_args__ = (
+        db.Index('idx_published_engagement', 'is_published', 'engagement_score', 'id'),
+        db.Index('idx_category_engagement', 'category', 'is_published', 'engagement_score', 'id'),
+    )
+    
+    # Âge (jours) au-delà duquel la pondération temporelle ne décroît plus
+    ENGAGEMENT_DECAY_DAYS = 365
     
     def __init__(self, title, category, excerpt=None, content=None, author=None, 
                  tags=None, image_url=None, external_url=None, duration=None, 
@@ -44,31 +57,130 @@ class Content(db.Model):
         self.is_featured = is_featured
     
     def set_tags(self, tags):
-        """Stocke les tags en JSON"""
-        self.tags = json.dumps(tags) if isinstance(tags, list) else tags
+        """Stocke les tags en JSON et dans l'index content_tags"""
+        if not isinstance(tags, list):
+            tags = Content._parse_tags(tags)
+        tags = Tag.normalize(tags)
+        self.tags = json.dumps(tags)
+        self._tags_cache = (self.tags, tags)
+        self.tag_objects = Tag.get_or_create_many(tags)
     
     def get_tags(self):
-        """Récupère les tags depuis JSON"""
+        """Récupère les tags (JSON analysé une seule fois par valeur de la colonne)"""
+        cached = self.__dict__.get('_tags_cache')
+        if cached is None or cached[0] is not self.tags:
+            cached = (self.tags, Content._parse_tags(self.tags))
+            self._tags_cache = cached
+        return list(cached[1])
+    
+    @staticmethod
+    def _parse_tags(raw_tags):
         try:
-            return json.loads(self.tags) if self.tags else []
+            tags = json.loads(raw_tags) if raw_tags else []
         except (json.JSONDecodeError, TypeError):
             return []
+        return tags if isinstance(tags, list) else []
     
     def increment_view_count(self):
-        """Incrémente le compteur de vues"""
-        self.view_count += 1
+        """Incrémente le compteur de vues (shard de content_counters)"""
+        ContentCounter.increment(self.id, 'view')
         db.session.commit()
+        self.__dict__.pop('_pending_counts', None)
     
     def increment_like_count(self):
-        """Incrémente le compteur de likes"""
-        self.like_count += 1
+        """Incrémente le compteur de likes (shard de content_counters)"""
+        ContentCounter.increment(self.id, 'like')
         db.session.commit()
+        self.__dict__.pop('_pending_counts', None)
     
     def decrement_like_count(self):
-        """Décrémente le compteur de likes"""
-        if self.like_count > 0:
-            self.like_count -= 1
+        """Décrémente le compteur de likes (shard de content_counters)"""
+        if self.get_like_count() > 0:
+            ContentCounter.increment(self.id, 'like', -1)
             db.session.commit()
+            self.__dict__.pop('_pending_counts', None)
+    
+    def get_view_count(self):
+        """Nombre de vues, incréments non reportés compris"""
+        return (self.view_count or 0) + self._get_pending_counts()['view']
+    
+    def get_like_count(self):
+        """Nombre de likes, incréments non reportés compris"""
+        return (self.like_count or 0) + self._get_pending_counts()['like']
+    
+    def _get_pending_counts(self):
+        pending = self.__dict__.get('_pending_counts')
+        if pending is None:
+            Content.load_pending_counts([self])
+            pending = self._pending_counts
+        return pending
+    
+    @staticmethod
+    def load_pending_counts(contents):
+        """
+        Charge en une requête les incréments non reportés de plusieurs contenus,
+        vues encore dans le tampon de ce processus comprises
+        """
+        from view_buffer import pending_views
+        
+        content_ids = [content.id for content in contents]
+        pending = ContentCounter.get_pending(content_ids)
+        buffered = pending_views(content_ids)
+        for content_id, views in buffered.items():
+            pending[content_id]['view'] += views
+        for content in contents:
+            content._pending_counts = pending[content.id]
+        return contents
+    
+    @staticmethod
+    def add_counts(deltas, now=None):
+        """
+        Reporte des incréments {content_id: (vues, likes)} en une seule requête
+        Sous PostgreSQL : UPDATE … FROM (VALUES …) ; ailleurs, un UPDATE
+        incrémental exécuté en lot. Les scores d'engagement des contenus
+        touchés sont recalculés puis écrits en lot (sans commit). Retourne
+        l'ensemble des ids existants mis à jour
+        """
+        if not deltas:
+            return set()
+        now = now or datetime.utcnow()
+        content_ids = sorted(deltas)
+        
+        if db.session.get_bind().dialect.name == 'postgresql':
+            increments = db.values(
+                db.column('id', db.Integer), db.column('views', db.Integer), db.column('likes', db.Integer),
+                name='increments'
+            ).data([(content_id, *deltas[content_id]) for content_id in content_ids])
+            rows = db.session.execute(
+                db.update(Content)
+                .where(Content.id == increments.c.id)
+                .values(view_count=Content.view_count + increments.c.views,
+                        like_count=Content.like_count + increments.c.likes,
+                        updated_at=now)
+                .returning(Content.id, Content.view_count, Content.like_count, Content.created_at)
+            ).all()
+        else:
+            db.session.execute(
+                db.update(Content.__table__)
+                .where(Content.id == db.bindparam('content_id'))
+                .values(view_count=Content.view_count + db.bindparam('views'),
+                        like_count=Content.like_count + db.bindparam('likes'),
+                        updated_at=now),
+                [{'content_id': content_id, 'views': deltas[content_id][0], 'likes': deltas[content_id][1]}
+                 for content_id in content_ids]
+            )
+            rows = db.session.query(
+                Content.id, Content.view_count, Content.like_count, Content.created_at
+            ).filter(Content.id.in_(content_ids)).all()
+        
+        changes = [
+            {'id': content_id,
+             'engagement_score': Content.compute_engagement_score(view_count, like_count, created_at, now)}
+            for content_id, view_count, like_count, created_at in rows
+        ]
+        if changes:
+            db.session.execute(db.update(Content), changes)
+        return {change['id'] for change in changes}
     
     def get_interactions_count(self, interaction_type=None):
         """Compte les interactions sur ce contenu"""
@@ -77,10 +189,15 @@ class Content(db.Model):
             query = query.filter_by(interaction_type=interaction_type)
         return query.count()
     
-    def get_engagement_score(self):
+    def get_engagement_score(self, now=None):
         """Calcule un score d'engagement basé sur les interactions"""
-        views = self.view_count or 0
-        likes = self.like_count or 0
+        return Content.compute_engagement_score(self.view_count, self.like_count, self.created_at, now)
+    
+    @staticmethod
+    def compute_engagement_score(view_count, like_count, created_at, now=None):
+        """Score d'engagement à partir des compteurs et de la date de création"""
+        views = view_count or 0
+        likes = like_count or 0
         
         if views == 0:
             return 0.0
@@ -89,11 +206,45 @@ class Content(db.Model):
         like_ratio = likes / views if views > 0 else 0
         
         # Pondération temporelle : contenu plus récent = bonus
-        days_old = (datetime.utcnow() - self.created_at).days
-        time_factor = max(0.1, 1 - (days_old / 365))  # Décroit sur 1 an
+        days_old = ((now or datetime.utcnow()) - (created_at or datetime.utcnow())).days
+        time_factor = max(0.1, 1 - (days_old / Content.ENGAGEMENT_DECAY_DAYS))  # Décroit sur 1 an
         
         return (like_ratio * 100 + views * 0.1) * time_factor
     
+    def refresh_engagement_score(self, now=None):
+        """Met à jour le score d'engagement stocké (sans commit)"""
+        self.engagement_score = self.get_engagement_score(now)
+    
+    @staticmethod
+    def refresh_engagement_scores(now=None, batch_size=1000, full=False):
+        """
+        Recalcule les scores stockés dont la pondération temporelle a changé
+        Sauf avec `full`, seuls les contenus de moins d'un an sont relus (au-delà,
+        le score ne dépend plus que des compteurs, mis à jour à chaque écriture) ;
+        les scores modifiés sont écrits par lots. Retourne le nombre de
+        contenus mis à jour
+        """
+        now = now or datetime.utcnow()
+        query = db.session.query(
+            Content.id, Content.view_count, Content.like_count, Content.created_at,
+            Content.engagement_score
+        )
+        if not full:
+            cutoff_date = now - timedelta(days=Content.ENGAGEMENT_DECAY_DAYS + 1)
+            query = query.filter(Content.view_count > 0, Content.created_at >= cutoff_date)
+        rows = query.order_by(Content.id).all()
+        
+        changes = []
+        for content_id, view_count, like_count, created_at, stored_score in rows:
+            score = Content.compute_engagement_score(view_count, like_count, created_at, now)
+            if stored_score is None or abs(score - stored_score) > 1e-9:
+                changes.append({'id': content_id, 'engagement_score': score})
+        
+        for start in range(0, len(changes), batch_size):
+            db.session.execute(db.update(Content), changes[start:start + batch_size])
+        db.session.commit()
+        return len(changes)
+    
     def is_relevant_for_user(self, user_preferences):
         """Vérifie si le contenu est pertinent pour les préférences utilisateur"""
         if not user_preferences:
@@ -117,6 +268,8 @@ class Content(db.Model):
     
     def to_dict(self, include_content=False):
         """Convertit le contenu en dictionnaire"""
+        # Incréments non reportés des compteurs, s'ils ont été chargés (load_pending_counts)
+        pending = self.__dict__.get('_pending_counts', {'view': 0, 'like': 0})
         data = {
             'id': self.id,
             'title': self.title,
@@ -129,11 +282,11 @@ class Content(db.Model):
             'duration': self.duration,
             'difficulty_level': self.difficulty_level,
             'is_featured': self.is_featured,
-            'view_count': self.view_count,
-            'like_count': self.like_count,
+            'view_count': (self.view_count or 0) + pending['view'],
+            'like_count': (self.like_count or 0) + pending['like'],
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'published_at': self.published_at.isoformat() if self.published_at else None,
-            'engagement_score': self.get_engagement_score()
+            'engagement_score': self.engagement_score
         }
         
         # Inclure le contenu complet si demandé
@@ -142,6 +295,23 @@ class Content(db.Model):
             
         return data
     
+    @staticmethod
+    def filter_by_tags(query, tags, match_all=False):
+        """Restreint une requête aux contenus portant un des tags (tous avec `match_all`)"""
+        return query.filter(Content.id.in_(Tag.content_ids_subquery(tags, match_all=match_all)))
+    
+    @staticmethod
+    def get_by_tags(tags, match_all=False, limit=None):
+        """Récupère les contenus publiés par tags (index content_tags)"""
+        query = Content.filter_by_tags(
+            Content.query.filter_by(is_published=True), tags, match_all=match_all
+        ).order_by(Content.created_at.desc())
+        
+        if limit:
+            query = query.limit(limit)
+        
+        return query.all()
+    
     @staticmethod
     def get_by_category(category, limit=None):
         """Récupère les contenus par catégorie"""
@@ -160,6 +330,14 @@ class Content(db.Model):
         """Récupère les contenus populaires"""
         return Content.query.filter_by(is_published=True).order_by(Content.view_count.desc()).limit(limit).all()
     
+    @staticmethod
+    def get_most_engaging(limit=10, category=None):
+        """Récupère les contenus au meilleur score d'engagement (parcours d'index)"""
+        query = Content.query.filter_by(is_published=True)
+        if category:
+            query = query.filter_by(category=category)
+        return query.order_by(Content.engagement_score.desc(), Content.id.desc()).limit(limit).all()
+    
     @staticmethod
     def get_recent(limit=10):
         """Récupère les contenus récents"""
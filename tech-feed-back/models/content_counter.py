@@ -0,0 +1,144 @@
+from datetime import datetime
+import random
+from database import db, dialect_insert
+
+class ContentCounter(db.Model):
+    """
+    Compteurs de vues et de likes répartis sur plusieurs lignes par contenu
+    
+    Chaque écriture ajoute son incrément à une ligne (shard) tirée au hasard
+    par un `count = count + n` atomique : les likes d'un contenu populaire ne
+    se sérialisent plus sur le verrou de sa ligne dans `contents`. Les lignes
+    portent les incréments pas encore reportés ; `fold` les ajoute
+    périodiquement à `contents.view_count` / `like_count` et les retranche
+    des shards. Un total exact est la somme de la colonne et des shards.
+    """
+    __tablename__ = 'content_counters'
+    
+    content_id = db.Column(db.Integer, db.ForeignKey('contents.id', ondelete='CASCADE'), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)  # 'view', 'like'
+    shard = db.Column(db.SmallInteger, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)  # Incrément non reporté dans contents
+    
+    KINDS = ('view', 'like')
+    
+    # Nombre de shards par contenu et par compteur (CONTENT_COUNTER_SHARDS)
+    DEFAULT_SHARDS = 8
+    
+    @staticmethod
+    def _shard_count():
+        from flask import current_app
+        return max(1, current_app.config.get('CONTENT_COUNTER_SHARDS', ContentCounter.DEFAULT_SHARDS))
+    
+    @staticmethod
+    def increment(content_id, kind, delta=1):
+        """Ajoute `delta` au compteur d'un contenu (sans commit)"""
+        ContentCounter.add_many(kind, {content_id: delta})
+    
+    @staticmethod
+    def add_many(kind, deltas):
+        """
+        Ajoute des incréments {content_id: n} en une requête, chacun sur un
+        shard tiré au hasard (INSERT … ON CONFLICT DO UPDATE, sans commit)
+        """
+        if kind not in ContentCounter.KINDS:
+            raise ValueError(f"Compteur invalide: {kind}")
+        shards = ContentCounter._shard_count()
+        # Ordre fixe des lignes : pas d'interblocage entre écritures groupées
+        rows = [
+            {'content_id': content_id, 'kind': kind, 'shard': random.randrange(shards), 'count': delta}
+            for content_id, delta in sorted(deltas.items()) if delta
+        ]
+        if not rows:
+            return
+        
+        table = ContentCounter.__table__
+        statement = dialect_insert(table)
+        if statement is not None:
+            db.session.execute(statement.values(rows).on_conflict_do_update(
+                index_elements=['content_id', 'kind', 'shard'],
+                set_={'count': table.c.count + statement.excluded['count']}
+            ))
+            return
+        
+        # Autres bases : UPDATE atomique, INSERT si le shard n'existe pas encore
+        for row in rows:
+            updated = db.session.execute(
+                db.update(table).where(
+                    table.c.content_id == row['content_id'],
+                    table.c.kind == kind,
+                    table.c.shard == row['shard']
+                ).values(count=table.c.count + row['count'])
+            ).rowcount
+            if not updated:
+                db.session.execute(db.insert(table).values(**row))
+    
+    @staticmethod
+    def get_pending(content_ids):
+        """Incréments non reportés {content_id: {'view': n, 'like': n}} (une requête)"""
+        pending = {content_id: dict.fromkeys(ContentCounter.KINDS, 0) for content_id in content_ids}
+        if not pending:
+            return pending
+        rows = db.session.query(
+            ContentCounter.content_id, ContentCounter.kind, db.func.sum(ContentCounter.count)
+        ).filter(
+            ContentCounter.content_id.in_(pending.keys())
+        ).group_by(ContentCounter.content_id, ContentCounter.kind).all()
+        for content_id, kind, total in rows:
+            pending[content_id][kind] = int(total or 0)
+        return pending
+    
+    @staticmethod
+    def fold(batch_size=1000, now=None):
+        """
+        Reporte les incréments des shards dans `contents` par lots
+        Les lignes lues sont verrouillées (FOR UPDATE SKIP LOCKED sous
+        PostgreSQL) puis décrémentées de la valeur reportée : les écritures
+        concurrentes ne sont pas perdues et deux reports simultanés se
+        partagent les lignes. Retourne le nombre de contenus mis à jour
+        """
+        from .content import Content
+        
+        now = now or datetime.utcnow()
+        key = db.tuple_(ContentCounter.content_id, ContentCounter.kind, ContentCounter.shard)
+        last_key = None
+        updated = 0
+        while True:
+            query = ContentCounter.query.filter(ContentCounter.count != 0)
+            if last_key is not None:
+                query = query.filter(key > last_key)
+            counters = query.order_by(
+                ContentCounter.content_id, ContentCounter.kind, ContentCounter.shard
+            ).limit(batch_size).with_for_update(skip_locked=True).all()
+            if not counters:
+                break
+            last_key = (counters[-1].content_id, counters[-1].kind, counters[-1].shard)
+            
+            deltas = {}
+            for counter in counters:
+                views, likes = deltas.get(counter.content_id, (0, 0))
+                if counter.kind == 'view':
+                    views += counter.count
+                else:
+                    likes += counter.count
+                deltas[counter.content_id] = (views, likes)
+            updated += len(Content.add_counts(deltas, now))
+            
+            db.session.execute(
+                db.update(ContentCounter.__table__)
+                .where(
+                    ContentCounter.content_id == db.bindparam('b_content_id'),
+                    ContentCounter.kind == db.bindparam('b_kind'),
+                    ContentCounter.shard == db.bindparam('b_shard')
+                )
+                .values(count=ContentCounter.count - db.bindparam('folded')),
+                [{'b_content_id': counter.content_id, 'b_kind': counter.kind,
+                  'b_shard': counter.shard, 'folded': counter.count} for counter in counters]
+            )
+            db.session.commit()
+            if len(counters) < batch_size:
+                break
+        return updated
+    
+    def __repr__(self):
+        return f'<ContentCounter {self.content_id} {self.kind}#{self.shard}={self.count}>'
@@ -1,5 +1,7 @@
 from datetime import datetime
-from database import db
+from database import db, dialect_insert
+from .interaction_event import InteractionEvent
+from recommendations.events import notify_interaction
 
 class Interaction(db.Model):
     """Modèle pour les interactions utilisateur-contenu"""
@@ -17,6 +19,8 @@ class Interaction(db.Model):
     # Index composé pour éviter les doublons et optimiser les requêtes
     __table_args__ = (
         db.Index('idx_user_content_type', 'user_id', 'content_id', 'interaction_type'),
+        # Lecture incrémentale des premières vues (tendances)
+        db.Index('idx_interaction_type_created', 'interaction_type', 'created_at'),
         db.UniqueConstraint('user_id', 'content_id', 'interaction_type', name='unique_user_content_interaction'),
     )
     
@@ -63,32 +67,176 @@ class Interaction(db.Model):
     
     @staticmethod
     def create_or_update(user_id, content_id, interaction_type, rating=None, duration=None):
-        """Crée ou met à jour une interaction"""
-        existing = Interaction.query.filter_by(
-            user_id=user_id,
-            content_id=content_id,
-            interaction_type=interaction_type
-        ).first()
+        """Crée ou met à jour une interaction (une seule requête d'upsert)"""
+        interaction, _ = Interaction.upsert(user_id, content_id, interaction_type, rating, duration)
+        return interaction
+    
+    @staticmethod
+    def upsert(user_id, content_id, interaction_type, rating=None, duration=None):
+        """
+        Crée ou met à jour une interaction et notifie sa création
+        Retourne (interaction, created)
+        """
+        items = [{'content_id': content_id, 'interaction_type': interaction_type,
+                  'rating': rating, 'duration': duration}]
+        interaction, created = Interaction.upsert_many(user_id, items)[(content_id, interaction_type)]
+        db.session.commit()
+        if created:
+            notify_interaction(user_id, content_id, interaction_type, added=True)
+        return interaction, created
+    
+    @staticmethod
+    def validate(interaction_type, rating=None):
+        """Vérifie le type et la note d'une interaction ; ValueError sinon"""
+        if interaction_type not in Interaction.VALID_TYPES:
+            raise ValueError(f"Type d'interaction invalide. Types valides: {', '.join(Interaction.VALID_TYPES)}")
+        if rating is not None and (rating < 1 or rating > 5):
+            raise ValueError("La note doit être entre 1 et 5")
+    
+    @staticmethod
+    def upsert_many(user_id, items, now=None):
+        """
+        Crée ou met à jour les interactions d'un utilisateur en une requête
+        INSERT … ON CONFLICT (user_id, content_id, interaction_type) DO UPDATE
+        sous PostgreSQL et SQLite : une note ou une durée fournie remplace la
+        valeur stockée, sinon la ligne existante est gardée telle quelle.
+        Les items [{content_id, interaction_type, rating, duration}] portant
+        sur la même interaction sont fusionnés (dernière valeur fournie).
+        Chaque item est aussi ajouté au journal interaction_events. Sans
+        commit ni notification ; retourne
+        {(content_id, interaction_type): (interaction, created)}
+        """
+        now = now or datetime.utcnow()
+        rows = {}
+        for item in items:
+            Interaction.validate(item['interaction_type'], item.get('rating'))
+            key = (item['content_id'], item['interaction_type'])
+            row = rows.setdefault(key, {
+                'user_id': user_id, 'content_id': key[0], 'interaction_type': key[1],
+                'rating': None, 'duration': None, 'created_at': now, 'updated_at': now
+            })
+            for field in ('rating', 'duration'):
+                if item.get(field) is not None:
+                    row[field] = item[field]
+        if not rows:
+            return {}
+        
+        # Journal : un évènement par item, doublons compris
+        InteractionEvent.append_many([
+            InteractionEvent.event(user_id, item['content_id'], item['interaction_type'],
+                                   rating=item.get('rating'), duration=item.get('duration'), at=now)
+            for item in items
+        ])
         
-        if existing:
-            # Mettre à jour l'interaction existante
-            if rating is not None:
-                existing.update_rating(rating)
-            if duration is not None:
-                existing.update_duration(duration)
-            return existing
-        else:
-            # Créer une nouvelle interaction
-            interaction = Interaction(
-                user_id=user_id,
-                content_id=content_id,
-                interaction_type=interaction_type,
-                rating=rating,
-                duration=duration
+        statement = dialect_insert(Interaction)
+        if statement is None:
+            return Interaction._upsert_many_fallback(rows, now)
+        
+        statement = statement.values(sorted(rows.values(), key=lambda row: (row['content_id'], row['interaction_type'])))
+        excluded = statement.excluded
+        statement = statement.on_conflict_do_update(
+            index_elements=['user_id', 'content_id', 'interaction_type'],
+            set_={
+                'rating': db.func.coalesce(excluded.rating, Interaction.rating),
+                'duration': db.func.coalesce(excluded.duration, Interaction.duration),
+                'updated_at': db.case(
+                    (db.and_(excluded.rating.is_(None), excluded.duration.is_(None)), Interaction.updated_at),
+                    else_=excluded.updated_at
+                )
+            }
+        )
+        
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # xmax est nul pour une ligne insérée par la requête, renseigné pour une ligne mise à jour
+            statement = statement.returning(Interaction, db.literal_column('xmax = 0').label('inserted'))
+            results = db.session.execute(statement, execution_options={'populate_existing': True}).all()
+            return {
+                (interaction.content_id, interaction.interaction_type): (interaction, bool(inserted))
+                for interaction, inserted in results
+            }
+        
+        # SQLite : la transaction détient déjà le verrou d'écriture (journal écrit ci-dessus),
+        # les clés lues avant l'upsert restent exactes
+        existing = Interaction.existing_keys(user_id, rows)
+        interactions = db.session.execute(
+            statement.returning(Interaction), execution_options={'populate_existing': True}
+        ).scalars().all()
+        return {
+            (interaction.content_id, interaction.interaction_type):
+                (interaction, (interaction.content_id, interaction.interaction_type) not in existing)
+            for interaction in interactions
+        }
+    
+    @staticmethod
+    def existing_keys(user_id, keys):
+        """Sous-ensemble des clés (content_id, interaction_type) déjà enregistrées pour l'utilisateur"""
+        keys = set(keys)
+        found = db.session.execute(
+            db.select(Interaction.content_id, Interaction.interaction_type).where(
+                Interaction.user_id == user_id,
+                Interaction.content_id.in_(sorted({content_id for content_id, _ in keys}))
             )
-            db.session.add(interaction)
-            db.session.commit()
-            return interaction
+        ).all()
+        return {tuple(key) for key in found} & keys
+    
+    @staticmethod
+    def _upsert_many_fallback(rows, now):
+        """upsert_many pour les bases sans ON CONFLICT : lecture puis écriture"""
+        results = {}
+        for key, row in rows.items():
+            existing = Interaction.query.filter_by(
+                user_id=row['user_id'], content_id=key[0], interaction_type=key[1]
+            ).first()
+            if existing:
+                if row['rating'] is not None or row['duration'] is not None:
+                    if row['rating'] is not None:
+                        existing.rating = row['rating']
+                    if row['duration'] is not None:
+                        existing.duration = row['duration']
+                    existing.updated_at = now
+                results[key] = (existing, False)
+            else:
+                interaction = Interaction(row['user_id'], key[0], key[1], row['rating'], row['duration'])
+                interaction.created_at = interaction.updated_at = now
+                db.session.add(interaction)
+                results[key] = (interaction, True)
+        db.session.flush()
+        return results
+    
+    @staticmethod
+    def insert_views(pairs, now=None):
+        """
+        Enregistre en une requête les vues [(user_id, content_id)] absentes
+        (INSERT … ON CONFLICT DO NOTHING, sans commit)
+        Retourne les couples réellement insérés, à notifier après le commit
+        """
+        pairs = sorted(set(pairs))
+        if not pairs:
+            return []
+        now = now or datetime.utcnow()
+        rows = [
+            {'user_id': user_id, 'content_id': content_id, 'interaction_type': 'view',
+             'created_at': now, 'updated_at': now}
+            for user_id, content_id in pairs
+        ]
+        
+        statement = dialect_insert(Interaction)
+        if statement is not None:
+            statement = statement.values(rows).on_conflict_do_nothing(
+                index_elements=['user_id', 'content_id', 'interaction_type']
+            ).returning(Interaction.user_id, Interaction.content_id)
+            return [tuple(row) for row in db.session.execute(statement)]
+        
+        # Autres bases : insertion des seuls couples absents
+        existing = set(db.session.query(Interaction.user_id, Interaction.content_id).filter(
+            Interaction.interaction_type == 'view',
+            Interaction.content_id.in_({content_id for _, content_id in pairs}),
+            Interaction.user_id.in_({user_id for user_id, _ in pairs})
+        ).all())
+        rows = [row for row in rows if (row['user_id'], row['content_id']) not in existing]
+        if rows:
+            db.session.execute(db.insert(Interaction), rows)
+        return [(row['user_id'], row['content_id']) for row in rows]
     
     @staticmethod
     def get_user_interactions(user_id, interaction_type=None, limit=None):
@@ -135,87 +283,43 @@ class Interaction(db.Model):
         interaction = Interaction.get_user_content_interaction(user_id, content_id, interaction_type)
         if interaction:
             db.session.delete(interaction)
+            InteractionEvent.append(user_id, content_id, interaction_type, added=False)
             db.session.commit()
+            notify_interaction(user_id, content_id, interaction_type, added=False)
             return True
         return False
     
     @staticmethod
     def get_user_preferences_from_interactions(user_id, limit_days=30):
-        """Analyse les interactions pour déterminer les préférences utilisateur"""
-        from datetime import timedelta
-        from .content import Content
-        
-        # Récupérer les interactions récentes
-        cutoff_date = datetime.utcnow() - timedelta(days=limit_days)
-        interactions = Interaction.query.filter(
-            Interaction.user_id == user_id,
-            Interaction.created_at >= cutoff_date,
-            Interaction.interaction_type.in_(['like', 'view', 'favorite'])
-        ).all()
+        """
+        Analyse les interactions pour déterminer les préférences utilisateur
+        Lit le profil de goûts maintenu à chaque interaction : les poids
+        décroissent avec l'âge (demi-vie `UserProfile.HALF_LIFE_DAYS`) au lieu
+        d'une fenêtre fixe de `limit_days` jours
+        """
+        from .user_profile import UserProfile
         
-        # Compter les catégories et tags
-        category_scores = {}
-        tag_scores = {}
-        
-        for interaction in interactions:
-            content = Content.query.get(interaction.content_id)
-            if not content:
-                continue
-            
-            # Score basé sur le type d'interaction
-            score_weight = {
-                'like': 3,
-                'favorite': 3,
-                'view': 1
-            }.get(interaction.interaction_type, 1)
-            
-            # Score pour la catégorie
-            if content.category:
-                category_scores[content.category] = category_scores.get(content.category, 0) + score_weight
-            
-            # Score pour les tags
-            for tag in content.get_tags():
-                tag_scores[tag] = tag_scores.get(tag, 0) + score_weight
-        
-        # Retourner les préférences triées par score
-        sorted_categories = sorted(category_scores.items(), key=lambda x: x[1], reverse=True)
-        sorted_tags = sorted(tag_scores.items(), key=lambda x: x[1], reverse=True)
+        profile = UserProfile.get_for_user(user_id)
         
         return {
-            'categories': [cat for cat, score in sorted_categories[:5]],  # Top 5
-            'tags': [tag for tag, score in sorted_tags[:10]],  # Top 10
-            'category_scores': category_scores,
-            'tag_scores': tag_scores
+            'categories': profile.top_categories(5),  # Top 5
+            'tags': profile.top_tags(10),  # Top 10
+            'category_scores': profile.get_category_weights(),
+            'tag_scores': profile.get_tag_weights()
         }
     
     @staticmethod
     def get_trending_content(limit=10, days=7):
-        """Récupère le contenu trending basé sur les interactions récentes"""
-        from datetime import timedelta
+        """
+        Récupère le contenu trending basé sur les interactions récentes
+        Lu dans les compteurs en fenêtre glissante (sans requête sur les interactions)
+        """
         from .content import Content
+        from recommendations.trending import get_trending_counters
         
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Compter les interactions par contenu
-        content_scores = {}
-        interactions = Interaction.query.filter(
-            Interaction.created_at >= cutoff_date,
-            Interaction.interaction_type.in_(['like', 'view', 'favorite', 'share'])
-        ).all()
-        
-        for interaction in interactions:
-            score_weight = {
-                'like': 3,
-                'favorite': 3,
-                'share': 4,
-                'view': 1
-            }.get(interaction.interaction_type, 1)
-            
-            content_scores[interaction.content_id] = content_scores.get(interaction.content_id, 0) + score_weight
-        
-        # Récupérer les contenus les mieux notés
-        sorted_content_ids = sorted(content_scores.items(), key=lambda x: x[1], reverse=True)[:limit]
-        content_ids = [content_id for content_id, score in sorted_content_ids]
+        content_ids = [content_id for content_id, score in get_trending_counters().top(days=days, limit=limit)]
+        if not content_ids:
+            return []
         
         contents = Content.query.filter(Content.id.in_(content_ids)).all()
         
@@ -0,0 +1,224 @@
+from datetime import datetime
+import logging
+import re
+import threading
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Journal des interactions, en ajout seul : chaque vue, like, note ou retrait
+# est une ligne (la table interactions n'en garde que le dernier état).
+# Sous PostgreSQL, partitionné par mois sur created_at : les lectures par
+# période n'ouvrent que les partitions concernées et la rétention supprime
+# des partitions entières.
+interaction_events = db.Table(
+    'interaction_events',
+    db.Column('user_id', db.Integer, nullable=False),
+    db.Column('content_id', db.Integer, nullable=False),
+    db.Column('interaction_type', db.String(20), nullable=False),
+    db.Column('added', db.Boolean, nullable=False, default=True),  # False : retrait (unlike, suppression)
+    db.Column('rating', db.Integer, nullable=True),
+    db.Column('duration', db.Integer, nullable=True),
+    db.Column('created_at', db.DateTime, nullable=False, default=datetime.utcnow),
+    db.Index('idx_interaction_events_created', 'created_at'),
+    db.Index('idx_interaction_events_user', 'user_id', 'created_at'),
+    db.Index('idx_interaction_events_content', 'content_id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+)
+
+class InteractionEvent:
+    """Écriture, partitions et rétention du journal interaction_events"""
+    
+    PARTITION_NAME = re.compile(r'^interaction_events_p(\d{4})(\d{2})$')
+    
+    # Mois dont la partition existe déjà (évite de la vérifier à chaque écriture)
+    _known_months = set()
+    _partition_lock = threading.Lock()
+    
+    @staticmethod
+    def is_partitioned():
+        return db.session.get_bind().dialect.name == 'postgresql'
+    
+    @staticmethod
+    def event(user_id, content_id, interaction_type, added=True, rating=None, duration=None, at=None):
+        """Ligne du journal prête à être écrite par append_many"""
+        return {
+            'user_id': int(user_id), 'content_id': int(content_id), 'interaction_type': interaction_type,
+            'added': added, 'rating': rating, 'duration': duration,
+            'created_at': at or datetime.utcnow()
+        }
+    
+    @staticmethod
+    def append(user_id, content_id, interaction_type, added=True, rating=None, duration=None, at=None):
+        """Ajoute un évènement au journal (dans la transaction en cours, sans commit)"""
+        InteractionEvent.append_many([
+            InteractionEvent.event(user_id, content_id, interaction_type, added, rating, duration, at)
+        ])
+    
+    @staticmethod
+    def append_many(events):
+        """
+        Ajoute des évènements au journal en une requête (sans commit) et
+        incrémente la version d'interaction des utilisateurs concernés
+        (invalidation des caches de recommandations de tous les processus)
+        """
+        from .user import User
+        
+        if not events:
+            return
+        if InteractionEvent.is_partitioned():
+            months = {_month(event['created_at']) for event in events}
+            missing = months - InteractionEvent._known_months
+            if missing:
+                InteractionEvent.ensure_partitions(start=min(missing), end=max(missing))
+        db.session.execute(interaction_events.insert(), events)
+        # Ordre fixe des lignes : pas d'interblocage entre écritures groupées
+        db.session.execute(
+            db.update(User.__table__)
+            .where(User.id.in_(sorted({event['user_id'] for event in events})))
+            .values(interaction_version=User.interaction_version + 1, updated_at=User.updated_at)
+        )
+    
+    @staticmethod
+    def ensure_partitions(start=None, end=None, months_ahead=0):
+        """
+        Crée les partitions mensuelles manquantes de `start` à `end` (mois
+        courant par défaut) plus `months_ahead` mois, dans une transaction
+        séparée. Sans effet hors PostgreSQL. Retourne les partitions créées
+        """
+        if not InteractionEvent.is_partitioned():
+            return []
+        current = _month(datetime.utcnow())
+        start = _month(start) if start else current
+        end = _add_months(_month(end) if end else max(start, current), months_ahead)
+        
+        created = []
+        with InteractionEvent._partition_lock, db.engine.begin() as connection:
+            # Un seul processus crée les partitions à la fois
+            connection.execute(db.text("SELECT pg_advisory_xact_lock(hashtext('interaction_events'))"))
+            existing = set(_partitions(connection))
+            month = start
+            while month <= end:
+                name = _partition_name(month)
+                if name not in existing:
+                    connection.execute(db.text(
+                        f"CREATE TABLE {name} PARTITION OF interaction_events "
+                        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')"
+                    ))
+                    created.append(name)
+                month = _add_months(month, 1)
+        
+        month = start
+        while month <= end:
+            InteractionEvent._known_months.add(month)
+            month = _add_months(month, 1)
+        if created:
+            logger.info(f"Partitions du journal des interactions créées: {', '.join(created)}")
+        return created
+    
+    @staticmethod
+    def retention_cutoff(months, now=None):
+        """Début du plus ancien mois conservé avec une rétention de `months` mois"""
+        return _add_months(_month(now or datetime.utcnow()), -months)
+    
+    @staticmethod
+    def apply_retention(months, now=None):
+        """
+        Supprime les évènements de plus de `months` mois (mois entiers)
+        Sous PostgreSQL, les partitions entièrement expirées sont supprimées
+        (DROP TABLE, sans parcours) ; ailleurs, DELETE par date. Retourne le
+        nombre de partitions supprimées, ou de lignes hors PostgreSQL
+        """
+        cutoff = InteractionEvent.retention_cutoff(months, now)
+        
+        if not InteractionEvent.is_partitioned():
+            deleted = db.session.execute(
+                interaction_events.delete().where(interaction_events.c.created_at < cutoff)
+            ).rowcount
+            db.session.commit()
+            return deleted
+        
+        dropped = []
+        with InteractionEvent._partition_lock, db.engine.begin() as connection:
+            connection.execute(db.text("SELECT pg_advisory_xact_lock(hashtext('interaction_events'))"))
+            for name in _partitions(connection):
+                match = InteractionEvent.PARTITION_NAME.match(name)
+                if match is None:
+                    continue
+                month = datetime(int(match.group(1)), int(match.group(2)), 1)
+                if _add_months(month, 1) <= cutoff:
+                    connection.execute(db.text(f"DROP TABLE {name}"))
+                    InteractionEvent._known_months.discard(month)
+                    dropped.append(name)
+        if dropped:
+            logger.info(f"Partitions expirées du journal des interactions supprimées: {', '.join(dropped)}")
+        return len(dropped)
+    
+    @staticmethod
+    def first_event_at():
+        """Date du plus ancien évènement du journal (None si le journal est vide)"""
+        return db.session.execute(db.select(db.func.min(interaction_events.c.created_at))).scalar()
+    
+    @staticmethod
+    def backfill(since=None, batch_size=10000):
+        """
+        Amorce un journal vide depuis la table interactions (un évènement par
+        interaction, à sa date de création, à partir de `since`)
+        Sans effet si le journal contient déjà des évènements. Retourne le
+        nombre d'évènements écrits
+        """
+        from .interaction import Interaction
+        
+        if db.session.execute(db.select(interaction_events.c.user_id).limit(1)).first() is not None:
+            return 0
+        
+        query = db.session.query(
+            Interaction.user_id, Interaction.content_id, Interaction.interaction_type,
+            Interaction.rating, Interaction.duration, Interaction.created_at
+        ).filter(Interaction.created_at.isnot(None))
+        if since is not None:
+            query = query.filter(Interaction.created_at >= since)
+        
+        if InteractionEvent.is_partitioned():
+            bounds = query.with_entities(db.func.min(Interaction.created_at), db.func.max(Interaction.created_at)).one()
+            if bounds[0] is None:
+                return 0
+            InteractionEvent.ensure_partitions(start=bounds[0], end=bounds[1])
+        
+        written = 0
+        last_id = 0
+        while True:
+            rows = query.add_columns(Interaction.id).filter(
+                Interaction.id > last_id
+            ).order_by(Interaction.id).limit(batch_size).all()
+            if not rows:
+                break
+            db.session.execute(interaction_events.insert(), [
+                InteractionEvent.event(user_id, content_id, interaction_type,
+                                       rating=rating, duration=duration, at=created_at)
+                for user_id, content_id, interaction_type, rating, duration, created_at, _ in rows
+            ])
+            written += len(rows)
+            last_id = rows[-1][-1]
+        db.session.commit()
+        return written
+
+def _month(at):
+    """Premier jour du mois de `at`"""
+    return datetime(at.year, at.month, 1)
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def _partitions(connection):
+    """Noms des partitions existantes du journal"""
+    return [name for (name,) in connection.execute(db.text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'interaction_events'"
+    ))]
+
+def _partition_name(month):
+    return f'interaction_events_p{month:%Y%m}'
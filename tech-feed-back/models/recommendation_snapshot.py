@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+import base64
+import json
+import uuid
+from database import db
+
+class RecommendationSnapshot(db.Model):
+    """
+    Classement figé des recommandations d'un utilisateur, parcouru par curseur
+    
+    La première page de /for-you n'enregistre que ses propres contenus ; la
+    deuxième complète le classement (`extend`) et les pages suivantes en lisent
+    des tranches sans recalcul jusqu'à expiration.
+    """
+    __tablename__ = 'recommendation_snapshots'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    content_ids = db.Column(db.Text, nullable=False)  # JSON string des ids classés
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    def __init__(self, user_id, content_ids, ttl):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.content_ids = json.dumps([int(content_id) for content_id in content_ids])
+        self.created_at = datetime.utcnow()
+        self.expires_at = self.created_at + timedelta(seconds=ttl)
+    
+    def get_content_ids(self):
+        """Récupère les ids classés depuis JSON"""
+        try:
+            return json.loads(self.content_ids) if self.content_ids else []
+        except (json.JSONDecodeError, TypeError):
+            return []
+    
+    def extend(self, content_ids):
+        """Ajoute à la suite du classement les contenus qui n'y sont pas encore"""
+        ranked_ids = self.get_content_ids()
+        known = set(ranked_ids)
+        ranked_ids.extend(int(content_id) for content_id in content_ids if content_id not in known)
+        self.content_ids = json.dumps(ranked_ids)
+        db.session.commit()
+        return ranked_ids
+    
+    def is_expired(self):
+        return self.expires_at < datetime.utcnow()
+    
+    def cursor(self, offset):
+        """Curseur opaque désignant la position `offset` dans ce classement"""
+        payload = json.dumps({'s': self.id, 'o': offset}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """Retourne (snapshot_id, offset) ; ValueError si le curseur est invalide"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            snapshot_id, offset = str(payload['s']), int(payload['o'])
+        except (ValueError, TypeError, KeyError, UnicodeError) as e:
+            raise ValueError('Curseur invalide') from e
+        if offset < 0:
+            raise ValueError('Curseur invalide')
+        return snapshot_id, offset
+    
+    @staticmethod
+    def create(user_id, content_ids, ttl):
+        """Enregistre un classement (et purge les classements expirés de l'utilisateur)"""
+        RecommendationSnapshot.query.filter(
+            RecommendationSnapshot.user_id == user_id,
+            RecommendationSnapshot.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        snapshot = RecommendationSnapshot(user_id, content_ids, ttl)
+        db.session.add(snapshot)
+        db.session.commit()
+        return snapshot
+    
+    @staticmethod
+    def purge_expired():
+        """Supprime tous les classements expirés ; retourne le nombre supprimé"""
+        deleted = RecommendationSnapshot.query.filter(
+            RecommendationSnapshot.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+    
+    def __repr__(self):
+        return f'<RecommendationSnapshot {self.id} user={self.user_id}>'
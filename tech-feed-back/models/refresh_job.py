@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+import json
+import uuid
+from database import db
+
+class RefreshJob(db.Model):
+    """Recalcul asynchrone des préférences et recommandations d'un utilisateur (/refresh)"""
+    __tablename__ = 'refresh_jobs'
+    
+    STATUSES = ['queued', 'running', 'done', 'failed']
+    PENDING_STATUSES = ('queued', 'running')
+    
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    status = db.Column(db.String(20), default='queued', nullable=False)
+    result = db.Column(db.Text, nullable=True)  # JSON string du résultat
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('idx_refresh_job_user_created', 'user_id', 'created_at'),
+        # Un seul job en attente ou en cours par utilisateur, tous processus confondus
+        db.Index('uq_refresh_job_user_pending', 'user_id', unique=True,
+                 postgresql_where=db.text("status IN ('queued', 'running')"),
+                 sqlite_where=db.text("status IN ('queued', 'running')")),
+    )
+    
+    def __init__(self, user_id):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.status = 'queued'
+        self.created_at = datetime.utcnow()
+    
+    def set_result(self, result):
+        """Stocke le résultat en JSON"""
+        self.result = json.dumps(result)
+    
+    def get_result(self):
+        """Récupère le résultat depuis JSON"""
+        try:
+            return json.loads(self.result) if self.result else None
+        except (json.JSONDecodeError, TypeError):
+            return None
+    
+    def is_pending(self):
+        return self.status in self.PENDING_STATUSES
+    
+    @staticmethod
+    def expire_stale(user_id, timeout_seconds=300):
+        """
+        Marque en échec les jobs en attente ou en cours depuis plus de
+        `timeout_seconds` (processus arrêté) ; retourne le nombre de jobs
+        """
+        expired = RefreshJob.query.filter(
+            RefreshJob.user_id == user_id,
+            RefreshJob.status.in_(RefreshJob.PENDING_STATUSES),
+            RefreshJob.created_at < datetime.utcnow() - timedelta(seconds=timeout_seconds)
+        ).update({'status': 'failed', 'error': 'Délai dépassé', 'finished_at': datetime.utcnow()},
+                 synchronize_session=False)
+        db.session.commit()
+        return expired
+    
+    @staticmethod
+    def find_reusable(user_id, debounce_seconds, timeout_seconds=300):
+        """
+        Job auquel rattacher une nouvelle demande : en attente ou en cours
+        (depuis moins de `timeout_seconds`, au-delà le processus qui
+        l'exécutait est supposé arrêté), ou terminé avec succès depuis moins
+        de `debounce_seconds` secondes
+        """
+        job = RefreshJob.query.filter_by(user_id=user_id).order_by(RefreshJob.created_at.desc()).first()
+        if job is None:
+            return None
+        now = datetime.utcnow()
+        if job.is_pending() and job.created_at >= now - timedelta(seconds=timeout_seconds):
+            return job
+        if job.status == 'done' and job.created_at >= now - timedelta(seconds=debounce_seconds):
+            return job
+        return None
+    
+    def to_dict(self):
+        """Convertit le job en dictionnaire"""
+        return {
+            'job_id': self.id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<RefreshJob {self.id} user={self.user_id} {self.status}>'
@@ -0,0 +1,106 @@
+import json
+from database import db
+
+# Index inversé tag -> contenus (clé primaire (tag_id, content_id) : recherche par tag)
+content_tags = db.Table(
+    'content_tags',
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('content_id', db.Integer, db.ForeignKey('contents.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('idx_content_tags_content', 'content_id')
+)
+
+class Tag(db.Model):
+    """Dictionnaire des tags : un identifiant par nom de tag"""
+    __tablename__ = 'tags'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False, index=True)
+    
+    def __init__(self, name):
+        self.name = name
+    
+    @staticmethod
+    def normalize(tags):
+        """Liste de tags nettoyée (sans vides ni doublons, ordre conservé)"""
+        normalized = []
+        for tag in tags or []:
+            tag = str(tag).strip()
+            if tag and tag not in normalized:
+                normalized.append(tag)
+        return normalized
+    
+    @staticmethod
+    def get_or_create_many(names):
+        """Retourne les tags de `names` (dans l'ordre), en créant les absents"""
+        if not names:
+            return []
+        existing = {tag.name: tag for tag in Tag.query.filter(Tag.name.in_(names))}
+        for name in names:
+            if name not in existing:
+                existing[name] = Tag(name)
+                db.session.add(existing[name])
+        return [existing[name] for name in names]
+    
+    @staticmethod
+    def content_ids_subquery(names, match_all=False):
+        """
+        Sous-requête des ids de contenus portant un des tags (ou tous avec
+        `match_all`), résolue sur l'index content_tags
+        """
+        names = Tag.normalize(names)
+        query = db.select(content_tags.c.content_id).join(
+            Tag, Tag.id == content_tags.c.tag_id
+        ).where(Tag.name.in_(names))
+        if match_all:
+            query = query.group_by(content_tags.c.content_id).having(
+                db.func.count(content_tags.c.tag_id) == len(names)
+            )
+        return query
+    
+    @staticmethod
+    def get_counts(limit=50):
+        """Tags les plus utilisés par les contenus publiés [(nom, nombre de contenus)]"""
+        from .content import Content
+        
+        count = db.func.count(content_tags.c.content_id)
+        return db.session.query(Tag.name, count).join(
+            content_tags, content_tags.c.tag_id == Tag.id
+        ).join(
+            Content, Content.id == content_tags.c.content_id
+        ).filter(Content.is_published == True).group_by(Tag.name).order_by(
+            count.desc(), Tag.name
+        ).limit(limit).all()
+    
+    @staticmethod
+    def rebuild_index(batch_size=5000):
+        """
+        Reconstruit le dictionnaire et l'index content_tags depuis la colonne
+        JSON `contents.tags` (contenus insérés hors ORM, reprise de l'existant)
+        Retourne le nombre d'associations écrites
+        """
+        from .content import Content
+        
+        rows = []
+        for content_id, raw_tags in db.session.query(Content.id, Content.tags).yield_per(batch_size):
+            try:
+                tags = json.loads(raw_tags) if raw_tags else []
+            except (json.JSONDecodeError, TypeError):
+                tags = []
+            rows.extend((content_id, tag) for tag in Tag.normalize(tags if isinstance(tags, list) else []))
+        
+        names = sorted({tag for content_id, tag in rows})
+        known = {name for (name,) in db.session.query(Tag.name)}
+        missing = [{'name': name} for name in names if name not in known]
+        for start in range(0, len(missing), batch_size):
+            db.session.execute(Tag.__table__.insert(), missing[start:start + batch_size])
+        tag_ids = dict(db.session.query(Tag.name, Tag.id))
+        
+        db.session.execute(content_tags.delete())
+        links = [{'tag_id': tag_ids[tag], 'content_id': content_id} for content_id, tag in rows]
+        for start in range(0, len(links), batch_size):
+            db.session.execute(content_tags.insert(), links[start:start + batch_size])
+        db.session.commit()
+        return len(links)
+    
+    def __repr__(self):
+        return f'<Tag {self.name}>'
@@ -18,6 +18,8 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_login = db.Column(db.DateTime, nullable=True)
+    # Incrémenté à chaque écriture d'interaction (journal interaction_events), tous processus confondus
+    interaction_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relations
     interactions = db.relationship('Interaction', backref='user', lazy='dynamic', cascade='all, delete-orphan')
@@ -0,0 +1,272 @@
+from datetime import datetime
+import json
+import logging
+import math
+from database import db
+from recommendations.events import on_interaction
+
+logger = logging.getLogger(__name__)
+
+class UserProfile(db.Model):
+    """
+    Profil de goûts d'un utilisateur, maintenu à chaque écriture d'interaction
+    
+    Les poids par catégorie, tag et niveau de difficulté décroissent
+    exponentiellement avec l'âge des interactions (demi-vie `HALF_LIFE_DAYS`).
+    Ils sont stockés relativement à `reference_at` : un poids stocké `s` vaut
+    `s * exp(-λ (t - reference_at))` à l'instant t, ce qui permet d'ajouter
+    une interaction en O(1) sans réappliquer la décroissance à tout le profil.
+    """
+    __tablename__ = 'user_profiles'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    category_weights = db.Column(db.Text, nullable=False, default='{}')  # JSON {catégorie: poids}
+    tag_weights = db.Column(db.Text, nullable=False, default='{}')  # JSON {tag: poids}
+    difficulty_weights = db.Column(db.Text, nullable=False, default='{}')  # JSON {niveau: poids} (likes)
+    reference_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    interaction_count = db.Column(db.Integer, nullable=False, default=0)  # Nombre d'interactions stockées
+    last_interaction_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Poids des interactions positives dans le profil
+    INTERACTION_WEIGHTS = {
+        'like': 3.0,
+        'favorite': 3.0,
+        'bookmark': 2.5,
+        'view': 1.0
+    }
+    
+    # Demi-vie des poids (jours)
+    HALF_LIFE_DAYS = 14
+    
+    # Nombre maximal de tags conservés (les plus faibles sont élagués)
+    MAX_TAGS = 100
+    
+    # Exposant au-delà duquel les poids sont ramenés à une nouvelle référence
+    MAX_EXPONENT = 30.0
+    
+    DECAY_RATE = math.log(2) / (HALF_LIFE_DAYS * 86400)
+    
+    def __init__(self, user_id, reference_at=None):
+        self.user_id = user_id
+        self.reset(reference_at)
+    
+    def reset(self, reference_at=None):
+        """Vide le profil"""
+        self.category_weights = '{}'
+        self.tag_weights = '{}'
+        self.difficulty_weights = '{}'
+        self.reference_at = reference_at or datetime.utcnow()
+        self.interaction_count = 0
+        self.last_interaction_at = None
+    
+    def _load(self, column):
+        try:
+            return json.loads(getattr(self, column) or '{}')
+        except (json.JSONDecodeError, TypeError):
+            return {}
+    
+    def _decay_factor(self, at):
+        """Facteur de décroissance entre `reference_at` et `at`"""
+        return math.exp(-self.DECAY_RATE * (at - self.reference_at).total_seconds())
+    
+    def _decayed(self, column, at=None):
+        factor = self._decay_factor(at or datetime.utcnow())
+        return {key: weight * factor for key, weight in self._load(column).items()}
+    
+    def get_category_weights(self, at=None):
+        """Poids décroissants des catégories à l'instant `at` (maintenant par défaut)"""
+        return self._decayed('category_weights', at)
+    
+    def get_tag_weights(self, at=None):
+        """Poids décroissants des tags à l'instant `at` (maintenant par défaut)"""
+        return self._decayed('tag_weights', at)
+    
+    @staticmethod
+    def _top(weights, limit):
+        # Le facteur de décroissance est commun : l'ordre se lit sur les poids stockés
+        return [key for key, weight in sorted(weights.items(), key=lambda x: (-x[1], x[0]))[:limit]]
+    
+    def top_categories(self, limit=3):
+        """Catégories les plus pondérées (ex æquo départagés par nom)"""
+        return self._top(self._load('category_weights'), limit)
+    
+    def top_tags(self, limit=10):
+        """Tags les plus pondérés"""
+        return self._top(self._load('tag_weights'), limit)
+    
+    def preferred_difficulty(self):
+        """Niveau de difficulté le plus aimé, ou None"""
+        weights = self._load('difficulty_weights')
+        if not weights:
+            return None
+        return max(weights.items(), key=lambda x: (x[1], x[0]))[0]
+    
+    def apply_interaction(self, category, tags, difficulty_level, interaction_type,
+                          added=True, at=None):
+        """
+        Répercute l'ajout (ou le retrait) d'une interaction sur le profil
+        Le retrait d'une interaction est évalué à l'instant présent, les poids
+        sont bornés à zéro
+        """
+        at = at or datetime.utcnow()
+        self.interaction_count = max(0, (self.interaction_count or 0) + (1 if added else -1))
+        if added:
+            self.last_interaction_at = max(filter(None, [self.last_interaction_at, at]))
+        
+        weight = self.INTERACTION_WEIGHTS.get(interaction_type)
+        if weight is None:
+            return
+        
+        exponent = self.DECAY_RATE * (at - self.reference_at).total_seconds()
+        if exponent > self.MAX_EXPONENT:
+            self._rebase(at)
+            exponent = 0.0
+        delta = weight * math.exp(exponent) * (1 if added else -1)
+        
+        categories = self._load('category_weights')
+        tag_weights = self._load('tag_weights')
+        if category:
+            self._add(categories, category, delta)
+        for tag in tags or []:
+            self._add(tag_weights, tag, delta)
+        if len(tag_weights) > self.MAX_TAGS * 2:
+            tag_weights = dict(sorted(tag_weights.items(), key=lambda x: -x[1])[:self.MAX_TAGS])
+        self.category_weights = json.dumps(categories)
+        self.tag_weights = json.dumps(tag_weights)
+        
+        if interaction_type == 'like' and difficulty_level:
+            difficulties = self._load('difficulty_weights')
+            self._add(difficulties, difficulty_level, delta)
+            self.difficulty_weights = json.dumps(difficulties)
+    
+    @staticmethod
+    def _add(weights, key, delta):
+        value = weights.get(key, 0.0) + delta
+        if value > 1e-9:
+            weights[key] = value
+        else:
+            weights.pop(key, None)
+    
+    def _rebase(self, at):
+        """Ramène les poids stockés à la référence `at` (évite les débordements)"""
+        factor = self._decay_factor(at)
+        for column in ('category_weights', 'tag_weights', 'difficulty_weights'):
+            weights = {key: weight * factor for key, weight in self._load(column).items()
+                       if weight * factor > 1e-9}
+            setattr(self, column, json.dumps(weights))
+        self.reference_at = at
+    
+    def to_dict(self):
+        """Convertit le profil en dictionnaire (poids décroissants actuels)"""
+        return {
+            'user_id': self.user_id,
+            'category_weights': self.get_category_weights(),
+            'tag_weights': self.get_tag_weights(),
+            'preferred_difficulty': self.preferred_difficulty(),
+            'interaction_count': self.interaction_count,
+            'last_interaction_at': self.last_interaction_at.isoformat() if self.last_interaction_at else None
+        }
+    
+    @staticmethod
+    def get_many(user_ids):
+        """
+        Profils {user_id: UserProfile} d'un ensemble d'utilisateurs
+        Les profils manquants sont construits depuis l'historique et stockés
+        """
+        if not user_ids:
+            return {}
+        
+        profiles = {
+            profile.user_id: profile for profile in
+            UserProfile.query.filter(UserProfile.user_id.in_(list(user_ids))).all()
+        }
+        missing = [user_id for user_id in user_ids if user_id not in profiles]
+        if missing:
+            profiles.update(UserProfile.build_many(missing))
+        return profiles
+    
+    @staticmethod
+    def get_for_user(user_id):
+        """Profil d'un utilisateur (construit au premier accès)"""
+        return UserProfile.get_many([user_id])[user_id]
+    
+    @staticmethod
+    def build_many(user_ids):
+        """
+        (Re)construit les profils depuis la table des interactions (une requête)
+        Retourne {user_id: UserProfile}
+        """
+        from .content import Content
+        from .interaction import Interaction
+        
+        now = datetime.utcnow()
+        profiles = {
+            profile.user_id: profile for profile in
+            UserProfile.query.filter(UserProfile.user_id.in_(list(user_ids))).all()
+        }
+        for profile in profiles.values():
+            profile.reset(now)
+        for user_id in user_ids:
+            if user_id not in profiles:
+                profiles[user_id] = UserProfile(user_id, reference_at=now)
+                db.session.add(profiles[user_id])
+        
+        rows = db.session.query(
+            Interaction.user_id,
+            Interaction.interaction_type,
+            Interaction.created_at,
+            Content.category,
+            Content.tags,
+            Content.difficulty_level
+        ).join(Content, Content.id == Interaction.content_id).filter(
+            Interaction.user_id.in_(list(user_ids))
+        ).order_by(Interaction.id).all()
+        
+        for user_id, interaction_type, created_at, category, tags, difficulty_level in rows:
+            try:
+                tags = json.loads(tags) if tags else []
+            except (json.JSONDecodeError, TypeError):
+                tags = []
+            profiles[user_id].apply_interaction(
+                category, tags, difficulty_level, interaction_type, at=created_at or now
+            )
+        
+        try:
+            db.session.commit()
+        except Exception as e:
+            # Profil construit en parallèle par une autre requête : il sera relu
+            db.session.rollback()
+            logger.warning(f"Erreur sauvegarde profils utilisateurs: {e}")
+        return profiles
+    
+    def __repr__(self):
+        return f'<UserProfile {self.user_id}>'
+
+@on_interaction
+def _update_user_profile(user_id, content_id, interaction_type, added):
+    """Met à jour le profil de l'utilisateur à chaque écriture d'interaction"""
+    from .content import Content
+    
+    try:
+        profile = db.session.query(UserProfile).filter_by(user_id=user_id).with_for_update().first()
+        if profile is None:
+            # Premier accès : le profil est construit depuis l'historique, qui
+            # contient déjà cette interaction
+            db.session.rollback()
+            if added:
+                UserProfile.build_many([user_id])
+            return
+        
+        content = Content.query.get(content_id)
+        if content is None:
+            profile.apply_interaction(None, [], None, None, added=added)
+        else:
+            profile.apply_interaction(
+                content.category, content.get_tags(), content.difficulty_level,
+                interaction_type, added=added
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
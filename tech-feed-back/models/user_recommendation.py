@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+import json
+from database import db
+
+class UserRecommendation(db.Model):
+    """Recommandations précalculées (top-N classé) d'un utilisateur"""
+    __tablename__ = 'user_recommendations'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    content_ids = db.Column(db.Text, nullable=False)  # JSON string des ids classés
+    scores = db.Column(db.Text, nullable=False)  # JSON string des scores associés
+    preferences = db.Column(db.Text, nullable=True)  # Préférences utilisateur au moment du calcul
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __init__(self, user_id, ranking, preferences=None, computed_at=None):
+        self.user_id = user_id
+        self.set_ranking(ranking)
+        self.preferences = preferences
+        self.computed_at = computed_at or datetime.utcnow()
+    
+    def set_ranking(self, ranking):
+        """Stocke un classement [(content_id, score)] en JSON"""
+        self.content_ids = json.dumps([int(content_id) for content_id, score in ranking])
+        self.scores = json.dumps([round(float(score), 6) for content_id, score in ranking])
+    
+    def get_content_ids(self):
+        """Récupère les ids classés depuis JSON"""
+        try:
+            return json.loads(self.content_ids) if self.content_ids else []
+        except (json.JSONDecodeError, TypeError):
+            return []
+    
+    def get_scores(self):
+        """Récupère les scores depuis JSON"""
+        try:
+            return json.loads(self.scores) if self.scores else []
+        except (json.JSONDecodeError, TypeError):
+            return []
+    
+    def is_fresh(self, user, max_age):
+        """Vérifie que le classement est récent et calculé avec les préférences actuelles"""
+        if self.computed_at < datetime.utcnow() - timedelta(seconds=max_age):
+            return False
+        return self.preferences == user.preferences
+    
+    def to_dict(self):
+        """Convertit le classement en dictionnaire"""
+        return {
+            'user_id': self.user_id,
+            'content_ids': self.get_content_ids(),
+            'scores': self.get_scores(),
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None
+        }
+    
+    @staticmethod
+    def replace_many(rankings, preferences=None, computed_at=None):
+        """
+        Remplace les classements {user_id: [(content_id, score)]} en une transaction
+        `preferences` associe à chaque user_id ses préférences (JSON) utilisées
+        """
+        if not rankings:
+            return 0
+        
+        preferences = preferences or {}
+        computed_at = computed_at or datetime.utcnow()
+        UserRecommendation.query.filter(
+            UserRecommendation.user_id.in_(list(rankings))
+        ).delete(synchronize_session=False)
+        db.session.add_all([
+            UserRecommendation(user_id, ranking, preferences=preferences.get(user_id),
+                               computed_at=computed_at)
+            for user_id, ranking in rankings.items()
+        ])
+        db.session.commit()
+        return len(rankings)
+    
+    @staticmethod
+    def get_stale_user_ids(max_age):
+        """
+        Utilisateurs actifs à recalculer : sans classement, classement trop
+        ancien, préférences ou interactions modifiées depuis le dernier calcul
+        """
+        from .user import User
+        from .interaction import Interaction
+        
+        stale_before = datetime.utcnow() - timedelta(seconds=max_age)
+        changed_interactions = db.session.query(Interaction.id).filter(
+            Interaction.user_id == User.id,
+            Interaction.updated_at > UserRecommendation.computed_at
+        ).exists()
+        
+        rows = db.session.query(User.id).outerjoin(
+            UserRecommendation, UserRecommendation.user_id == User.id
+        ).filter(
+            User.is_active == True,
+            db.or_(
+                UserRecommendation.user_id.is_(None),
+                UserRecommendation.computed_at < stale_before,
+                UserRecommendation.preferences.is_distinct_from(User.preferences),
+                changed_interactions
+            )
+        ).order_by(User.id).all()
+        
+        return [user_id for (user_id,) in rows]
+    
+    def __repr__(self):
+        return f'<UserRecommendation {self.user_id}>'
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Script de précalcul des recommandations personnalisées TechFeed
+Calcule le top-N de chaque utilisateur et le stocke dans la table
+user_recommendations, servie directement par /api/recommendations/for-you.
+
+Par défaut seuls les utilisateurs dont le classement est absent, trop ancien
+ou invalidé (préférences ou interactions modifiées) sont recalculés ; les
+utilisateurs sont répartis par lots entre plusieurs processus.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app import create_app
+from database import db
+from models.user import User
+from models.user_recommendation import UserRecommendation
+
+# Application et moteur propres à chaque processus de calcul
+_worker_app = None
+
+def _init_worker(config_name):
+    """Crée l'application (et sa connexion à la base) dans un processus de calcul"""
+    global _worker_app
+    _worker_app = create_app(config_name, background_workers=False)
+
+def _compute_shard(user_ids, count):
+    """Calcule et écrit les classements d'un lot d'utilisateurs"""
+    from recommendations.engine import RecommendationEngine
+
+    with _worker_app.app_context():
+        try:
+            return RecommendationEngine().materialize_recommendations(user_ids, count=count)
+        finally:
+            db.session.remove()
+
+def get_target_user_ids(app, full=False):
+    """Utilisateurs à recalculer (tous les actifs avec --full)"""
+    with app.app_context():
+        if full:
+            rows = db.session.query(User.id).filter(User.is_active == True).order_by(User.id).all()
+            return [user_id for (user_id,) in rows]
+        return UserRecommendation.get_stale_user_ids(
+            app.config.get('PRECOMPUTED_RECOMMENDATIONS_MAX_AGE', 86400)
+        )
+
+def precompute(config_name=None, full=False, workers=None, batch_size=500, count=None):
+    """Précalcule les recommandations ; retourne le nombre de classements écrits"""
+    app = create_app(config_name, background_workers=False)
+    count = count or app.config.get('PRECOMPUTED_RECOMMENDATIONS_COUNT', 50)
+    workers = workers or os.cpu_count() or 1
+
+    user_ids = get_target_user_ids(app, full=full)
+    if not user_ids:
+        print("ℹ️  Aucun utilisateur à recalculer")
+        return 0
+
+    shards = [user_ids[start:start + batch_size] for start in range(0, len(user_ids), batch_size)]
+    print(f"📊 {len(user_ids)} utilisateurs, {len(shards)} lots, {workers} processus")
+
+    written = 0
+    if workers == 1:
+        global _worker_app
+        _worker_app = app
+        for shard in shards:
+            written += _compute_shard(shard, count)
+        return written
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(config_name,)) as executor:
+        futures = [executor.submit(_compute_shard, shard, count) for shard in shards]
+        for future in as_completed(futures):
+            try:
+                written += future.result()
+            except Exception as e:
+                print(f"❌ Erreur lors du calcul d'un lot: {e}")
+
+    return written
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Précalcul des recommandations personnalisées')
+    parser.add_argument('--full', action='store_true',
+                        help='recalculer tous les utilisateurs actifs (sinon seulement les classements périmés)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='nombre de processus de calcul (défaut: nombre de coeurs)')
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help="nombre d'utilisateurs par lot")
+    parser.add_argument('--count', type=int, default=None,
+                        help='taille du classement stocké par utilisateur')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'),
+                        help='configuration Flask (development, production, testing)')
+    args = parser.parse_args()
+
+    print("🚀 Précalcul des recommandations TechFeed...")
+    started = time.perf_counter()
+    total = precompute(
+        config_name=args.config,
+        full=args.full,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        count=args.count
+    )
+    print(f"🎉 {total} classements écrits en {time.perf_counter() - started:.1f} s")
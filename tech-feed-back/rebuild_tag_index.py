@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Script de reconstruction de l'index des tags TechFeed
+Les écritures de l'application tiennent à jour la table content_tags ; ce
+script la reconstruit depuis la colonne JSON `contents.tags` (reprise des
+contenus existants, contenus insérés hors ORM).
+"""
+
+import argparse
+import os
+import time
+
+from app import create_app
+from models.tag import Tag
+
+def rebuild(config_name=None, batch_size=5000):
+    """Reconstruit l'index ; retourne le nombre d'associations contenu-tag"""
+    app = create_app(config_name, background_workers=False)
+    with app.app_context():
+        return Tag.rebuild_index(batch_size=batch_size)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reconstruction de l'index des tags des contenus")
+    parser.add_argument('--batch-size', type=int, default=5000,
+                        help='nombre de lignes par écriture')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'),
+                        help='configuration Flask (development, production, testing)')
+    args = parser.parse_args()
+
+    print("🚀 Reconstruction de l'index des tags TechFeed...")
+    started = time.perf_counter()
+    links = rebuild(config_name=args.config, batch_size=args.batch_size)
+    print(f"🎉 {links} associations contenu-tag écrites en {time.perf_counter() - started:.1f} s")
@@ -0,0 +1,181 @@
+"""
+Artefacts de modèles partagés entre processus
+Un artefact est un répertoire versionné de tableaux NumPy bruts (un fichier
+`.bin` par tableau, décrit par `manifest.json`) ouverts avec `np.memmap` :
+les workers d'un même hôte partagent une seule copie en cache de pages. Le
+fichier `CURRENT` désigne la version active et est remplacé atomiquement à
+chaque publication ; les lecteurs passent à la nouvelle version sans
+redémarrage, les requêtes en cours gardant leurs tableaux ouverts. Les
+processus qui publient une version dérivée de la précédente se sérialisent
+avec `artifact_lock` (fichier `.lock`).
+
+    <répertoire>/CURRENT
+    <répertoire>/.lock
+    <répertoire>/<version>/manifest.json
+    <répertoire>/<version>/<tableau>.bin
+"""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+POINTER = 'CURRENT'
+LOCK = '.lock'
+
+
+class ModelArtifact:
+    """Version ouverte d'un artefact : tableaux projetés en mémoire et métadonnées"""
+
+    def __init__(self, path, manifest, mode='r'):
+        self.path = path
+        self.version = manifest['version']
+        self.created_at = manifest.get('created_at')
+        self.metadata = manifest.get('metadata', {})
+        self.arrays = {}
+        for name, spec in manifest['arrays'].items():
+            dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+            if int(np.prod(shape)) == 0:
+                # Un fichier vide ne peut pas être projeté
+                self.arrays[name] = np.zeros(shape, dtype=dtype)
+            else:
+                self.arrays[name] = np.memmap(os.path.join(path, f'{name}.bin'),
+                                              dtype=dtype, mode=mode, shape=shape)
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def file(self, name):
+        """Chemin d'un fichier annexe de la version (vectoriseur, vocabulaire...)"""
+        return os.path.join(self.path, name)
+
+
+def current_version(directory):
+    """Version active d'un répertoire d'artefacts (None si aucune)"""
+    try:
+        with open(os.path.join(directory, POINTER)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+@contextmanager
+def artifact_lock(directory):
+    """
+    Verrou exclusif inter-processus d'un répertoire d'artefacts (flock)
+    À tenir de la lecture de la dernière version à la publication de la
+    suivante, pour ne pas perdre les modifications publiées entre-temps
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK), 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def write_artifact(directory, arrays, metadata=None, files=None, keep=3):
+    """
+    Publie une nouvelle version et la rend active
+
+    arrays: {nom: tableau} écrits à plat (ordre C)
+    files: {nom: fonction(chemin)} pour les fichiers annexes
+    keep: nombre de versions conservées (les lecteurs d'une version
+    supprimée gardent leurs projections ouvertes)
+    Retourne le nom de la version
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = f'{time.time_ns():020d}-{os.getpid()}'
+    staging = os.path.join(directory, f'.tmp-{version}')
+    os.makedirs(staging)
+
+    manifest = {
+        'version': version,
+        'created_at': datetime.utcnow().isoformat(),
+        'metadata': metadata or {},
+        'arrays': {}
+    }
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        array.tofile(os.path.join(staging, f'{name}.bin'))
+        manifest['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape)}
+    for name, write in (files or {}).items():
+        write(os.path.join(staging, name))
+    with open(os.path.join(staging, MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+
+    # Version complète avant d'être désignée : renommage puis bascule du pointeur
+    os.rename(staging, os.path.join(directory, version))
+    pointer = os.path.join(directory, f'.{POINTER}.{version}')
+    with open(pointer, 'w') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(directory, POINTER))
+
+    _prune(directory, keep)
+    return version
+
+
+def _prune(directory, keep):
+    """Supprime les versions les plus anciennes au-delà de `keep`"""
+    active = current_version(directory)
+    versions = sorted(name for name in os.listdir(directory)
+                      if os.path.isfile(os.path.join(directory, name, MANIFEST)))
+    for name in versions[:-keep] if keep else []:
+        if name != active:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def open_artifact(directory, version=None, mode='r'):
+    """
+    Ouvre une version (la version active par défaut) ; None si indisponible
+    mode: 'r' lecture seule, 'c' copie à l'écriture (modifications privées
+    au processus, pages non modifiées toujours partagées)
+    """
+    version = version or current_version(directory)
+    if not version:
+        return None
+    path = os.path.join(directory, version)
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        return ModelArtifact(path, manifest, mode=mode)
+    except (OSError, ValueError, KeyError) as e:
+        logger.info(f"Artefact {path} indisponible: {e}")
+        return None
+
+
+class ArtifactWatcher:
+    """
+    Détecte la publication d'une nouvelle version dans un répertoire
+    Le pointeur n'est relu qu'une fois par `check_interval` secondes
+    """
+
+    def __init__(self, directory, check_interval=5.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.version = None
+        self._next_check = 0.0
+
+    def poll(self):
+        """Retourne la nouvelle version active, ou None si elle n'a pas changé"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return None
+        self._next_check = now + self.check_interval
+
+        version = current_version(self.directory)
+        if version and version != self.version:
+            return version
+        return None
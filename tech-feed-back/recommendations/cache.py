@@ -0,0 +1,194 @@
+"""
+Cache des recommandations personnalisées
+Conserve la liste classée des contenus de chaque utilisateur (par tranche de
+`limit`) avec expiration (TTL) et éviction LRU ; les entrées d'un
+utilisateur sont invalidées dès qu'il écrit une interaction. Chaque worker
+ayant son cache, une entrée porte aussi la version partagée de l'utilisateur
+(mise à jour du profil, compteur d'écritures d'interactions de la ligne
+users) : une écriture faite dans un autre processus l'invalide aussi.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from recommendations.events import on_interaction, on_user_update
+
+# Tranches de `limit` mises en cache (une requête est servie par sa tranche, ou
+# à défaut par le début d'une tranche plus grande)
+LIMIT_BUCKETS = (10, 20, 50)
+
+
+def limit_bucket(limit):
+    """Retourne la tranche de cache couvrant `limit`"""
+    for bucket in LIMIT_BUCKETS:
+        if limit <= bucket:
+            return bucket
+    return limit
+
+
+def user_version(user):
+    """Version partagée d'un utilisateur chargé (mise à jour du profil, écritures d'interactions)"""
+    return user.updated_at, user.interaction_version
+
+
+def user_versions(user_ids):
+    """
+    Versions partagées par tous les processus {user_id: version}
+    Un utilisateur déjà chargé dans la session (route, lot) est lu sans
+    requête ; les autres en une requête sur la clé primaire
+    """
+    from database import db
+    from models.user import User
+
+    versions = {}
+    missing = []
+    for user_id in user_ids:
+        user = db.session.identity_map.get(db.inspect(User).identity_key_from_primary_key((user_id,)))
+        if user is None:
+            missing.append(user_id)
+        else:
+            versions[user_id] = user_version(user)
+    if missing:
+        rows = db.session.query(User.id, User.updated_at, User.interaction_version).filter(User.id.in_(missing))
+        versions.update({user_id: (updated_at, counter) for user_id, updated_at, counter in rows})
+    return versions
+
+
+class RecommendationCache:
+    """
+    Cache LRU avec TTL des listes classées d'identifiants de contenus
+    Avec `shared_versions`, une entrée n'est servie que si la version de
+    l'utilisateur (`user_versions`) n'a pas changé depuis sa mise en cache
+    """
+
+    def __init__(self, max_entries=10000, ttl=300, shared_versions=True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_versions = shared_versions
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (user_id, bucket) -> (expires_at, content_ids, version)
+        self._user_keys = {}  # user_id -> set des clés
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, limit, version=None):
+        """
+        Retourne les `limit` premiers ids en cache, ou None
+        `version` est la version de l'utilisateur lue une fois pour la requête
+        (`current_version`, relue ici si absente) et réutilisée pour `put`
+        """
+        bucket = limit_bucket(limit)
+        buckets = [bucket] + [larger for larger in LIMIT_BUCKETS if larger > bucket]
+        with self._lock:
+            entry = None
+            for key in ((user_id, candidate) for candidate in buckets):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] < time.monotonic():
+                    self._discard(key)
+                    entry = None
+                if entry is not None:
+                    break
+
+        # Entrée invalidée par une écriture d'un autre processus
+        if entry is not None and self.shared_versions:
+            if version is None:
+                version = self.current_version(user_id)
+            if entry[2] != version:
+                self.invalidate_user(user_id)
+                entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1][:limit]
+
+    def current_version(self, user_id):
+        """Version partagée d'un utilisateur (None sans `shared_versions`)"""
+        return self.current_versions([user_id]).get(user_id)
+
+    def current_versions(self, user_ids):
+        """Versions partagées {user_id: version} ({} sans `shared_versions`)"""
+        if not self.shared_versions or not user_ids:
+            return {}
+        return user_versions(user_ids)
+
+    def put(self, user_id, limit, content_ids, version=None):
+        """
+        Met en cache la liste classée calculée pour la tranche de `limit`
+        `version` est la version de l'utilisateur lue avant le calcul
+        (`current_version`) : une écriture faite pendant le calcul invalide
+        l'entrée
+        """
+        key = (user_id, limit_bucket(limit))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, list(content_ids), version)
+            self._entries.move_to_end(key)
+            self._user_keys.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+
+    def _discard(self, key):
+        self._entries.pop(key, None)
+        keys = self._user_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[key[0]]
+
+    def invalidate_user(self, user_id):
+        """Supprime toutes les entrées d'un utilisateur"""
+        with self._lock:
+            for key in list(self._user_keys.get(user_id, ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def stats(self):
+        """Statistiques du cache"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+# Instance globale du cache (une par processus)
+recommendation_cache = None
+_cache_lock = threading.Lock()
+
+def get_recommendation_cache():
+    """Retourne le cache global des recommandations"""
+    global recommendation_cache
+    if recommendation_cache is None:
+        with _cache_lock:
+            if recommendation_cache is None:
+                from flask import current_app
+                recommendation_cache = RecommendationCache(
+                    max_entries=current_app.config.get('RECOMMENDATION_CACHE_SIZE', 10000),
+                    ttl=current_app.config.get('RECOMMENDATION_CACHE_TTL', 300),
+                    shared_versions=current_app.config.get('RECOMMENDATION_CACHE_SHARED_VERSIONS', True)
+                )
+    return recommendation_cache
+
+@on_interaction(memory=True)
+def _invalidate_on_interaction(user_id, content_id, interaction_type, added):
+    """Les recommandations d'un utilisateur changent dès qu'il interagit"""
+    if recommendation_cache is not None:
+        recommendation_cache.invalidate_user(user_id)
+
+@on_user_update(memory=True)
+def _invalidate_on_user_update(user_id):
+    if recommendation_cache is not None:
+        recommendation_cache.invalidate_user(user_id)
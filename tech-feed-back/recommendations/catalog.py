@@ -0,0 +1,626 @@
+"""
+Catalogue colonnaire des contenus publiés pour le moteur de recommandations
+Garde les contenus en mémoire sous forme de tableaux NumPy afin de scorer
+tout le catalogue en une seule passe vectorisée
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+
+from database import db
+from models.content import Content
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 86400.0
+
+# Codes des niveaux de difficulté (0 = non renseigné)
+DIFFICULTY_CODES = {'beginner': 1, 'intermediate': 2, 'advanced': 3}
+
+# Table de popcount par octet pour compter les bits des bitsets de termes
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# Structures dérivées qui ne dépendent pas des compteurs (vues, likes)
+_COUNTER_INDEPENDENT_KEYS = frozenset({'term_columns', 'fresh'})
+
+
+def jitter_seed(user_id, day=None):
+    """
+    Graine du bruit de score d'un utilisateur : stable pendant une journée
+    pour que les résultats mis en cache restent cohérents
+    """
+    if day is None:
+        day = int(time.time() // SECONDS_PER_DAY)
+    return int(user_id) * 100003 + day
+
+
+def stable_jitter(content_ids, seed, amplitude=0.1):
+    """Bruit déterministe dans [-amplitude, amplitude) par couple (graine, contenu)"""
+    with np.errstate(over='ignore'):
+        x = np.asarray(content_ids, dtype=np.uint64) + \
+            np.asarray(seed, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        # Mélange splitmix64
+        x ^= x >> np.uint64(30)
+        x *= np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x *= np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+    unit = (x >> np.uint64(11)).astype(np.float64) / float(2**53)
+    return unit * 2 * amplitude - amplitude
+
+
+def _to_timestamp(value):
+    """Convertit une datetime naïve UTC en secondes depuis l'epoch"""
+    if value is None:
+        return time.time()
+    return (value - EPOCH).total_seconds()
+
+
+class ContentCatalog:
+    """
+    Catalogue en mémoire des contenus publiés
+
+    Chaque contenu occupe une ligne des tableaux colonnaires. La catégorie et
+    les tags partagent un même vocabulaire de termes afin que la
+    correspondance avec les préférences soit un simple popcount de bitsets.
+    """
+
+    def __init__(self, refresh_interval=5, full_rebuild_interval=3600):
+        self.refresh_interval = refresh_interval
+        self.full_rebuild_interval = full_rebuild_interval
+
+        self._lock = threading.RLock()
+        self._reset()
+
+        self._watermark = None
+        self._last_refresh = 0.0
+        self._last_full_rebuild = 0.0
+
+        # Incrémenté à chaque modification des lignes hors compteurs (invalide les classements dérivés)
+        self.version = 0
+
+        # Vrai après la première reconstruction complète réussie
+        self.built = False
+
+    def _reset(self):
+        """Vide le stockage colonnaire"""
+        self._size = 0
+        self._capacity = 0
+        self._words = 1
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.category_codes = np.zeros(0, dtype=np.int32)
+        self.term_bits = np.zeros((0, self._words), dtype=np.uint64)
+        self.view_counts = np.zeros(0, dtype=np.float64)
+        self.like_counts = np.zeros(0, dtype=np.float64)
+        self.created_at = np.zeros(0, dtype=np.float64)
+        self.difficulty_codes = np.zeros(0, dtype=np.int8)
+        self.featured = np.zeros(0, dtype=bool)
+        self.active = np.zeros(0, dtype=bool)
+
+        # Codes des termes de chaque ligne (pour la matrice creuse contenus × termes)
+        self.row_terms = []
+        self._term_matrix = None
+
+        # Structures dérivées (listes triées pour la génération de candidats),
+        # recalculées paresseusement après chaque modification et chaque jour
+        self._derived = {}
+        self._derived_day = None
+
+        self.id_to_row = {}
+        self.categories = []
+        self.category_index = {}
+        self.terms = []
+        self.term_index = {}
+
+    # ------------------------------------------------------------------
+    # Gestion du stockage
+    # ------------------------------------------------------------------
+
+    def _ensure_capacity(self, needed):
+        """Agrandit les tableaux (croissance géométrique) si nécessaire"""
+        if needed <= self._capacity:
+            return
+
+        capacity = max(needed, self._capacity * 2, 64)
+
+        def grow(array, fill=0):
+            shape = (capacity,) + array.shape[1:]
+            grown = np.full(shape, fill, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            return grown
+
+        self.ids = grow(self.ids)
+        self.category_codes = grow(self.category_codes)
+        self.term_bits = grow(self.term_bits)
+        self.view_counts = grow(self.view_counts)
+        self.like_counts = grow(self.like_counts)
+        self.created_at = grow(self.created_at)
+        self.difficulty_codes = grow(self.difficulty_codes)
+        self.featured = grow(self.featured)
+        self.active = grow(self.active)
+        self._capacity = capacity
+
+    def _term_code(self, term):
+        """Retourne (en l'enregistrant au besoin) le code d'un terme"""
+        code = self.term_index.get(term)
+        if code is None:
+            code = len(self.terms)
+            self.terms.append(term)
+            self.term_index[term] = code
+
+            words = code // 64 + 1
+            if words > self._words:
+                extra = np.zeros((self.term_bits.shape[0], words - self._words), dtype=np.uint64)
+                self.term_bits = np.hstack([self.term_bits, extra])
+                self._words = words
+        return code
+
+    def _category_code(self, category):
+        """Retourne (en l'enregistrant au besoin) le code d'une catégorie"""
+        code = self.category_index.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self.category_index[category] = code
+        return code
+
+    def terms_to_bits(self, terms):
+        """Construit le bitset d'une liste de termes connus du catalogue"""
+        bits = np.zeros(self._words, dtype=np.uint64)
+        for term in terms:
+            code = self.term_index.get(term)
+            if code is not None:
+                bits[code // 64] |= np.uint64(1) << np.uint64(code % 64)
+        return bits
+
+    def _upsert(self, content):
+        """
+        Insère ou met à jour la ligne d'un contenu
+        Si seuls les compteurs (vues, likes) ont changé, ils sont mis à jour en
+        place et seules les structures qui dépendent du score statique sont
+        oubliées : termes, listes inversées, ordre de fraîcheur et version
+        (cohortes) sont conservés
+        """
+        row = self.id_to_row.get(content.id)
+        if row is None:
+            self._ensure_capacity(self._size + 1)
+            row = self._size
+            self._size += 1
+            self.id_to_row[content.id] = row
+
+        term_codes = [self._term_code(content.category)]
+        term_codes.extend(self._term_code(tag) for tag in content.get_tags())
+        term_codes = sorted(set(term_codes))
+        category_code = self._category_code(content.category)
+        created_at = _to_timestamp(content.created_at)
+        difficulty_code = DIFFICULTY_CODES.get(content.difficulty_level, 0)
+        featured = bool(content.is_featured)
+
+        self.view_counts[row] = content.view_count or 0
+        self.like_counts[row] = content.like_count or 0
+        if (row < len(self.row_terms) and self.active[row] and self.row_terms[row] == term_codes
+                and self.category_codes[row] == category_code and self.created_at[row] == created_at
+                and self.difficulty_codes[row] == difficulty_code and self.featured[row] == featured):
+            self._invalidate_scores()
+            return
+
+        if row < len(self.row_terms):
+            self.row_terms[row] = term_codes
+        else:
+            self.row_terms.append(term_codes)
+        self._invalidate_derived()
+
+        bits = np.zeros(self._words, dtype=np.uint64)
+        for code in term_codes:
+            bits[code // 64] |= np.uint64(1) << np.uint64(code % 64)
+
+        self.ids[row] = content.id
+        self.category_codes[row] = category_code
+        self.term_bits[row] = bits
+        self.created_at[row] = created_at
+        self.difficulty_codes[row] = difficulty_code
+        self.featured[row] = featured
+        self.active[row] = True
+
+    def _deactivate(self, content_id):
+        """Retire un contenu du catalogue (la ligne devient inactive)"""
+        row = self.id_to_row.pop(content_id, None)
+        if row is not None:
+            self.active[row] = False
+            self._invalidate_derived()
+
+    def _invalidate_derived(self):
+        """Oublie les structures dérivées du contenu des lignes"""
+        self._term_matrix = None
+        self._derived = {}
+        self.version += 1
+
+    def _invalidate_scores(self):
+        """Oublie les structures dérivées des compteurs (score statique et listes triées par ce score)"""
+        for key in [key for key in self._derived if key not in _COUNTER_INDEPENDENT_KEYS]:
+            del self._derived[key]
+
+    def _compact(self):
+        """Supprime les lignes inactives quand elles deviennent trop nombreuses"""
+        keep = np.flatnonzero(self.active[:self._size])
+        if len(keep) == self._size:
+            return
+
+        for name in ('ids', 'category_codes', 'term_bits', 'view_counts', 'like_counts',
+                     'created_at', 'difficulty_codes', 'featured', 'active'):
+            setattr(self, name, getattr(self, name)[keep].copy())
+        self.row_terms = [self.row_terms[row] for row in keep]
+        self._invalidate_derived()
+
+        self._size = len(keep)
+        self._capacity = self._size
+        self.id_to_row = {int(content_id): row for row, content_id in enumerate(self.ids)}
+
+    # ------------------------------------------------------------------
+    # Rafraîchissement depuis la base
+    # ------------------------------------------------------------------
+
+    def refresh(self, force=False):
+        """
+        Met à jour le catalogue depuis la base
+
+        Seuls les contenus modifiés depuis le dernier rafraîchissement
+        (`updated_at`) sont relus ; une reconstruction complète est faite
+        périodiquement pour prendre en compte les suppressions.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+
+        with self._lock:
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return
+
+            if self._watermark is None or now - self._last_full_rebuild >= self.full_rebuild_interval:
+                self._rebuild()
+            else:
+                self._refresh_incremental()
+
+            self._last_refresh = now
+
+    def _rebuild(self):
+        """Reconstruit entièrement le catalogue"""
+        started = time.perf_counter()
+        watermark = db.session.query(db.func.max(Content.updated_at)).scalar()
+
+        self._reset()
+        for content in Content.query.filter_by(is_published=True).yield_per(1000):
+            self._upsert(content)
+
+        self._watermark = watermark or datetime.utcnow()
+        self._last_full_rebuild = time.monotonic()
+        self.built = True
+        logger.info(f"Catalogue reconstruit: {self._size} contenus en "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def _refresh_incremental(self):
+        """Relit uniquement les contenus modifiés depuis le dernier passage"""
+        changed = Content.query.filter(Content.updated_at >= self._watermark).all()
+
+        for content in changed:
+            if content.is_published:
+                self._upsert(content)
+            else:
+                self._deactivate(content.id)
+            if content.updated_at and content.updated_at > self._watermark:
+                self._watermark = content.updated_at
+
+        if self._size and len(self.id_to_row) < self._size * 0.75:
+            self._compact()
+
+    def invalidate(self, content_id=None):
+        """Force la prise en compte d'une modification au prochain accès"""
+        with self._lock:
+            if content_id is not None:
+                self._deactivate(content_id)
+            self._last_refresh = 0.0
+
+    # ------------------------------------------------------------------
+    # Scoring vectorisé
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.id_to_row)
+
+    def category_of(self, content_id):
+        """Retourne la catégorie d'un contenu du catalogue"""
+        row = self.id_to_row.get(content_id)
+        if row is None:
+            return None
+        return self.categories[self.category_codes[row]]
+
+    def _rows(self, rows=None):
+        return slice(0, self._size) if rows is None else rows
+
+    def engagement_scores(self, now=None, rows=None):
+        """Équivalent vectorisé de `Content.get_engagement_score` (lignes `rows`)"""
+        rows = self._rows(rows)
+        views = self.view_counts[rows]
+        likes = self.like_counts[rows]
+        days_old = self.days_old(now, rows)
+
+        like_ratio = np.divide(likes, views, out=np.zeros(len(views)), where=views > 0)
+        time_factor = np.maximum(0.1, 1 - days_old / 365)
+        scores = (like_ratio * 100 + views * 0.1) * time_factor
+        scores[views == 0] = 0.0
+        return scores
+
+    def days_old(self, now=None, rows=None):
+        """Âge de chaque contenu en jours entiers (comme `timedelta.days`)"""
+        now_ts = _to_timestamp(now or datetime.utcnow())
+        return np.floor((now_ts - self.created_at[self._rows(rows)]) / SECONDS_PER_DAY)
+
+    def preference_matches(self, preferences, rows=None):
+        """Nombre de termes (catégorie + tags) communs avec les préférences"""
+        pref_bits = self.terms_to_bits(preferences)
+        common = np.bitwise_and(self.term_bits[self._rows(rows)], pref_bits)
+        return _POPCOUNT_TABLE[common.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+    def rows_of(self, content_ids):
+        """Lignes (tableau) des contenus actifs parmi `content_ids`, dans l'ordre"""
+        id_to_row = self.id_to_row
+        return np.fromiter((id_to_row[c] for c in content_ids if c in id_to_row), dtype=np.int64)
+
+    def score(self, preferences, exclude_ids=(), preferred_difficulty=None,
+              limit=10, seed=None, rng=None, candidate_ids=None):
+        """
+        Score le catalogue (ou les seuls `candidate_ids`) pour un jeu de préférences
+
+        Score de pertinence : correspondances de termes avec les préférences
+        (×2), engagement (×0.1), bonus de fraîcheur sur 30 jours, niveau de
+        difficulté préféré (+0.3), mise en avant (+0.5) et un bruit faible,
+        calculé en une seule passe. Retourne les `limit` meilleurs contenus
+        sous forme de tableaux (ids, scores) triés par score décroissant. Avec `seed`, le
+        bruit ajouté est déterministe (voir `jitter_seed`).
+        """
+        with self._lock:
+            n = self._size
+            if n == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+            if candidate_ids is None:
+                rows = np.flatnonzero(self.active[:n])
+            else:
+                rows = np.unique(self.rows_of(candidate_ids))
+            if exclude_ids and len(rows):
+                exclude = np.fromiter(exclude_ids, dtype=np.int64)
+                rows = rows[~np.isin(self.ids[rows], exclude)]
+            if len(rows) == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+            days_old = self.days_old(rows=rows)
+            scores = self.preference_matches(preferences, rows) * 2.0
+            scores += self.engagement_scores(rows=rows) * 0.1
+            scores += np.maximum(0, 1 - days_old / 30) * 0.5
+
+            difficulty_code = DIFFICULTY_CODES.get(preferred_difficulty)
+            if difficulty_code:
+                scores += (self.difficulty_codes[rows] == difficulty_code) * 0.3
+
+            scores += self.featured[rows] * 0.5
+
+            # Un peu d'aléatoire pour éviter la stagnation
+            if seed is not None:
+                scores += stable_jitter(self.ids[rows], seed)
+            else:
+                rng = rng or np.random.default_rng()
+                scores += rng.uniform(-0.1, 0.1, size=len(rows))
+
+            if limit < len(rows):
+                top = np.argpartition(-scores, limit - 1)[:limit]
+            else:
+                top = np.arange(len(rows))
+            top = top[np.argsort(-scores[top], kind='stable')]
+
+            return self.ids[rows[top]].copy(), scores[top]
+
+    # ------------------------------------------------------------------
+    # Génération de candidats (listes pré-triées, lecture bornée)
+    # ------------------------------------------------------------------
+
+    def _cached(self, key, build):
+        """Structure dérivée mise en cache jusqu'à la prochaine modification"""
+        day = int(time.time() // SECONDS_PER_DAY)
+        if self._derived_day != day:
+            self._derived = {}
+            self._derived_day = day
+        value = self._derived.get(key)
+        if value is None:
+            value = self._derived[key] = build()
+        return value
+
+    def static_scores(self):
+        """Partie non personnalisée du score (engagement, fraîcheur, mise en avant)"""
+        def build():
+            days_old = self.days_old()
+            scores = self.engagement_scores() * 0.1
+            scores += np.maximum(0, 1 - days_old / 30) * 0.5
+            scores += self.featured[:self._size] * 0.5
+            return scores
+        return self._cached('static', build)
+
+    def _sorted_rows(self, key, select_rows):
+        """Lignes actives retournées par `select_rows()`, par score statique décroissant"""
+        def build():
+            rows = select_rows()
+            rows = rows[self.active[rows]]
+            return rows[np.argsort(-self.static_scores()[rows], kind='stable')]
+        return self._cached(key, build)
+
+    def _term_rows(self, code):
+        """Lignes contenant le terme `code` (colonne de la matrice contenus × termes)"""
+        columns = self._cached('term_columns', lambda: self.term_matrix().tocsc())
+        return columns.indices[columns.indptr[code]:columns.indptr[code + 1]].astype(np.int64)
+
+    def _head(self, sorted_rows, excluded_rows, limit):
+        """Les `limit` premières lignes actives non exclues d'une liste triée"""
+        head = sorted_rows[:limit + len(excluded_rows)]
+        head = head[self.active[head]]
+        if len(excluded_rows):
+            head = head[~np.isin(head, excluded_rows)]
+        return head[:limit]
+
+    def term_candidates(self, terms, exclude_ids=(), limit=100):
+        """
+        Contenus partageant des termes avec `terms` (listes inversées par terme)
+        Classés par correspondances puis score statique ; lit au plus
+        `limit + len(exclude_ids)` lignes par terme
+        """
+        with self._lock:
+            codes = sorted({self.term_index[t] for t in terms if t in self.term_index})
+            if not codes:
+                return np.zeros(0, dtype=np.int64)
+            excluded_rows = self.rows_of(exclude_ids)
+
+            postings = []
+            for code in codes:
+                sorted_rows = self._sorted_rows(('term', code), lambda code=code: self._term_rows(code))
+                postings.append(self._head(sorted_rows, excluded_rows, limit))
+            rows = np.unique(np.concatenate(postings))
+
+            key = self.preference_matches(terms, rows) * 2.0 + self.static_scores()[rows]
+            if limit < len(rows):
+                rows = rows[np.argpartition(-key, limit - 1)[:limit]]
+            return self.ids[rows].copy()
+
+    def fresh_candidates(self, exclude_ids=(), limit=100):
+        """Contenus les plus récents"""
+        with self._lock:
+            def build():
+                rows = np.flatnonzero(self.active[:self._size])
+                return rows[np.argsort(-self.created_at[rows], kind='stable')]
+            sorted_rows = self._cached('fresh', build)
+            return self.ids[self._head(sorted_rows, self.rows_of(exclude_ids), limit)].copy()
+
+    def featured_candidates(self, exclude_ids=(), limit=50):
+        """Contenus mis en avant, par score statique décroissant"""
+        with self._lock:
+            sorted_rows = self._sorted_rows(
+                'featured', lambda: np.flatnonzero(self.featured[:self._size]))
+            return self.ids[self._head(sorted_rows, self.rows_of(exclude_ids), limit)].copy()
+
+    def term_matrix(self):
+        """Matrice creuse binaire contenus × termes (mise en cache)"""
+        if self._term_matrix is None:
+            lengths = np.fromiter((len(terms) for terms in self.row_terms),
+                                  dtype=np.int64, count=len(self.row_terms))
+            indptr = np.concatenate([[0], np.cumsum(lengths)])
+            indices = np.fromiter((code for terms in self.row_terms for code in terms),
+                                  dtype=np.int64, count=int(indptr[-1]))
+            self._term_matrix = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.float32), indices, indptr),
+                shape=(self._size, len(self.terms))
+            )
+        return self._term_matrix
+
+    def candidate_features(self, content_ids):
+        """
+        Termes et catégories de contenus candidats (pour la diversification)
+        Retourne (present, term_rows, category_codes) où `present` masque les
+        ids absents du catalogue et les autres valeurs suivent les ids présents
+        """
+        with self._lock:
+            rows = np.fromiter((self.id_to_row.get(c, -1) for c in content_ids),
+                               dtype=np.int64, count=len(content_ids))
+            present = rows >= 0
+            rows = rows[present]
+            return present, self.term_matrix()[rows], self.category_codes[rows].copy()
+
+    def _rows_matrix(self, groups, columns):
+        """Matrice creuse binaire (len(groups) × columns) depuis des listes de colonnes"""
+        indptr = np.concatenate([[0], np.cumsum([len(group) for group in groups])])
+        indices = np.fromiter((col for group in groups for col in group),
+                              dtype=np.int64, count=int(indptr[-1]))
+        return sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), indices, indptr),
+            shape=(len(groups), columns)
+        )
+
+    def score_many(self, preferences, exclude_ids, preferred_difficulties, seeds, limit=10):
+        """
+        Score le catalogue pour une cohorte d'utilisateurs en un produit matriciel
+
+        preferences, exclude_ids, preferred_difficulties et seeds sont des
+        listes alignées (une entrée par utilisateur). Les correspondances de
+        préférences sont obtenues par (utilisateurs × termes) · (termes ×
+        contenus) et les contenus déjà vus sont masqués via une matrice
+        creuse. Retourne une liste de couples (ids, scores) comme `score`.
+        """
+        with self._lock:
+            n = self._size
+            n_users = len(preferences)
+            if n == 0 or n_users == 0:
+                return [(np.zeros(0, dtype=np.int64), np.zeros(0)) for _ in range(n_users)]
+
+            preference_matrix = self._rows_matrix(
+                [sorted({self.term_index[t] for t in prefs if t in self.term_index})
+                 for prefs in preferences],
+                len(self.terms)
+            )
+            seen_matrix = self._rows_matrix(
+                [[self.id_to_row[c] for c in excluded if c in self.id_to_row]
+                 for excluded in exclude_ids],
+                n
+            )
+            difficulty_codes = np.array(
+                [DIFFICULTY_CODES.get(d, -1) for d in preferred_difficulties], dtype=np.int8)
+
+            # Mêmes termes, dans le même ordre, que `score`
+            days_old = self.days_old()
+            matches = (preference_matrix @ self.term_matrix().T).toarray().astype(np.float64)
+            scores = matches * 2.0
+            scores += (self.engagement_scores() * 0.1)[np.newaxis, :]
+            scores += (np.maximum(0, 1 - days_old / 30) * 0.5)[np.newaxis, :]
+            scores += (difficulty_codes[:, np.newaxis] == self.difficulty_codes[np.newaxis, :n]) * 0.3
+            scores += (self.featured[:n] * 0.5)[np.newaxis, :]
+            scores += stable_jitter(self.ids[np.newaxis, :n],
+                                    np.asarray(seeds, dtype=np.uint64)[:, np.newaxis])
+
+            # Masquer les contenus inactifs et déjà vus
+            scores[:, ~self.active[:n]] = -np.inf
+            seen_rows, seen_cols = seen_matrix.nonzero()
+            scores[seen_rows, seen_cols] = -np.inf
+
+            k = min(limit, n)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            results = []
+            for rows, row_scores in zip(top, top_scores):
+                valid = np.isfinite(row_scores)
+                results.append((self.ids[rows[valid]].copy(), row_scores[valid]))
+            return results
+
+
+# Instance globale du catalogue (une par processus)
+content_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_content_catalog():
+    """Retourne le catalogue global, rafraîchi si nécessaire"""
+    global content_catalog
+    if content_catalog is None:
+        with _catalog_lock:
+            if content_catalog is None:
+                from flask import current_app
+                content_catalog = ContentCatalog(
+                    refresh_interval=current_app.config.get('CATALOG_REFRESH_INTERVAL', 5),
+                    full_rebuild_interval=current_app.config.get('CATALOG_FULL_REBUILD_INTERVAL', 3600)
+                )
+    content_catalog.refresh()
+    return content_catalog
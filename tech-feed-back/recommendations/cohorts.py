@@ -0,0 +1,131 @@
+"""
+Recommandations de démarrage à froid par cohorte de préférences
+Un utilisateur sans interaction n'a que ses préférences d'inscription comme
+signal : tous les utilisateurs ayant le même ensemble de préférences
+partagent donc une liste classée, calculée une fois puis servie par simple
+lecture de dictionnaire. Un thread rafraîchit en arrière-plan les listes
+calculées sur une version antérieure du catalogue.
+"""
+
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def cohort_key(preferences):
+    """Clé normalisée d'un ensemble de préférences (triée, sans doublons)"""
+    return tuple(sorted({preference.strip() for preference in preferences or [] if preference}))
+
+
+def cohort_seed(key):
+    """Identifiant stable d'une cohorte, utilisé comme graine du bruit de score"""
+    return zlib.crc32('|'.join(key).encode('utf-8'))
+
+
+class CohortCache:
+    """
+    Listes classées [(content_id, score)] par ensemble de préférences
+
+    Chaque entrée garde la version du catalogue de son calcul et le nombre de
+    contenus demandés ; une entrée périmée reste servie jusqu'à son recalcul
+    par le thread de fond, qui ne recalcule que les cohortes lues depuis leur
+    dernier calcul. Les cohortes les moins récemment lues sont évincées
+    au-delà de `max_entries`.
+    """
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # clé -> [version, ranking, count, lue depuis le calcul]
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, count):
+        """Retourne les `count` premiers contenus d'une cohorte, ou None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < count:
+                self.misses += 1
+                return None
+            entry[3] = True
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1][:count]
+
+    def put(self, key, version, ranking, count):
+        """Stocke le classement d'une cohorte calculé pour `count` contenus"""
+        with self._lock:
+            self._entries[key] = [version, list(ranking), count, False]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stale_keys(self, version):
+        """Cohortes lues depuis leur calcul sur une autre version du catalogue [(clé, count)]"""
+        with self._lock:
+            return [(key, entry[2]) for key, entry in self._entries.items()
+                    if entry[3] and entry[0] != version]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Statistiques du cache"""
+        total = self.hits + self.misses
+        return {
+            'cohorts': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class CohortRefresher(threading.Thread):
+    """Thread de fond recalculant les cohortes périmées toutes les `interval` secondes"""
+
+    def __init__(self, app, interval=60):
+        super().__init__(name='cohort-refresher', daemon=True)
+        self.app = app
+        self.interval = interval
+
+    def run(self):
+        from database import db
+        from recommendations.engine import RecommendationEngine
+
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    try:
+                        refreshed = RecommendationEngine().refresh_cohorts()
+                        if refreshed:
+                            logger.info(f"{refreshed} cohortes de démarrage à froid recalculées")
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                logger.warning(f"Erreur rafraîchissement des cohortes: {e}")
+
+
+# Instance globale du cache (une par processus)
+cohort_cache = None
+_cohort_lock = threading.Lock()
+
+def get_cohort_cache():
+    """Retourne le cache global des cohortes (et démarre son thread de rafraîchissement)"""
+    global cohort_cache
+    if cohort_cache is None:
+        with _cohort_lock:
+            if cohort_cache is None:
+                from flask import current_app
+                interval = current_app.config.get('COHORT_REFRESH_INTERVAL', 60)
+                if interval:
+                    CohortRefresher(current_app._get_current_object(), interval).start()
+                cohort_cache = CohortCache(
+                    max_entries=current_app.config.get('COHORT_CACHE_SIZE', 5000)
+                )
+    return cohort_cache
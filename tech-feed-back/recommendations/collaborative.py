@@ -0,0 +1,342 @@
+"""
+Matrice creuse utilisateurs × contenus pour le filtrage collaboratif
+Les likes sont stockés dans une matrice CSR binaire ; les voisins d'un
+utilisateur sont obtenus par un seul produit matrice-vecteur creux. Les
+likes écrits par les autres processus sont relus périodiquement dans le
+journal interaction_events.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+
+from database import db
+from models.interaction import Interaction
+from recommendations.events import InteractionLogCursor, on_interaction
+
+logger = logging.getLogger(__name__)
+
+
+class LikeMatrix:
+    """
+    Matrice de likes utilisateurs × contenus
+
+    La matrice CSR de base est complétée par un journal de modifications en
+    attente (likes ajoutés ou retirés depuis la dernière compaction) ; ce
+    journal est fusionné en mémoire quand il dépasse `max_pending`, sans
+    relire la base. `sync` y ajoute toutes les `sync_interval` secondes les
+    likes et retraits écrits depuis la construction par tous les processus.
+    """
+
+    def __init__(self, max_pending=10000, sync_interval=5, sync_overlap=30):
+        self.max_pending = max_pending
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+        self._lock = threading.RLock()
+        self._cursor = None
+        self._reset()
+
+    def _reset(self):
+        """Vide la matrice"""
+        self.user_index = {}
+        self.user_ids = []
+        self.item_index = {}
+        self.item_ids = []
+
+        self._base = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._row_counts = np.zeros(0, dtype=np.float64)
+        self._pending = {}  # row -> {col: +1 / -1}
+        self._pending_count = 0
+        self.built = False
+
+    # ------------------------------------------------------------------
+    # Indexation
+    # ------------------------------------------------------------------
+
+    def _user_row(self, user_id, create=False):
+        row = self.user_index.get(user_id)
+        if row is None and create:
+            row = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.user_index[user_id] = row
+            if row >= len(self._row_counts):
+                self._row_counts = np.concatenate(
+                    [self._row_counts, np.zeros(max(row + 1, len(self._row_counts)))]
+                )
+        return row
+
+    def _item_col(self, content_id, create=False):
+        col = self.item_index.get(content_id)
+        if col is None and create:
+            col = len(self.item_ids)
+            self.item_ids.append(content_id)
+            self.item_index[content_id] = col
+        return col
+
+    # ------------------------------------------------------------------
+    # Construction et mises à jour
+    # ------------------------------------------------------------------
+
+    def build(self):
+        """Construit la matrice depuis la table des interactions"""
+        started = time.perf_counter()
+        # Les likes écrits pendant la lecture sont relus par `sync`
+        cursor = InteractionLogCursor(datetime.utcnow(), overlap=self.sync_overlap,
+                                      interval=self.sync_interval)
+        rows = db.session.query(Interaction.user_id, Interaction.content_id).filter(
+            Interaction.interaction_type == 'like'
+        ).all()
+
+        with self._lock:
+            self._reset()
+            row_idx = np.fromiter((self._user_row(u, create=True) for u, _ in rows),
+                                  dtype=np.int64, count=len(rows))
+            col_idx = np.fromiter((self._item_col(c, create=True) for _, c in rows),
+                                  dtype=np.int64, count=len(rows))
+            self._base = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=np.float32), (row_idx, col_idx)),
+                shape=(len(self.user_ids), len(self.item_ids))
+            )
+            self._base.sum_duplicates()
+            self._base.data[:] = 1.0
+            self._row_counts = np.diff(self._base.indptr).astype(np.float64)
+            self._cursor = cursor
+            self.built = True
+
+        logger.info(f"Matrice de likes construite: {len(self.user_ids)} utilisateurs, "
+                    f"{len(self.item_ids)} contenus, {self._base.nnz} likes en "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def sync(self):
+        """
+        Applique les likes et retraits du journal écrits depuis la dernière
+        lecture (par ce processus ou un autre), si une lecture est due
+        Les likes déjà connus ne changent rien. Retourne le nombre d'évènements lus
+        """
+        if self._cursor is None:
+            return 0
+        return self._cursor.sync(self._apply_event, types=('like',))
+
+    def _apply_event(self, user_id, content_id, interaction_type, added, created_at):
+        self._set_like(user_id, content_id, bool(added))
+
+    def _in_base(self, row, col):
+        if row >= self._base.shape[0] or col >= self._base.shape[1]:
+            return False
+        start, end = self._base.indptr[row], self._base.indptr[row + 1]
+        return col in self._base.indices[start:end]
+
+    def _has_like(self, row, col):
+        pending = self._pending.get(row, {}).get(col)
+        if pending is not None:
+            return pending > 0
+        return self._in_base(row, col)
+
+    def _set_like(self, user_id, content_id, liked):
+        with self._lock:
+            row = self._user_row(user_id, create=liked)
+            col = self._item_col(content_id, create=liked)
+            if row is None or col is None or self._has_like(row, col) == liked:
+                return
+
+            row_pending = self._pending.setdefault(row, {})
+            if self._in_base(row, col) == liked:
+                # Retour à l'état de la matrice de base
+                row_pending.pop(col, None)
+                self._pending_count -= 1
+            else:
+                row_pending[col] = 1 if liked else -1
+                self._pending_count += 1
+
+            self._row_counts[row] += 1 if liked else -1
+
+            if self._pending_count > self.max_pending:
+                self._compact()
+
+    def add_like(self, user_id, content_id):
+        """Enregistre un nouveau like"""
+        self._set_like(user_id, content_id, True)
+
+    def remove_like(self, user_id, content_id):
+        """Retire un like"""
+        self._set_like(user_id, content_id, False)
+
+    def _compact(self):
+        """Fusionne le journal des modifications dans la matrice de base"""
+        shape = (len(self.user_ids), len(self.item_ids))
+        base = self._base.tocoo()
+        rows, cols, data = [base.row], [base.col], [base.data]
+        for row, changes in self._pending.items():
+            for col, delta in changes.items():
+                rows.append(np.array([row]))
+                cols.append(np.array([col]))
+                data.append(np.array([delta], dtype=np.float32))
+
+        merged = sparse.csr_matrix(
+            (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))), shape=shape
+        )
+        merged.sum_duplicates()
+        merged.eliminate_zeros()
+        self._base = merged
+        self._pending = {}
+        self._pending_count = 0
+
+    # ------------------------------------------------------------------
+    # Requêtes
+    # ------------------------------------------------------------------
+
+    def _user_vector(self, row):
+        """Vecteur dense des likes d'un utilisateur (base + modifications)"""
+        vector = np.zeros(len(self.item_ids), dtype=np.float32)
+        if row < self._base.shape[0]:
+            start, end = self._base.indptr[row], self._base.indptr[row + 1]
+            vector[self._base.indices[start:end]] = 1.0
+        for col, delta in self._pending.get(row, {}).items():
+            vector[col] = 1.0 if delta > 0 else 0.0
+        return vector
+
+    def _overlaps(self, vector):
+        """Nombre de likes en commun entre chaque utilisateur et `vector`"""
+        n_users = len(self.user_ids)
+        overlaps = np.zeros(n_users, dtype=np.float64)
+        base_rows, base_cols = self._base.shape
+        overlaps[:base_rows] = self._base @ vector[:base_cols]
+
+        for row, changes in self._pending.items():
+            for col, delta in changes.items():
+                if vector[col]:
+                    overlaps[row] += delta
+        return overlaps
+
+    def similarities(self, user_id, metric='jaccard'):
+        """
+        Similarité de tous les utilisateurs avec `user_id`
+        metric: 'jaccard' (comme `get_user_similarity`) ou 'cosine'
+        """
+        with self._lock:
+            row = self.user_index.get(user_id)
+            if row is None or self._row_counts[row] <= 0:
+                return None, np.zeros(len(self.user_ids))
+
+            overlaps = self._overlaps(self._user_vector(row))
+            counts = self._row_counts[:len(self.user_ids)]
+
+            if metric == 'cosine':
+                denominator = np.sqrt(counts * counts[row])
+            else:
+                denominator = counts + counts[row] - overlaps
+
+            similarities = np.divide(overlaps, denominator, out=np.zeros_like(overlaps),
+                                     where=denominator > 0)
+            similarities[counts <= 0] = 0.0
+            return row, similarities
+
+    def similarity(self, user_id1, user_id2, metric='jaccard'):
+        """Similarité entre deux utilisateurs"""
+        row, similarities = self.similarities(user_id1, metric=metric)
+        other = self.user_index.get(user_id2)
+        if row is None or other is None:
+            return 0.0
+        return float(similarities[other])
+
+    def neighbours(self, user_id, limit=10, min_similarity=0.1, metric='jaccard'):
+        """Retourne les `limit` utilisateurs les plus similaires [(user_id, similarité)]"""
+        row, similarities = self.similarities(user_id, metric=metric)
+        if row is None:
+            return []
+
+        similarities[row] = 0.0
+        candidates = np.flatnonzero(similarities > min_similarity)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-similarities[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-similarities[candidates], kind='stable')]
+
+        return [(self.user_ids[r], float(similarities[r])) for r in candidates]
+
+    def score_items(self, neighbours):
+        """
+        Agrège les likes des voisins pondérés par leur similarité
+        Retourne un tableau de scores indexé par colonne de contenu
+        """
+        with self._lock:
+            scores = np.zeros(len(self.item_ids), dtype=np.float64)
+            if not neighbours:
+                return scores
+
+            rows = np.array([self.user_index[u] for u, _ in neighbours], dtype=np.int64)
+            weights = np.array([s for _, s in neighbours], dtype=np.float64)
+
+            base_rows, base_cols = self._base.shape
+            in_base = rows < base_rows
+            if in_base.any():
+                scores[:base_cols] = self._base[rows[in_base]].T @ weights[in_base]
+
+            for row, weight in zip(rows, weights):
+                for col, delta in self._pending.get(row, {}).items():
+                    scores[col] += delta * weight
+            return scores
+
+    def recommend(self, user_id, exclude_ids=(), limit=10, neighbours=10,
+                  min_similarity=0.1, metric='jaccard', is_candidate=None):
+        """
+        Recommandations collaboratives [(content_id, score)] pour un utilisateur
+        `is_candidate` permet de filtrer les contenus (ex: publiés uniquement)
+        """
+        similar_users = self.neighbours(user_id, limit=neighbours,
+                                        min_similarity=min_similarity, metric=metric)
+        scores = self.score_items(similar_users)
+
+        for content_id in exclude_ids:
+            col = self.item_index.get(content_id)
+            if col is not None:
+                scores[col] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        recommendations = []
+        for col in candidates:
+            if len(recommendations) >= limit:
+                break
+            content_id = self.item_ids[col]
+            if is_candidate is None or is_candidate(content_id):
+                recommendations.append((content_id, float(scores[col])))
+        return recommendations
+
+
+# Instance globale de la matrice (une par processus)
+like_matrix = None
+_matrix_lock = threading.Lock()
+
+def get_like_matrix():
+    """
+    Retourne la matrice de likes globale, construite au premier accès et
+    complétée par les likes des autres processus (INTERACTION_LOG_SYNC_INTERVAL)
+    """
+    global like_matrix
+    if like_matrix is None:
+        with _matrix_lock:
+            if like_matrix is None:
+                from flask import current_app
+                matrix = LikeMatrix(
+                    sync_interval=current_app.config.get('INTERACTION_LOG_SYNC_INTERVAL', 5),
+                    sync_overlap=current_app.config.get('INTERACTION_LOG_SYNC_OVERLAP', 30)
+                )
+                matrix.build()
+                like_matrix = matrix
+    like_matrix.sync()
+    return like_matrix
+
+@on_interaction(memory=True)
+def _update_like_matrix(user_id, content_id, interaction_type, added):
+    """Répercute les likes sur la matrice sans reconstruction"""
+    if interaction_type != 'like' or like_matrix is None:
+        return
+    if added:
+        like_matrix.add_like(user_id, content_id)
+    else:
+        like_matrix.remove_like(user_id, content_id)
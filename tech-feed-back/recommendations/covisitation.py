@@ -0,0 +1,244 @@
+"""
+Index de co-visitation item-à-item
+"Les utilisateurs qui ont aimé/consulté X ont aussi consulté Y" : chaque
+écriture d'interaction met à jour l'index en O(taille de l'historique
+récent de l'utilisateur), et les voisins d'un contenu sont une simple lecture.
+L'index est construit en tâche de fond depuis les interactions récentes, puis
+complété par les écritures de tous les processus (journal interaction_events).
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+
+from database import db
+from models.interaction import Interaction
+from recommendations.events import InteractionLogCursor, on_interaction
+
+logger = logging.getLogger(__name__)
+
+# Types d'interaction considérés comme un engagement positif
+ENGAGEMENT_TYPES = ('view', 'like', 'favorite', 'bookmark', 'share')
+
+
+class CoVisitationIndex:
+    """
+    Compteurs de co-visitation bornés par contenu
+
+    Chaque utilisateur garde un historique récent borné (`history_size`)
+    d'où partent les mises à jour ; chaque contenu garde au plus
+    `max_neighbours * 4` compteurs, élagués par le bas, et une liste
+    top-`max_neighbours` recalculée paresseusement. La construction rejoue
+    au plus `build_max_rows` interactions des `build_days` derniers jours ;
+    `sync` ajoute ensuite toutes les `sync_interval` secondes les écritures
+    de tous les processus.
+    """
+
+    def __init__(self, max_neighbours=50, history_size=200, build_days=30, build_max_rows=200000,
+                 sync_interval=5, sync_overlap=30):
+        self.max_neighbours = max_neighbours
+        self.history_size = history_size
+        self.build_days = build_days
+        self.build_max_rows = build_max_rows
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+        self._lock = threading.RLock()
+        self._cursor = None
+        self._reset()
+
+    def _reset(self):
+        """Vide l'index"""
+        self._histories = {}  # user_id -> OrderedDict(content_id -> set(types))
+        self._counts = defaultdict(dict)  # content_id -> {content_id: count}
+        self._top = {}  # content_id -> [(content_id, count)] (cache)
+        self.built = False
+
+    # ------------------------------------------------------------------
+    # Mises à jour
+    # ------------------------------------------------------------------
+
+    def _bump(self, content_id, other_id, delta):
+        counts = self._counts[content_id]
+        value = counts.get(other_id, 0) + delta
+        if value > 0:
+            counts[other_id] = value
+        else:
+            counts.pop(other_id, None)
+
+        # Élaguer les compteurs les plus faibles pour borner la mémoire
+        if len(counts) > self.max_neighbours * 4:
+            kept = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:self.max_neighbours * 2]
+            self._counts[content_id] = dict(kept)
+
+        self._top.pop(content_id, None)
+
+    def add(self, user_id, content_id, interaction_type):
+        """Enregistre un engagement et met à jour les paires co-visitées"""
+        if interaction_type not in ENGAGEMENT_TYPES:
+            return
+
+        with self._lock:
+            history = self._histories.setdefault(user_id, OrderedDict())
+            types = history.get(content_id)
+            if types is not None:
+                types.add(interaction_type)
+                history.move_to_end(content_id)
+                return
+
+            for other_id in history:
+                self._bump(content_id, other_id, 1)
+                self._bump(other_id, content_id, 1)
+
+            history[content_id] = {interaction_type}
+            if len(history) > self.history_size:
+                history.popitem(last=False)
+
+    def remove(self, user_id, content_id, interaction_type):
+        """Retire un engagement ; les paires ne sont retirées qu'au dernier type"""
+        with self._lock:
+            history = self._histories.get(user_id)
+            if not history or content_id not in history:
+                return
+
+            types = history[content_id]
+            types.discard(interaction_type)
+            if types:
+                return
+
+            del history[content_id]
+            for other_id in history:
+                self._bump(content_id, other_id, -1)
+                self._bump(other_id, content_id, -1)
+
+    def build(self):
+        """
+        Construit l'index depuis les interactions les plus récentes (au plus
+        `build_max_rows` sur `build_days` jours), rejouées dans l'ordre
+        """
+        started = time.perf_counter()
+        # Les écritures faites pendant la lecture sont relues par `sync`
+        cursor = InteractionLogCursor(datetime.utcnow(), overlap=self.sync_overlap,
+                                      interval=self.sync_interval)
+        rows = db.session.query(
+            Interaction.user_id, Interaction.content_id, Interaction.interaction_type
+        ).filter(
+            Interaction.interaction_type.in_(ENGAGEMENT_TYPES),
+            Interaction.created_at >= datetime.utcnow() - timedelta(days=self.build_days)
+        ).order_by(Interaction.created_at.desc()).limit(self.build_max_rows).all()
+
+        with self._lock:
+            self._reset()
+            for user_id, content_id, interaction_type in reversed(rows):
+                self.add(user_id, content_id, interaction_type)
+            self._cursor = cursor
+            self.built = True
+
+        logger.info(f"Index de co-visitation construit: {len(rows)} interactions, "
+                    f"{len(self._counts)} contenus en {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def sync(self):
+        """
+        Applique les engagements du journal écrits depuis la dernière lecture
+        (par ce processus ou un autre), si une lecture est due ; un
+        engagement déjà présent dans l'historique ne change rien
+        Retourne le nombre d'évènements lus
+        """
+        if self._cursor is None:
+            return 0
+        return self._cursor.sync(self._apply_event, types=ENGAGEMENT_TYPES)
+
+    def _apply_event(self, user_id, content_id, interaction_type, added, created_at):
+        if added:
+            self.add(user_id, content_id, interaction_type)
+        else:
+            self.remove(user_id, content_id, interaction_type)
+
+    def discard_content(self, content_id):
+        """Retire un contenu supprimé de l'index"""
+        with self._lock:
+            for other_id in self._counts.pop(content_id, {}):
+                self._counts.get(other_id, {}).pop(content_id, None)
+                self._top.pop(other_id, None)
+            self._top.pop(content_id, None)
+            for history in self._histories.values():
+                history.pop(content_id, None)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def neighbours(self, content_id):
+        """Top voisins co-visités d'un contenu [(content_id, count)]"""
+        top = self._top.get(content_id)
+        if top is None:
+            with self._lock:
+                counts = self._counts.get(content_id, {})
+                top = sorted(counts.items(), key=lambda x: (-x[1], x[0]))[:self.max_neighbours]
+                self._top[content_id] = top
+        return top
+
+
+# Instance globale de l'index (une par processus), index vide servi pendant
+# sa construction
+covisitation_index = None
+_empty_index = CoVisitationIndex()
+_index_lock = threading.Lock()
+_build_thread = None
+
+def _build_index(app):
+    """Construit l'index global (thread de fond)"""
+    global covisitation_index, _build_thread
+    with app.app_context():
+        try:
+            index = CoVisitationIndex(
+                max_neighbours=app.config.get('COVISITATION_MAX_NEIGHBOURS', 50),
+                history_size=app.config.get('COVISITATION_HISTORY_SIZE', 200),
+                build_days=app.config.get('COVISITATION_BUILD_DAYS', 30),
+                build_max_rows=app.config.get('COVISITATION_BUILD_MAX_ROWS', 200000),
+                sync_interval=app.config.get('INTERACTION_LOG_SYNC_INTERVAL', 5),
+                sync_overlap=app.config.get('INTERACTION_LOG_SYNC_OVERLAP', 30)
+            )
+            index.build()
+            covisitation_index = index
+        except Exception as e:
+            logger.warning(f"Erreur construction de l'index de co-visitation: {e}")
+            # Nouvel essai au prochain accès
+            _build_thread = None
+        finally:
+            db.session.remove()
+
+def get_covisitation_index(wait=False):
+    """
+    Retourne l'index de co-visitation global
+    Au premier accès, l'index est construit dans un thread de fond (sauf si
+    COVISITATION_BACKGROUND_BUILD est faux) et un index vide est retourné en
+    attendant ; `wait=True` attend la fin de la construction
+    """
+    global _build_thread
+    if covisitation_index is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+        with _index_lock:
+            if covisitation_index is None and _build_thread is None:
+                _build_thread = threading.Thread(target=_build_index, args=(app,),
+                                                 name='covisitation-build', daemon=True)
+                _build_thread.start()
+            thread = _build_thread
+        if thread is not None and (wait or not app.config.get('COVISITATION_BACKGROUND_BUILD', True)):
+            thread.join()
+        if covisitation_index is None:
+            return _empty_index
+    covisitation_index.sync()
+    return covisitation_index
+
+@on_interaction(memory=True)
+def _update_covisitation_index(user_id, content_id, interaction_type, added):
+    """Répercute chaque écriture d'interaction sur l'index"""
+    if covisitation_index is None:
+        return
+    if added:
+        covisitation_index.add(user_id, content_id, interaction_type)
+    else:
+        covisitation_index.remove(user_id, content_id, interaction_type)
@@ -0,0 +1,23 @@
+"""
+Budget de temps des calculs de recommandations
+Le moteur vérifie l'échéance entre ses étapes ; une fois dépassée, il sert le
+meilleur classement partiel disponible ou une liste de repli (tendances,
+populaires) et signale la réponse comme dégradée
+"""
+
+import time
+
+
+class Deadline:
+    """Échéance d'un calcul, `budget_ms` millisecondes après sa création"""
+
+    def __init__(self, budget_ms):
+        self.budget_ms = budget_ms
+        self.expires_at = time.perf_counter() + budget_ms / 1000
+
+    def remaining_ms(self):
+        """Temps restant (0 une fois l'échéance passée)"""
+        return max(0.0, (self.expires_at - time.perf_counter()) * 1000)
+
+    def expired(self):
+        return time.perf_counter() >= self.expires_at
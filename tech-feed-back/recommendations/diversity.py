@@ -0,0 +1,85 @@
+"""
+Diversification des recommandations par pertinence marginale maximale (MMR)
+Chaque contenu est sélectionné pour sa pertinence, pénalisée par sa plus
+forte similarité (cosinus sur les termes catégorie + tags) avec les contenus
+déjà retenus ; un plafond par catégorie borne en plus la part de chacune
+"""
+
+import numpy as np
+
+
+def mmr_rerank(relevance, term_rows, category_codes, limit, lambda_=0.7, max_per_category=None):
+    """
+    Réordonne des candidats par MMR
+
+    relevance: scores de pertinence (n,)
+    term_rows: matrice creuse CSR binaire (n × termes) des candidats
+    category_codes: code de catégorie de chaque candidat (n,)
+    Retourne les indices (dans les candidats) des `limit` contenus retenus,
+    dans l'ordre de sélection. Le plafond par catégorie est levé si les
+    candidats restants ne suffisent pas à atteindre `limit`.
+    """
+    n = len(relevance)
+    limit = min(limit, n)
+    if limit <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Pertinence ramenée dans [0, 1] pour être comparable aux similarités
+    relevance = np.asarray(relevance, dtype=np.float64)
+    low, high = relevance.min(), relevance.max()
+    relevance = (relevance - low) / (high - low) if high > low else np.zeros(n)
+    weighted_relevance = lambda_ * relevance
+    penalty = 1 - lambda_
+
+    # Normes des vecteurs binaires et index inversé terme -> candidats
+    row_pointers, row_terms = term_rows.indptr, term_rows.indices
+    term_counts = np.diff(row_pointers)
+    inverse_norms = np.divide(1.0, np.sqrt(term_counts), out=np.zeros(n),
+                              where=term_counts > 0)
+    term_columns = term_rows.tocsc()
+    column_pointers, column_rows = term_columns.indptr, term_columns.indices
+
+    # `values` = score MMR courant, -inf pour les candidats retenus ou plafonnés
+    max_similarity = np.zeros(n)
+    similarities = np.empty(n)
+    values = weighted_relevance.copy()
+    blocked = np.zeros(n, dtype=bool)
+    category_counts = {}
+    selected = np.empty(limit, dtype=np.int64)
+
+    for position in range(limit):
+        choice = int(values.argmax())
+        if values[choice] == -np.inf:
+            # Plafond atteint pour toutes les catégories restantes : on le lève
+            max_per_category = None
+            blocked[:] = False
+            blocked[selected[:position]] = True
+            np.subtract(weighted_relevance, penalty * max_similarity, out=values)
+            values[blocked] = -np.inf
+            choice = int(values.argmax())
+
+        selected[position] = choice
+        blocked[choice] = True
+
+        if max_per_category:
+            category = category_codes[choice]
+            category_counts[category] = category_counts.get(category, 0) + 1
+            if category_counts[category] >= max_per_category:
+                blocked |= category_codes == category
+
+        # Similarité cosinus du contenu retenu avec tous les candidats : nombre
+        # de termes communs (index inversé) normalisé
+        terms = row_terms[row_pointers[choice]:row_pointers[choice + 1]].tolist()
+        if terms:
+            sharing = np.concatenate([
+                column_rows[column_pointers[t]:column_pointers[t + 1]] for t in terms
+            ])
+            np.multiply(np.bincount(sharing, minlength=n), inverse_norms, out=similarities)
+            similarities *= inverse_norms[choice]
+            np.maximum(max_similarity, similarities, out=max_similarity)
+
+        np.multiply(max_similarity, -penalty, out=values)
+        values += weighted_relevance
+        values[blocked] = -np.inf
+
+    return selected
@@ -1,14 +1,36 @@
 from models.user import User
 from models.content import Content
 from models.interaction import Interaction
-from datetime import datetime, timedelta
-import random
+from models.user_recommendation import UserRecommendation
+from models.user_profile import UserProfile
+from models.recommendation_snapshot import RecommendationSnapshot
+from database import db
+from flask import current_app
+from recommendations.catalog import get_content_catalog, jitter_seed
+from recommendations.cache import LIMIT_BUCKETS, get_recommendation_cache, limit_bucket, user_version
+from recommendations.cohorts import cohort_key, cohort_seed, get_cohort_cache
+from recommendations.collaborative import get_like_matrix
+from recommendations.covisitation import get_covisitation_index
+from recommendations.tfidf import get_tfidf_index
+from recommendations.trending import get_trending_counters
+from recommendations.retrieval import (
+    CandidatePipeline, RetrievalContext, blend_scores, build_candidate_pipeline, get_retrieval_executor
+)
+from recommendations.diversity import mmr_rerank
+from recommendations.deadline import Deadline
+from recommendations.warmup import models_ready, start_warm_up
+from recommendations.sidecar import (
+    OP_COLLABORATIVE, OP_PERSONALIZED, OP_RELATED, OP_SIMILAR, OP_TRENDING,
+    SidecarUnavailable, get_sidecar_client
+)
 from collections import defaultdict
+import time
+import numpy as np
 
 class RecommendationEngine:
     """Moteur de recommandations pour TechFeed"""
     
-    def __init__(self):
+    def __init__(self, budget_ms=None):
         self.interaction_weights = {
             'like': 3.0,
             'favorite': 3.0,
@@ -17,24 +39,107 @@ class RecommendationEngine:
             'share': 4.0,
             'dislike': -2.0
         }
+        
+        # Nombre de candidats conservés par le catalogue avant diversification
+        self.candidate_pool_factor = 5
+        
+        # Diversification MMR : poids de la pertinence face à la similarité,
+        # part maximale d'une catégorie dans les résultats
+        self.mmr_lambda = current_app.config.get('MMR_LAMBDA', 0.7)
+        self.mmr_max_category_share = current_app.config.get('MMR_MAX_CATEGORY_SHARE', 1 / 3)
+        
+        # Âge maximal (secondes) d'un classement précalculé servi tel quel
+        self.materialized_max_age = current_app.config.get('PRECOMPUTED_RECOMMENDATIONS_MAX_AGE', 86400)
+        
+        # Origine du dernier classement personnalisé ('cache', 'cohort', 'materialized', 'live')
+        self.last_source = None
+        
+        # Profils de goûts déjà lus par cette instance (user_id -> UserProfile)
+        self._profiles = {}
+        
+        # Classement en deux étapes : générateurs de candidats bornés (en parallèle) puis
+        # scoring, mélangé aux scores des sources collaborative et tendances
+        self.two_stage = current_app.config.get('RECOMMENDATION_TWO_STAGE', True)
+        self.pipeline = build_candidate_pipeline(
+            current_app.config.get('RETRIEVAL_CANDIDATES'), executor=get_retrieval_executor()
+        )
+        self.blend_weights = current_app.config.get('RECOMMENDATION_BLEND_WEIGHTS')
+        
+        # Tailles et durées (ms) des étapes du dernier classement calculé
+        self.last_pipeline = {}
+        
+        # Classements figés pour la pagination par curseur (taille, durée de vie en secondes)
+        self.snapshot_size = current_app.config.get('RECOMMENDATION_SNAPSHOT_SIZE', 200)
+        self.snapshot_ttl = current_app.config.get('RECOMMENDATION_SNAPSHOT_TTL', 600)
+        
+        # Budget de temps des calculs (ms depuis la création du moteur, None = sans limite) ;
+        # `degraded` signale qu'un résultat partiel ou de repli a été servi
+        self.deadline = Deadline(budget_ms) if budget_ms else None
+        self.degraded = False
     
     def get_personalized_recommendations(self, user_id, limit=10):
         """
         Génère des recommandations personnalisées pour un utilisateur
         Combine content-based filtering et engagement metrics
         """
+        return self.load_contents(self.get_personalized_ranking(user_id, limit))
+    
+    def get_personalized_ranking(self, user_id, limit=10):
+        """
+        Identifiants classés des `limit` contenus recommandés à un utilisateur
+        """
+        # Classement servi par le processus recommandeur s'il est configuré
+        remote_ids = self._call_sidecar(OP_PERSONALIZED, user_id, limit, self._remaining_budget_ms())
+        if remote_ids is not None:
+            return remote_ids
+        
+        # Liste classée déjà calculée pour cet utilisateur
+        # (version de l'utilisateur lue une fois, avant calcul, et réutilisée pour la mise en cache)
+        cache = get_recommendation_cache()
+        version = cache.current_version(user_id)
+        cached_ids = cache.get(user_id, limit, version)
+        if cached_ids is not None:
+            self.last_source = 'cache'
+            return cached_ids
+        
         user = User.query.get(user_id)
         if not user:
             return []
         
+        if self._cold_start('warm_up'):
+            self.last_source = 'live'
+            return self._get_fallback_ids(limit)
+        
+        # Utilisateur sans interaction : classement partagé de sa cohorte de préférences
+        if not self._get_profiles([user_id])[user_id].interaction_count:
+            self.last_source = 'cohort'
+            ranked_ids = [
+                content_id for content_id, score in
+                self._get_cohort_ranking(user.get_preferences(), limit_bucket(limit))
+            ]
+            if not ranked_ids:
+                return self._get_popular_ids(limit)
+            cache.put(user_id, limit, ranked_ids, version)
+            return ranked_ids[:limit]
+        
+        # Classement précalculé par le job (table user_recommendations)
+        materialized_ids = self._get_materialized_recommendations(user, limit)
+        if materialized_ids is not None:
+            self.last_source = 'materialized'
+            cache.put(user_id, limit, materialized_ids[:limit_bucket(limit)], version)
+            return materialized_ids[:limit]
+        
+        self.last_source = 'live'
+        self.last_pipeline = {}
+        
         # Récupérer les préférences utilisateur
         user_preferences = user.get_preferences()
         
         # Récupérer les contenus déjà vus/aimés par l'utilisateur
-        viewed_content_ids = set()
-        user_interactions = Interaction.query.filter_by(user_id=user_id).all()
-        for interaction in user_interactions:
-            viewed_content_ids.add(interaction.content_id)
+        viewed_content_ids = {
+            content_id for (content_id,) in
+            db.session.query(Interaction.content_id).filter_by(user_id=user_id)
+        }
         
         # Analyser les préférences implicites basées sur les interactions récentes
         implicit_preferences = self._get_implicit_preferences(user_id)
@@ -42,291 +147,641 @@ class RecommendationEngine:
         # Combiner préférences explicites et implicites
         all_preferences = list(set(user_preferences + implicit_preferences))
         
-        # Récupérer tous les contenus disponibles (non vus)
-        available_contents = Content.query.filter(
-            Content.is_published == True,
-            ~Content.id.in_(viewed_content_ids)
-        ).all()
+        if self._over_budget('preferences'):
+            return self._get_fallback_ids(limit, exclude_ids=viewed_content_ids)
+        
+        catalog = get_content_catalog()
+        bucket = limit_bucket(limit)
+        
+        # Étape 1 : candidats bornés par source (ou tout le catalogue non vu)
+        started = time.perf_counter()
+        candidate_ids, source_scores = None, {}
+        if self.two_stage:
+            candidate_ids, sources, source_scores = self.pipeline.retrieve(
+                RetrievalContext(user_id, all_preferences, viewed_content_ids, catalog)
+            )
+            self.last_pipeline['sources'] = sources
+            self.last_pipeline['candidates'] = len(candidate_ids)
+        self.last_pipeline['retrieval_ms'] = self._elapsed_ms(started)
+        
+        if self._over_budget('retrieval'):
+            return self._get_fallback_ids(limit, exclude_ids=viewed_content_ids)
+        
+        # Étape 2 : scoring vectorisé des seuls candidats, mélangé aux scores des sources
+        started = time.perf_counter()
+        content_ids, scores = catalog.score(
+            all_preferences,
+            exclude_ids=viewed_content_ids,
+            preferred_difficulty=self._get_preferred_difficulty(user_id),
+            limit=self._scoring_limit(bucket, candidate_ids),
+            seed=jitter_seed(user_id),
+            candidate_ids=candidate_ids
+        )
+        content_scores = blend_scores(content_ids, scores, source_scores, self.blend_weights,
+                                      limit=bucket * self.candidate_pool_factor)
+        self.last_pipeline['ranked'] = len(content_scores)
+        self.last_pipeline['ranking_ms'] = self._elapsed_ms(started)
         
-        if not available_contents:
+        if len(content_scores) == 0:
             # Si pas de nouveaux contenus, récupérer les populaires
-            return Content.get_popular(limit=limit)
+            return self._get_popular_ids(limit)
         
-        # Calculer le score pour chaque contenu
-        content_scores = []
-        for content in available_contents:
-            score = self._calculate_content_score(content, all_preferences, user_id)
-            content_scores.append((content, score))
-        
-        # Trier par score décroissant
-        content_scores.sort(key=lambda x: x[1], reverse=True)
+        # Hors budget : classement par score, sans diversification (ni mise en cache)
+        if self._over_budget('ranking'):
+            return [content_id for content_id, score in content_scores[:limit]]
         
         # Diversifier les résultats (éviter trop de contenus de la même catégorie)
-        diversified_contents = self._diversify_recommendations(content_scores, limit)
+        started = time.perf_counter()
+        diversified = self._diversify_recommendations(content_scores, bucket, catalog=catalog)
+        self.last_pipeline['diversification_ms'] = self._elapsed_ms(started)
+        ranked_ids = [content_id for content_id, score in diversified[:bucket]]
+        cache.put(user_id, limit, ranked_ids, version)
         
-        return [content for content, score in diversified_contents[:limit]]
+        return ranked_ids[:limit]
     
-    def get_similar_content_recommendations(self, content_id, limit=5):
+    def get_personalized_page(self, user_id, limit=10, cursor=None):
         """
-        Recommande des contenus similaires à un contenu donné
+        Page de recommandations personnalisées parcourue par curseur
+        
+        Sans curseur, la page est le classement habituel à `limit` contenus
+        (cache, listes matérialisées, cohortes) et seuls ses contenus sont figés
+        (table recommendation_snapshots, expiration `snapshot_ttl`). Le premier
+        curseur complète ce classement jusqu'à `snapshot_size` contenus, à la
+        suite de la première page ; les suivants lisent la page suivante sans
+        recalcul, en retirant les contenus avec lesquels l'utilisateur a
+        interagi depuis. Retourne (contenus, curseur suivant ou None), ou None
+        si le classement du curseur a expiré ou a été purgé ; ValueError si le
+        curseur est invalide
         """
-        base_content = Content.query.get(content_id)
-        if not base_content:
-            return []
-        
-        # Récupérer les contenus de la même catégorie
-        similar_contents = Content.query.filter(
-            Content.id != content_id,
-            Content.is_published == True,
-            Content.category == base_content.category
-        ).all()
-        
-        # Si pas assez de contenus dans la même catégorie, élargir la recherche
-        if len(similar_contents) < limit:
-            base_tags = base_content.get_tags()
-            if base_tags:
-                # Recherche par tags (simulation simple)
-                additional_contents = Content.query.filter(
-                    Content.id != content_id,
-                    Content.is_published == True,
-                    Content.category != base_content.category
-                ).all()
-                
-                # Calculer la similarité par tags
-                tag_based = []
-                for content in additional_contents:
-                    content_tags = content.get_tags()
-                    common_tags = set(base_tags) & set(content_tags)
-                    if common_tags:
-                        similarity = len(common_tags) / len(set(base_tags + content_tags))
-                        tag_based.append((content, similarity))
+        if cursor is None:
+            ranked_ids = self.get_personalized_ranking(user_id, limit)
+            if len(ranked_ids) < limit:
+                return self.load_contents(ranked_ids), None
+            # Le classement complet n'est calculé que si l'utilisateur demande la suite
+            snapshot = RecommendationSnapshot.create(user_id, ranked_ids, self.snapshot_ttl)
+            return self.load_contents(ranked_ids), snapshot.cursor(len(ranked_ids))
+        
+        snapshot_id, offset = RecommendationSnapshot.decode_cursor(cursor)
+        snapshot = db.session.get(RecommendationSnapshot, snapshot_id)
+        if snapshot is not None and snapshot.user_id != user_id:
+            raise ValueError('Curseur invalide')
+        if snapshot is None or snapshot.is_expired():
+            return None
+        
+        ranked_ids = snapshot.get_content_ids()
+        if offset >= len(ranked_ids):
+            # Deuxième page : complète le classement figé à la suite de la première
+            ranked_ids = snapshot.extend(self.get_personalized_ranking(user_id, self.snapshot_size))
+        else:
+            self.last_source = 'snapshot'
+            self.last_pipeline = {}
+        page_ids, next_offset = self._next_snapshot_page(user_id, ranked_ids, offset, limit)
+        
+        next_cursor = snapshot.cursor(next_offset) if next_offset < len(ranked_ids) else None
+        return self.load_contents(page_ids), next_cursor
+    
+    def _next_snapshot_page(self, user_id, ranked_ids, offset, limit):
+        """
+        Lit `limit` contenus du classement à partir de `offset`, en sautant ceux
+        vus depuis sa création ou dépubliés (une requête par fenêtre lue)
+        Retourne (ids de la page, position suivante)
+        """
+        catalog = get_content_catalog()
+        page_ids = []
+        while len(page_ids) < limit and offset < len(ranked_ids):
+            window = ranked_ids[offset:offset + (limit - len(page_ids)) * 2]
+            seen_ids = {
+                content_id for (content_id,) in db.session.query(Interaction.content_id).filter(
+                    Interaction.user_id == user_id,
+                    Interaction.content_id.in_(window)
+                )
+            }
+            for content_id in window:
+                offset += 1
+                if content_id not in seen_ids and content_id in catalog.id_to_row:
+                    page_ids.append(content_id)
+                    if len(page_ids) == limit:
+                        break
+        return page_ids, offset
+    
+    def _get_popular_ids(self, limit):
+        return [content.id for content in Content.get_popular(limit=limit)]
+    
+    def _scoring_limit(self, count, candidate_ids):
+        """
+        Nombre de contenus à scorer : tous les candidats bornés (le mélange
+        avec les scores des sources peut faire remonter n'importe lequel),
+        sinon le vivier habituel avant diversification
+        """
+        if candidate_ids is None:
+            return count * self.candidate_pool_factor
+        return max(len(candidate_ids), count * self.candidate_pool_factor)
+    
+    def _remaining_budget_ms(self):
+        """Temps restant du budget en ms entières (0 = sans limite)"""
+        if self.deadline is None:
+            return 0
+        return max(1, int(self.deadline.remaining_ms()))
+    
+    def _over_budget(self, stage):
+        """
+        Vérifie le budget entre deux étapes ; s'il est dépassé, la réponse est
+        marquée dégradée et l'étape est notée dans `last_pipeline`
+        """
+        if self.deadline is None or not self.deadline.expired():
+            return False
+        self.degraded = True
+        self.last_pipeline['degraded_at'] = stage
+        return True
+    
+    def _cold_start(self, stage):
+        """
+        Sous budget, les structures en mémoire absentes ne sont pas construites
+        pendant la requête : leur construction est lancée en arrière-plan et la
+        réponse est marquée dégradée
+        """
+        if self.deadline is None or models_ready():
+            return False
+        start_warm_up(current_app._get_current_object())
+        self.degraded = True
+        self.last_pipeline['degraded_at'] = stage
+        return True
+    
+    def _get_fallback_ids(self, limit, exclude_ids=()):
+        """
+        Classement de repli d'un calcul hors budget, sans calcul par utilisateur :
+        tendances de la semaine (compteurs en mémoire, si construits) complétées
+        par les contenus les plus engageants (requête indexée)
+        """
+        fallback_ids = []
+        if models_ready():
+            catalog = get_content_catalog()
+            fallback_ids = [
+                content_id for content_id, score in
+                get_trending_counters().top(days=7, limit=limit, exclude_ids=exclude_ids)
+                if content_id in catalog.id_to_row
+            ]
+        if len(fallback_ids) < limit:
+            excluded = set(exclude_ids) | set(fallback_ids)
+            for content in Content.get_most_engaging(limit=limit * 2):
+                if content.id not in excluded:
+                    fallback_ids.append(content.id)
+                    if len(fallback_ids) == limit:
+                        break
+        return fallback_ids
+    
+    def recommend_many(self, user_ids, limit=10):
+        """
+        Génère les recommandations personnalisées d'une cohorte d'utilisateurs
+        
+        Les utilisateurs sont traités par lots : préférences, historiques et
+        niveaux préférés sont lus en quelques requêtes groupées, puis chaque
+        lot est scoré contre tout le catalogue en un seul produit matriciel,
+        sans génération de candidats par utilisateur (seules les tendances
+        sont mélangées au score de contenu).
+        Retourne {user_id: [content_id]} (classements aussi mis en cache).
+        """
+        cache = get_recommendation_cache()
+        bucket = limit_bucket(limit)
+        
+        results = {}
+        popular_ids = None
+        for users in self._iter_user_batches(user_ids):
+            versions = {user.id: user_version(user) for user in users} if cache.shared_versions else {}
+            for user_id, ranking in self._rank_many(users, bucket).items():
+                if not ranking:
+                    # Si pas de nouveaux contenus, récupérer les populaires
+                    if popular_ids is None:
+                        popular_ids = self._get_popular_ids(limit)
+                    results[user_id] = popular_ids
+                    continue
                 
-                tag_based.sort(key=lambda x: x[1], reverse=True)
-                similar_contents.extend([content for content, sim in tag_based[:limit-len(similar_contents)]])
+                ranked_ids = [content_id for content_id, score in ranking]
+                cache.put(user_id, limit, ranked_ids, versions.get(user_id))
+                results[user_id] = ranked_ids[:limit]
+        
+        return results
+    
+    def materialize_recommendations(self, user_ids, count=50):
+        """
+        Précalcule et stocke le top-`count` de chaque utilisateur dans la
+        table user_recommendations (une transaction par lot)
+        Retourne le nombre de classements écrits
+        """
+        written = 0
+        for users in self._iter_user_batches(user_ids):
+            rankings = {
+                user_id: ranking for user_id, ranking in self._rank_many(users, count).items()
+                if ranking
+            }
+            written += UserRecommendation.replace_many(
+                rankings,
+                preferences={user.id: user.preferences for user in users}
+            )
+        return written
+    
+    def warm_cohort(self, preferences):
+        """Calcule au besoin le classement de la cohorte (appelé à l'inscription)"""
+        self._get_cohort_ranking(preferences, max(LIMIT_BUCKETS))
+    
+    def refresh_cohorts(self):
+        """
+        Recalcule les cohortes lues depuis un changement du catalogue
+        Retourne le nombre de cohortes recalculées
+        """
+        cohorts = get_cohort_cache()
+        version = self._cohort_version()
+        stale = cohorts.stale_keys(version)
+        for key, count in stale:
+            cohorts.put(key, version, self._rank_cohort(key, count), count)
+        return len(stale)
+    
+    def _get_cohort_ranking(self, preferences, count):
+        """
+        Classement [(content_id, score)] partagé par les utilisateurs sans
+        interaction ayant ces préférences (au moins la plus grande tranche de
+        cache est calculée pour servir toutes les tailles de page)
+        """
+        cohorts = get_cohort_cache()
+        key = cohort_key(preferences)
+        ranking = cohorts.get(key, count)
+        if ranking is None:
+            stored_count = max(count, max(LIMIT_BUCKETS))
+            version = self._cohort_version()
+            ranking = self._rank_cohort(key, stored_count)
+            cohorts.put(key, version, ranking, stored_count)
+        return ranking[:count]
+    
+    @staticmethod
+    def _cohort_version():
+        # Le bruit de score change chaque jour, comme le catalogue
+        return get_content_catalog().version, int(time.time() // 86400)
+    
+    def _rank_cohort(self, key, count):
+        """Classe le catalogue pour une cohorte (préférences seules, aucun contenu exclu)"""
+        catalog = get_content_catalog()
+        preferences = list(key)
+        
+        candidate_ids, source_scores = None, {}
+        if self.two_stage:
+            candidate_ids, sources, source_scores = self.pipeline.retrieve(
+                RetrievalContext(None, preferences, set(), catalog)
+            )
+        
+        content_ids, scores = catalog.score(
+            preferences,
+            exclude_ids=set(),
+            preferred_difficulty=None,
+            limit=self._scoring_limit(count, candidate_ids),
+            seed=jitter_seed(cohort_seed(key)),
+            candidate_ids=candidate_ids
+        )
+        return self._diversify_recommendations(
+            blend_scores(content_ids, scores, source_scores, self.blend_weights,
+                         limit=count * self.candidate_pool_factor),
+            count, catalog=catalog
+        )[:count]
+    
+    def _iter_user_batches(self, user_ids):
+        """
+        Découpe une liste d'utilisateurs en lots chargés en une requête
+        La taille des lots borne la matrice dense utilisateurs × contenus
+        """
+        batch_size = max(1, min(500, 5_000_000 // max(len(get_content_catalog()), 1)))
+        for start in range(0, len(user_ids), batch_size):
+            yield User.query.filter(User.id.in_(user_ids[start:start + batch_size])).all()
+    
+    def _rank_many(self, users, count):
+        """
+        Classe le catalogue pour un lot d'utilisateurs
+        Retourne {user_id: [(content_id, score)]} diversifié, limité à `count`
+        """
+        catalog = get_content_catalog()
         
-        # Trier par engagement pour les contenus similaires
-        similar_contents.sort(key=lambda x: x.get_engagement_score(), reverse=True)
+        # Utilisateurs sans interaction : classement de leur cohorte
+        profiles = self._get_profiles([user.id for user in users])
+        rankings = {
+            user.id: self._get_cohort_ranking(user.get_preferences(), count)
+            for user in users if not profiles[user.id].interaction_count
+        }
+        users = [user for user in users if user.id not in rankings]
+        if not users:
+            return rankings
+        user_ids = [user.id for user in users]
+        
+        implicit_preferences = self._get_implicit_preferences_many(user_ids)
+        preferred_difficulties = self._get_preferred_difficulty_many(user_ids)
+        
+        viewed_content_ids = defaultdict(set)
+        for user_id, content_id in db.session.query(
+            Interaction.user_id, Interaction.content_id
+        ).filter(Interaction.user_id.in_(user_ids)):
+            viewed_content_ids[user_id].add(content_id)
+        
+        preferences = [
+            list(set(user.get_preferences() + implicit_preferences.get(user.id, [])))
+            for user in users
+        ]
+        exclude_ids = [viewed_content_ids[user_id] for user_id in user_ids]
+        
+        # Pas de génération de candidats par utilisateur : le lot est scoré contre
+        # tout le catalogue en un produit matriciel ; seules les sources non
+        # personnalisées (tendances) sont mélangées, lues une fois par lot
+        source_scores = self._shared_source_scores(catalog)
+        
+        ranked = catalog.score_many(
+            preferences=preferences,
+            exclude_ids=exclude_ids,
+            preferred_difficulties=[preferred_difficulties.get(user_id) for user_id in user_ids],
+            seeds=[jitter_seed(user_id) for user_id in user_ids],
+            limit=count * self.candidate_pool_factor
+        )
         
-        return similar_contents[:limit]
+        for user_id, (content_ids, scores) in zip(user_ids, ranked):
+            diversified = self._diversify_recommendations(
+                blend_scores(content_ids, scores, source_scores, self.blend_weights,
+                             limit=count * self.candidate_pool_factor),
+                count, catalog=catalog
+            )
+            rankings[user_id] = diversified[:count]
+        return rankings
+    
+    def _shared_source_scores(self, catalog):
+        """
+        Scores normalisés des sources communes à tous les utilisateurs
+        (tendances) pour le classement par lots ; {} sans classement en deux étapes
+        """
+        if not self.two_stage:
+            return {}
+        shared = [generator for generator in self.pipeline.generators if generator.name == 'trending']
+        candidate_ids, sources, source_scores = CandidatePipeline(shared).retrieve(
+            RetrievalContext(None, [], set(), catalog)
+        )
+        return source_scores
+    
+    def _get_materialized_recommendations(self, user, limit):
+        """
+        Lit le classement précalculé d'un utilisateur s'il est à jour
+        Les contenus vus depuis le calcul ou dépubliés sont retirés ; retourne
+        None si le classement est absent, périmé ou trop court
+        """
+        materialized = UserRecommendation.query.get(user.id)
+        if not materialized or not materialized.is_fresh(user, self.materialized_max_age):
+            return None
+        
+        content_ids = materialized.get_content_ids()
+        seen_ids = {
+            content_id for (content_id,) in db.session.query(Interaction.content_id).filter(
+                Interaction.user_id == user.id,
+                Interaction.content_id.in_(content_ids)
+            )
+        }
+        catalog = get_content_catalog()
+        content_ids = [
+            content_id for content_id in content_ids
+            if content_id not in seen_ids and content_id in catalog.id_to_row
+        ]
+        
+        if len(content_ids) < limit:
+            return None
+        return content_ids
+    
+    def _call_sidecar(self, op, *values):
+        """
+        Délègue un classement au processus recommandeur partagé
+        Retourne les ids, ou None si aucun processus n'est configuré ou s'il ne
+        répond pas (le classement est alors calculé localement)
+        """
+        client = get_sidecar_client()
+        if client is None:
+            return None
+        try:
+            source, content_ids, degraded = client.call(op, *values)
+        except SidecarUnavailable as e:
+            current_app.logger.info(f"Calcul local des recommandations: {e}")
+            return None
+        self.last_source = source
+        self.last_pipeline = {}
+        self.degraded = self.degraded or degraded
+        return content_ids
+    
+    @staticmethod
+    def _elapsed_ms(started):
+        return round((time.perf_counter() - started) * 1000, 3)
+    
+    def load_contents(self, content_ids):
+        """
+        Charge des contenus en une seule requête en conservant l'ordre des ids
+        """
+        if not content_ids:
+            return []
+        
+        contents = Content.query.filter(Content.id.in_(content_ids)).all()
+        contents_dict = {c.id: c for c in contents}
+        return [contents_dict[content_id] for content_id in content_ids if content_id in contents_dict]
+    
+    def get_similar_content_recommendations(self, content_id, limit=5):
+        """
+        Recommande des contenus similaires à un contenu donné
+        """
+        similar_ids = self._call_sidecar(OP_SIMILAR, content_id, limit, self._remaining_budget_ms())
+        if similar_ids is None:
+            similar_ids = self.get_similar_content_ids(content_id, limit)
+        return self.load_contents(similar_ids)
+    
+    def get_similar_content_ids(self, content_id, limit=5):
+        """
+        Identifiants des contenus similaires à un contenu donné
+        Les voisins de co-visitation sont prioritaires, complétés si besoin
+        par les voisins TF-IDF précalculés
+        """
+        if self._cold_start('warm_up'):
+            return self._get_fallback_ids(limit, exclude_ids=[content_id])
+        
+        catalog = get_content_catalog()
+        
+        # Lecture directe des voisins co-visités (publiés uniquement)
+        similar_ids = [
+            other_id for other_id, count in get_covisitation_index().neighbours(content_id)
+            if other_id != content_id and other_id in catalog.id_to_row
+        ][:limit]
+        
+        # Hors budget : les seuls voisins co-visités
+        if len(similar_ids) < limit and not self._over_budget('covisitation'):
+            for other_id, similarity in get_tfidf_index().neighbours(content_id):
+                if len(similar_ids) >= limit:
+                    break
+                if other_id not in similar_ids and other_id in catalog.id_to_row:
+                    similar_ids.append(other_id)
+        
+        return similar_ids
+    
+    def get_related_content_recommendations(self, content_id, limit=5):
+        """
+        Contenus les plus proches d'un contenu (similarité TF-IDF précalculée)
+        """
+        related_ids = self._call_sidecar(OP_RELATED, content_id, limit, self._remaining_budget_ms())
+        if related_ids is None:
+            related_ids = self.get_related_content_ids(content_id, limit)
+        return self.load_contents(related_ids)
+    
+    def get_related_content_ids(self, content_id, limit=5):
+        """
+        Identifiants des contenus les plus proches d'un contenu (TF-IDF)
+        """
+        catalog = get_content_catalog()
+        related_ids = [
+            other_id for other_id, similarity in get_tfidf_index().neighbours(content_id)
+            if other_id in catalog.id_to_row
+        ]
+        return related_ids[:limit]
     
     def get_trending_recommendations(self, days=7, limit=10):
         """
         Récupère les contenus trending basés sur l'engagement récent
         """
+        trending_ids = self._call_sidecar(OP_TRENDING, days, limit, self._remaining_budget_ms())
+        if trending_ids is not None:
+            return self.load_contents(trending_ids)
         return Interaction.get_trending_content(limit=limit, days=days)
     
+    def get_trending_ids(self, days=7, limit=10):
+        """
+        Identifiants des contenus trending (compteurs en fenêtre glissante)
+        """
+        return [content_id for content_id, score in get_trending_counters().top(days=days, limit=limit)]
+    
     def get_popular_recommendations(self, limit=10, category=None):
         """
         Récupère les contenus populaires
         """
-        query = Content.query.filter_by(is_published=True)
-        
-        if category:
-            query = query.filter_by(category=category)
-        
-        # Tri par score d'engagement plutôt que juste les vues
-        contents = query.all()
-        contents.sort(key=lambda x: x.get_engagement_score(), reverse=True)
-        
-        return contents[:limit]
+        # Tri par score d'engagement stocké (index) plutôt que juste les vues
+        return Content.get_most_engaging(limit=limit, category=category)
     
     def get_category_recommendations(self, category, limit=10, sort_by='recent'):
         """
         Récupère les recommandations pour une catégorie
         """
+        if sort_by == 'engagement':
+            return Content.get_most_engaging(limit=limit, category=category)
+        
         query = Content.query.filter_by(category=category, is_published=True)
         
         if sort_by == 'popular':
-            contents = query.all()
-            contents.sort(key=lambda x: x.view_count, reverse=True)
-        elif sort_by == 'engagement':
-            contents = query.all()
-            contents.sort(key=lambda x: x.get_engagement_score(), reverse=True)
+            query = query.order_by(Content.view_count.desc(), Content.id)
         else:  # recent
-            contents = query.order_by(Content.created_at.desc()).limit(limit).all()
+            query = query.order_by(Content.created_at.desc())
         
-        return contents[:limit]
+        return query.limit(limit).all()
     
-    def _get_implicit_preferences(self, user_id, days=30):
+    def _get_profiles(self, user_ids):
         """
-        Analyse les interactions récentes pour déduire les préférences
+        Profils de goûts {user_id: UserProfile}, lus une fois par instance
         """
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Récupérer les interactions récentes positives
-        recent_interactions = Interaction.query.filter(
-            Interaction.user_id == user_id,
-            Interaction.created_at >= cutoff_date,
-            Interaction.interaction_type.in_(['like', 'favorite', 'bookmark', 'view'])
-        ).all()
-        
-        # Compter les catégories par poids d'interaction
-        category_scores = defaultdict(float)
-        
-        for interaction in recent_interactions:
-            content = Content.query.get(interaction.content_id)
-            if content:
-                weight = self.interaction_weights.get(interaction.interaction_type, 1.0)
-                category_scores[content.category] += weight
-        
-        # Retourner les top catégories
-        sorted_categories = sorted(category_scores.items(), key=lambda x: x[1], reverse=True)
-        return [category for category, score in sorted_categories[:3]]
+        missing = [user_id for user_id in user_ids if user_id not in self._profiles]
+        if missing:
+            self._profiles.update(UserProfile.get_many(missing))
+        return {user_id: self._profiles[user_id] for user_id in user_ids if user_id in self._profiles}
     
-    def _calculate_content_score(self, content, user_preferences, user_id):
+    def _get_implicit_preferences(self, user_id):
         """
-        Calcule un score de pertinence pour un contenu donné un utilisateur
+        Top catégories du profil de goûts (poids décroissants avec l'âge)
         """
-        score = 0.0
-        
-        # 1. Score basé sur les préférences (content-based)
-        content_tags = [content.category] + content.get_tags()
-        preference_matches = len(set(content_tags) & set(user_preferences))
-        preference_score = preference_matches * 2.0
-        
-        # 2. Score d'engagement global du contenu
-        engagement_score = content.get_engagement_score() * 0.1
-        
-        # 3. Bonus pour les contenus récents
-        days_old = (datetime.utcnow() - content.created_at).days
-        recency_bonus = max(0, 1 - (days_old / 30)) * 0.5  # Bonus dégressif sur 30 jours
-        
-        # 4. Bonus pour la difficulté appropriée (basé sur l'historique)
-        difficulty_bonus = self._calculate_difficulty_bonus(content, user_id)
-        
-        # 5. Bonus pour les contenus featured
-        featured_bonus = 0.5 if content.is_featured else 0
-        
-        # Score final
-        score = preference_score + engagement_score + recency_bonus + difficulty_bonus + featured_bonus
-        
-        # Ajouter un peu de randomness pour éviter la stagnation
-        score += random.uniform(-0.1, 0.1)
-        
-        return score
+        return self._get_implicit_preferences_many([user_id]).get(user_id, [])
     
-    def _calculate_difficulty_bonus(self, content, user_id):
+    def _get_implicit_preferences_many(self, user_ids):
         """
-        Calcule un bonus basé sur l'adéquation du niveau de difficulté
+        Version groupée de `_get_implicit_preferences`
+        Retourne {user_id: [top catégories]}
         """
-        if not content.difficulty_level:
-            return 0
-        
-        # Analyser l'historique de l'utilisateur pour déterminer son niveau préféré
-        user_interactions = Interaction.query.filter_by(
-            user_id=user_id,
-            interaction_type='like'
-        ).limit(20).all()
-        
-        difficulty_counts = defaultdict(int)
-        for interaction in user_interactions:
-            interacted_content = Content.query.get(interaction.content_id)
-            if interacted_content and interacted_content.difficulty_level:
-                difficulty_counts[interacted_content.difficulty_level] += 1
-        
-        # Si l'utilisateur a une préférence claire, donner un bonus
-        if difficulty_counts:
-            preferred_difficulty = max(difficulty_counts.items(), key=lambda x: x[1])[0]
-            if content.difficulty_level == preferred_difficulty:
-                return 0.3
-        
-        return 0
+        return {
+            user_id: profile.top_categories(3)
+            for user_id, profile in self._get_profiles(user_ids).items()
+        }
+    
+    def _get_preferred_difficulty(self, user_id):
+        """
+        Niveau de difficulté le plus aimé d'après le profil de goûts
+        """
+        return self._get_preferred_difficulty_many([user_id]).get(user_id)
+    
+    def _get_preferred_difficulty_many(self, user_ids):
+        """
+        Version groupée de `_get_preferred_difficulty`
+        Retourne {user_id: niveau préféré}
+        """
+        return {
+            user_id: profile.preferred_difficulty()
+            for user_id, profile in self._get_profiles(user_ids).items()
+        }
     
-    def _diversify_recommendations(self, content_scores, limit):
+    def _diversify_recommendations(self, content_scores, limit, catalog=None):
         """
         Diversifie les recommandations pour éviter trop de contenus similaires
+        Ré-ordonnancement MMR (pertinence vs similarité catégorie/tags avec
+        les contenus déjà retenus) avec un plafond de contenus par catégorie ;
+        `content_scores` est une liste [(content_id, score)] triée
         """
         if len(content_scores) <= limit:
             return content_scores
         
-        diversified = []
-        category_counts = defaultdict(int)
-        max_per_category = max(1, limit // 3)  # Maximum 1/3 des résultats par catégorie
-        
-        # Première passe : sélectionner en respectant la diversité
-        for content, score in content_scores:
-            if len(diversified) >= limit:
-                break
-            
-            if category_counts[content.category] < max_per_category:
-                diversified.append((content, score))
-                category_counts[content.category] += 1
-        
-        # Deuxième passe : remplir les places restantes avec les meilleurs scores
-        if len(diversified) < limit:
-            remaining = [cs for cs in content_scores if cs not in diversified]
-            diversified.extend(remaining[:limit - len(diversified)])
-        
-        return diversified
+        catalog = catalog or get_content_catalog()
+        present, term_rows, category_codes = catalog.candidate_features(
+            [content_id for content_id, score in content_scores]
+        )
+        content_scores = [cs for cs, keep in zip(content_scores, present) if keep]
+        
+        max_per_category = max(1, int(limit * self.mmr_max_category_share))
+        selected = mmr_rerank(
+            np.fromiter((score for content_id, score in content_scores), dtype=np.float64,
+                        count=len(content_scores)),
+            term_rows,
+            category_codes,
+            limit,
+            lambda_=self.mmr_lambda,
+            max_per_category=max_per_category
+        )
+        return [content_scores[i] for i in selected]
     
     def get_user_similarity(self, user_id1, user_id2):
         """
         Calcule la similarité entre deux utilisateurs (pour le filtrage collaboratif)
         """
-        user1_interactions = set()
-        user2_interactions = set()
-        
-        # Récupérer les contenus aimés par chaque utilisateur
-        for interaction in Interaction.query.filter_by(user_id=user_id1, interaction_type='like').all():
-            user1_interactions.add(interaction.content_id)
-        
-        for interaction in Interaction.query.filter_by(user_id=user_id2, interaction_type='like').all():
-            user2_interactions.add(interaction.content_id)
-        
-        # Calculer la similarité Jaccard
-        if not user1_interactions or not user2_interactions:
-            return 0.0
-        
-        intersection = len(user1_interactions & user2_interactions)
-        union = len(user1_interactions | user2_interactions)
-        
-        return intersection / union if union > 0 else 0.0
+        return get_like_matrix().similarity(user_id1, user_id2)
     
     def get_collaborative_recommendations(self, user_id, limit=10):
         """
         Recommandations basées sur le filtrage collaboratif (utilisateurs similaires)
         """
-        # Trouver les utilisateurs similaires
-        all_users = User.query.filter(User.id != user_id).all()
-        similar_users = []
-        
-        for user in all_users:
-            similarity = self.get_user_similarity(user_id, user.id)
-            if similarity > 0.1:  # Seuil minimum de similarité
-                similar_users.append((user, similarity))
-        
-        # Trier par similarité
-        similar_users.sort(key=lambda x: x[1], reverse=True)
-        
-        # Récupérer les contenus aimés par les utilisateurs similaires
-        viewed_content_ids = set()
-        user_interactions = Interaction.query.filter_by(user_id=user_id).all()
-        for interaction in user_interactions:
-            viewed_content_ids.add(interaction.content_id)
-        
-        recommended_content_ids = defaultdict(float)
-        
-        for similar_user, similarity in similar_users[:10]:  # Top 10 utilisateurs similaires
-            liked_interactions = Interaction.query.filter_by(
-                user_id=similar_user.id,
-                interaction_type='like'
-            ).all()
-            
-            for interaction in liked_interactions:
-                if interaction.content_id not in viewed_content_ids:
-                    recommended_content_ids[interaction.content_id] += similarity
-        
-        # Trier et récupérer les contenus
-        sorted_recommendations = sorted(
-            recommended_content_ids.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
+        collaborative_ids = self._call_sidecar(OP_COLLABORATIVE, user_id, limit, self._remaining_budget_ms())
+        if collaborative_ids is None:
+            collaborative_ids = self.get_collaborative_ids(user_id, limit)
+        return self.load_contents(collaborative_ids)
+    
+    def get_collaborative_ids(self, user_id, limit=10):
+        """
+        Identifiants recommandés par filtrage collaboratif
+        Les voisins sont calculés en un seul produit matrice-vecteur creux
+        """
+        # Contenus déjà vus/aimés par l'utilisateur
+        viewed_content_ids = {
+            content_id for (content_id,) in
+            db.session.query(Interaction.content_id).filter_by(user_id=user_id)
+        }
         
-        recommended_contents = []
-        for content_id, score in sorted_recommendations[:limit]:
-            content = Content.query.get(content_id)
-            if content and content.is_published:
-                recommended_contents.append(content)
+        if self._over_budget('history') or self._cold_start('warm_up'):
+            return self._get_fallback_ids(limit, exclude_ids=viewed_content_ids)
+        
+        # Top 10 utilisateurs similaires (seuil minimum de similarité 0.1),
+        # seuls les contenus publiés du catalogue sont retenus
+        catalog = get_content_catalog()
+        recommendations = get_like_matrix().recommend(
+            user_id,
+            exclude_ids=viewed_content_ids,
+            limit=limit,
+            neighbours=10,
+            min_similarity=0.1,
+            is_candidate=lambda content_id: content_id in catalog.id_to_row
+        )
         
-        return recommended_contents 
\ No newline at end of file
+        return [content_id for content_id, score in recommendations]
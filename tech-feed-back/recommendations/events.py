@@ -0,0 +1,152 @@
+"""
+Notifications des écritures d'interactions
+Permet aux index en mémoire du moteur de recommandations de se mettre à jour
+à chaque écriture, sans relire la table des interactions. Les notifications
+ne couvrent que les écritures du processus : les écritures des autres
+workers sont relues dans le journal interaction_events (InteractionLogCursor).
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Listeners appelés avec (user_id, content_id, interaction_type, added)
+_interaction_listeners = []
+
+# Listeners appelés avec (user_id) quand le profil (préférences) change
+_user_listeners = []
+
+# Listeners qui ne modifient que l'état en mémoire du processus : seuls
+# rejoués par le processus recommandeur pour les écritures que les workers
+# lui transmettent (les écritures en base sont déjà faites par le worker)
+_memory_listeners = set()
+
+def _register(listeners, listener, memory):
+    if listener not in listeners:
+        listeners.append(listener)
+    if memory:
+        _memory_listeners.add(listener)
+    return listener
+
+def _notify(listeners, kind, args, memory_only):
+    for listener in listeners:
+        if memory_only and listener not in _memory_listeners:
+            continue
+        try:
+            listener(*args)
+        except Exception as e:
+            logger.warning(f"Erreur listener {kind} {listener.__name__}: {e}")
+
+def on_interaction(listener=None, memory=False):
+    """
+    Enregistre un listener d'écriture d'interaction (utilisable en décorateur,
+    `@on_interaction(memory=True)` s'il ne modifie que l'état en mémoire)
+    """
+    if listener is None:
+        return lambda listener: _register(_interaction_listeners, listener, memory)
+    return _register(_interaction_listeners, listener, memory)
+
+def notify_interaction(user_id, content_id, interaction_type, added=True, memory_only=False):
+    """
+    Signale qu'une interaction a été ajoutée (added=True) ou supprimée
+    À appeler après le commit de l'écriture ; `memory_only` n'appelle que
+    les listeners en mémoire
+    """
+    _notify(_interaction_listeners, 'interaction', (user_id, content_id, interaction_type, added), memory_only)
+
+def on_user_update(listener=None, memory=False):
+    """Enregistre un listener de modification de profil utilisateur"""
+    if listener is None:
+        return lambda listener: _register(_user_listeners, listener, memory)
+    return _register(_user_listeners, listener, memory)
+
+def notify_user_update(user_id, memory_only=False):
+    """Signale que les préférences d'un utilisateur ont changé"""
+    _notify(_user_listeners, 'utilisateur', (user_id,), memory_only)
+
+
+class InteractionLogCursor:
+    """
+    Lecture incrémentale du journal interaction_events, écrit par tous les
+    processus
+
+    Chaque lecture reprend `overlap` secondes avant le dernier évènement lu,
+    pour les transactions validées après des évènements plus récents ; les
+    évènements déjà retournés dans cette marge sont ignorés (des évènements
+    identiques au même instant ne sont retournés qu'une fois). `due` limite
+    les lectures à une toutes les `interval` secondes (0 = à chaque appel).
+    """
+
+    def __init__(self, since, overlap=30, interval=5):
+        self.watermark = since
+        self.overlap = timedelta(seconds=overlap)
+        self.interval = interval
+        self._recent = deque()
+        self._recent_keys = set()
+        self._last_read = time.monotonic()
+        self._lock = threading.Lock()
+
+    def due(self):
+        """Vrai si la dernière lecture date de plus de `interval` secondes"""
+        return time.monotonic() - self._last_read >= self.interval
+
+    def _forget_before(self, created_at):
+        start = created_at - self.overlap
+        while self._recent and self._recent[0][-1] < start:
+            self._recent_keys.discard(self._recent.popleft())
+
+    def read(self, types=None, batch_size=10000):
+        """
+        Itère sur les nouveaux évènements (user_id, content_id,
+        interaction_type, added, created_at), par date croissante
+        """
+        self._last_read = time.monotonic()
+        query = self._query(self.watermark - self.overlap, types)
+        for row in query.yield_per(batch_size):
+            event = tuple(row)
+            if event in self._recent_keys:
+                continue
+            self._recent.append(event)
+            self._recent_keys.add(event)
+            if event[-1] > self.watermark:
+                self.watermark = event[-1]
+                self._forget_before(self.watermark)
+            yield event
+
+    def _query(self, since, types):
+        """Évènements écrits depuis `since`, par date croissante"""
+        from models.interaction_event import interaction_events
+
+        columns = interaction_events.c
+        query = db.session.query(
+            columns.user_id, columns.content_id, columns.interaction_type,
+            columns.added, columns.created_at
+        ).filter(columns.created_at >= since)
+        if types is not None:
+            query = query.filter(columns.interaction_type.in_(list(types)))
+        return query.order_by(columns.created_at)
+
+    def sync(self, apply, types=None):
+        """
+        Applique les nouveaux évènements avec `apply(user_id, content_id,
+        interaction_type, added, created_at)` si une lecture est due ; sans
+        attente si un autre thread lit déjà. Retourne le nombre d'évènements
+        """
+        if not self.due() or not self._lock.acquire(blocking=False):
+            return 0
+        count = 0
+        try:
+            for event in self.read(types):
+                apply(*event)
+                count += 1
+        except Exception as e:
+            logger.warning(f"Erreur lecture du journal des interactions: {e}")
+        finally:
+            self._lock.release()
+        return count
@@ -0,0 +1,171 @@
+"""
+Rafraîchissement asynchrone des recommandations d'un utilisateur
+`POST /api/recommendation/refresh` enregistre un job (table refresh_jobs) et
+rend la main ; le recalcul (préférences implicites fusionnées, invalidation
+des caches, nouveau classement) s'exécute dans un pool de threads. Les
+demandes répétées pendant un job ou dans la fenêtre d'anti-rebond sont
+rattachées au job existant ; l'index unique des jobs en attente garantit
+un seul job par utilisateur, quel que soit le processus qui le reçoit.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models.interaction import Interaction
+from models.refresh_job import RefreshJob
+from models.user import User
+from recommendations.events import notify_user_update
+
+logger = logging.getLogger(__name__)
+
+# Nombre de recommandations retournées dans le résultat d'un rafraîchissement
+REFRESH_LIMIT = 20
+
+
+def refresh_user(user_id):
+    """
+    Fusionne les préférences implicites récentes dans les préférences de
+    l'utilisateur, invalide ses caches et recalcule son classement
+    Retourne le résultat stocké dans le job
+    """
+    from recommendations.cache import LIMIT_BUCKETS
+    from recommendations.engine import RecommendationEngine
+
+    user = User.query.get(user_id)
+    if not user:
+        raise ValueError('Utilisateur non trouvé')
+
+    # Analyser les préférences récentes basées sur les interactions
+    recent_preferences = Interaction.get_user_preferences_from_interactions(
+        user_id=user_id,
+        limit_days=30
+    )
+
+    # Mettre à jour les préférences si nécessaire
+    if recent_preferences['categories']:
+        # Combiner les préférences explicites et implicites
+        explicit_prefs = user.get_preferences()
+        implicit_prefs = recent_preferences['categories']
+
+        # Merge intelligemment (garder les préférences explicites et ajouter les nouvelles implicites)
+        updated_prefs = list(set(explicit_prefs + implicit_prefs[:3]))  # Top 3 nouvelles
+
+        if updated_prefs != explicit_prefs:
+            user.set_preferences(updated_prefs)
+            db.session.commit()
+
+    # Invalider les recommandations en cache pour forcer le recalcul
+    notify_user_update(user_id)
+
+    # Générer de nouvelles recommandations, mises en cache dans la plus grande
+    # tranche : elle sert les premières pages de /for-you de toute taille
+    recommendation_ids = RecommendationEngine().get_personalized_ranking(user_id, limit=max(LIMIT_BUCKETS))
+
+    return {
+        'updated_preferences': user.get_preferences(),
+        'recommendation_ids': recommendation_ids[:REFRESH_LIMIT],
+        'analysis': {
+            'recent_categories': recent_preferences['categories'],
+            'recent_tags': recent_preferences['tags']
+        }
+    }
+
+
+def _run_job(app, job_id):
+    """Exécute un job dans un thread du pool (contexte et session propres)"""
+    with app.app_context():
+        try:
+            job = db.session.get(RefreshJob, job_id)
+            if job is None:
+                return
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            db.session.commit()
+
+            try:
+                job.set_result(refresh_user(job.user_id))
+                job.status = 'done'
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Erreur rafraîchissement utilisateur {job.user_id}: {e}")
+                job.status = 'failed'
+                job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+
+# Pool des jobs de rafraîchissement (un par processus)
+refresh_executor = None
+_executor_lock = threading.Lock()
+
+def get_refresh_executor():
+    """Retourne le pool de threads des jobs de rafraîchissement"""
+    global refresh_executor
+    if refresh_executor is None:
+        with _executor_lock:
+            if refresh_executor is None:
+                from flask import current_app
+                refresh_executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get('REFRESH_WORKERS', 2),
+                    thread_name_prefix='refresh'
+                )
+    return refresh_executor
+
+
+def _warm_cohort(app, preferences):
+    """Calcule le classement d'une cohorte dans un thread du pool"""
+    from recommendations.engine import RecommendationEngine
+
+    with app.app_context():
+        try:
+            RecommendationEngine().warm_cohort(preferences)
+        except Exception as e:
+            logger.warning(f"Erreur calcul de la cohorte {preferences}: {e}")
+        finally:
+            db.session.remove()
+
+
+def enqueue_cohort_warm_up(preferences):
+    """
+    Prépare hors requête le classement de la cohorte de préférences d'un
+    nouvel inscrit (premier fil d'actualité), dans le pool des rafraîchissements
+    """
+    from flask import current_app
+
+    get_refresh_executor().submit(_warm_cohort, current_app._get_current_object(), list(preferences))
+
+
+def enqueue_refresh(user_id):
+    """
+    Planifie le rafraîchissement d'un utilisateur
+    Retourne (job, created) : created vaut False si la demande est rattachée
+    à un job en attente, en cours ou terminé dans la fenêtre d'anti-rebond
+    """
+    from flask import current_app
+
+    debounce = current_app.config.get('REFRESH_DEBOUNCE_SECONDS', 30)
+    timeout = current_app.config.get('REFRESH_JOB_TIMEOUT', 300)
+    job = RefreshJob.find_reusable(user_id, debounce, timeout)
+    if job is not None:
+        return job, False
+
+    # Les jobs abandonnés ne doivent pas bloquer l'index unique des jobs en attente
+    RefreshJob.expire_stale(user_id, timeout)
+    job = RefreshJob(user_id)
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Job créé entre-temps par une autre requête (ce processus ou un autre)
+        db.session.rollback()
+        return RefreshJob.find_reusable(user_id, debounce, timeout), False
+
+    get_refresh_executor().submit(_run_job, current_app._get_current_object(), job.id)
+    return job, True
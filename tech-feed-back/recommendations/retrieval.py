@@ -0,0 +1,255 @@
+"""
+Génération de candidats pour le classement en deux étapes
+Chaque générateur retourne au plus `limit` contenus non vus à partir d'une
+structure pré-triée (catalogue, matrice de likes, tendances) ; seuls les
+candidats fusionnés sont ensuite scorés, ce qui garde une latence stable
+quand le catalogue grandit. Les générateurs s'exécutent en parallèle dans un
+pool de threads partagé : la latence de l'étape est celle de la source la
+plus lente. Les sources qui notent leurs candidats (filtrage collaboratif,
+tendances) contribuent au score final avec un poids configurable.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from database import db
+from recommendations.collaborative import get_like_matrix
+from recommendations.trending import get_trending_counters
+
+# Nombre maximal de candidats par source (surchargé par RETRIEVAL_CANDIDATES)
+DEFAULT_CANDIDATE_LIMITS = {
+    'preferences': 300,
+    'collaborative': 100,
+    'trending': 100,
+    'fresh': 100,
+    'featured': 50
+}
+
+# Poids du score de contenu et des scores de source (normalisés dans [0, 1])
+# dans le score final (surchargés par RECOMMENDATION_BLEND_WEIGHTS)
+DEFAULT_BLEND_WEIGHTS = {
+    'content': 1.0,
+    'collaborative': 1.0,
+    'trending': 0.5
+}
+
+
+class RetrievalContext:
+    """Données d'un utilisateur partagées par les générateurs"""
+
+    def __init__(self, user_id, preferences, exclude_ids, catalog):
+        self.user_id = user_id
+        self.preferences = preferences
+        self.exclude_ids = exclude_ids
+        self.catalog = catalog
+
+
+class CandidateGenerator:
+    """Source de candidats bornée à `limit` contenus"""
+
+    name = None
+
+    # Les sources notées implémentent `generate_scored`
+    scored = False
+
+    def __init__(self, limit):
+        self.limit = limit
+
+    def generate(self, context):
+        """Retourne une liste d'ids de contenus candidats"""
+        if self.scored:
+            return [content_id for content_id, score in self.generate_scored(context)]
+        raise NotImplementedError
+
+    def generate_scored(self, context):
+        """Retourne [(content_id, score)] par score décroissant"""
+        raise NotImplementedError
+
+
+class PreferenceCandidates(CandidateGenerator):
+    """Contenus partageant une catégorie ou un tag avec les préférences"""
+
+    name = 'preferences'
+
+    def generate(self, context):
+        return context.catalog.term_candidates(
+            context.preferences, exclude_ids=context.exclude_ids, limit=self.limit
+        ).tolist()
+
+
+class CollaborativeCandidates(CandidateGenerator):
+    """Contenus aimés par les utilisateurs les plus proches (matrice de likes)"""
+
+    name = 'collaborative'
+    scored = True
+
+    def generate_scored(self, context):
+        if context.user_id is None:
+            return []
+        id_to_row = context.catalog.id_to_row
+        return get_like_matrix().recommend(
+            context.user_id,
+            exclude_ids=context.exclude_ids,
+            limit=self.limit,
+            is_candidate=lambda content_id: content_id in id_to_row
+        )
+
+
+class TrendingCandidates(CandidateGenerator):
+    """Contenus les plus engagés sur les derniers jours (compteurs en fenêtre glissante)"""
+
+    name = 'trending'
+    scored = True
+
+    def __init__(self, limit, days=7):
+        super().__init__(limit)
+        self.days = days
+
+    def generate_scored(self, context):
+        id_to_row = context.catalog.id_to_row
+        ranking = get_trending_counters().top(
+            days=self.days, limit=self.limit * 2, exclude_ids=context.exclude_ids)
+        return [(content_id, score) for content_id, score in ranking if content_id in id_to_row][:self.limit]
+
+
+class FreshCandidates(CandidateGenerator):
+    """Contenus les plus récents"""
+
+    name = 'fresh'
+
+    def generate(self, context):
+        return context.catalog.fresh_candidates(
+            exclude_ids=context.exclude_ids, limit=self.limit).tolist()
+
+
+class FeaturedCandidates(CandidateGenerator):
+    """Contenus mis en avant"""
+
+    name = 'featured'
+
+    def generate(self, context):
+        return context.catalog.featured_candidates(
+            exclude_ids=context.exclude_ids, limit=self.limit).tolist()
+
+
+GENERATORS = {
+    generator.name: generator for generator in (
+        PreferenceCandidates, CollaborativeCandidates, TrendingCandidates,
+        FreshCandidates, FeaturedCandidates
+    )
+}
+
+
+def _run_generator(generator, context):
+    """Exécute un générateur ; retourne (ids, scores ou None, durée en ms)"""
+    started = time.perf_counter()
+    if generator.scored:
+        scored = generator.generate_scored(context)
+        generated = [content_id for content_id, score in scored]
+        scores = [score for content_id, score in scored]
+    else:
+        generated, scores = generator.generate(context), None
+    return generated, scores, round((time.perf_counter() - started) * 1000, 3)
+
+
+def _run_generator_in_context(app, generator, context):
+    """Exécute un générateur dans un thread du pool (contexte et session propres)"""
+    with app.app_context():
+        try:
+            return _run_generator(generator, context)
+        finally:
+            db.session.remove()
+
+
+class CandidatePipeline:
+    """Exécute les générateurs (en parallèle avec `executor`) et fusionne leurs candidats"""
+
+    def __init__(self, generators, executor=None):
+        self.generators = generators
+        self.executor = executor
+
+    def retrieve(self, context):
+        """
+        Retourne (candidate_ids, stats, source_scores) où stats donne, par
+        source, le nombre de candidats produits et le temps passé (ms), et
+        source_scores les scores des sources notées {source: {content_id:
+        score}}, normalisés par le meilleur score de la source
+        """
+        if self.executor is None or len(self.generators) < 2:
+            results = [_run_generator(generator, context) for generator in self.generators]
+        else:
+            from flask import current_app
+            app = current_app._get_current_object()
+            futures = [self.executor.submit(_run_generator_in_context, app, generator, context)
+                       for generator in self.generators]
+            results = [future.result() for future in futures]
+
+        # Fusion dans l'ordre des générateurs : même résultat qu'une exécution séquentielle
+        candidate_ids = []
+        seen = set()
+        stats = {}
+        source_scores = {}
+        for generator, (generated, scores, elapsed_ms) in zip(self.generators, results):
+            new_ids = [content_id for content_id in generated if content_id not in seen]
+            seen.update(new_ids)
+            candidate_ids.extend(new_ids)
+            stats[generator.name] = {
+                'candidates': len(generated),
+                'new': len(new_ids),
+                'ms': elapsed_ms
+            }
+            if scores:
+                best = max(scores)
+                if best > 0:
+                    source_scores[generator.name] = {
+                        content_id: score / best for content_id, score in zip(generated, scores)
+                    }
+        return candidate_ids, stats, source_scores
+
+
+def blend_scores(content_ids, scores, source_scores, weights=None, limit=None):
+    """
+    Score final : score de contenu pondéré plus la somme pondérée des scores
+    de source (0 pour un contenu absent d'une source)
+    Retourne les `limit` meilleurs [(content_id, score)] par score décroissant
+    """
+    weights = DEFAULT_BLEND_WEIGHTS if weights is None else weights
+    blended = np.asarray(scores, dtype=np.float64) * weights.get('content', 1.0)
+    ids = content_ids.tolist() if isinstance(content_ids, np.ndarray) else list(content_ids)
+    for source, normalized in source_scores.items():
+        weight = weights.get(source, 0.0)
+        if weight:
+            blended = blended + weight * np.fromiter(
+                (normalized.get(content_id, 0.0) for content_id in ids), dtype=np.float64, count=len(ids))
+    order = np.argsort(-blended, kind='stable')[:limit]
+    return [(ids[i], float(blended[i])) for i in order]
+
+
+# Pool de threads partagé par les pipelines (un par processus)
+retrieval_executor = None
+_executor_lock = threading.Lock()
+
+def get_retrieval_executor():
+    """Retourne le pool des générateurs, ou None si RETRIEVAL_WORKERS vaut 0 (exécution séquentielle)"""
+    global retrieval_executor
+    if retrieval_executor is None:
+        from flask import current_app
+        workers = current_app.config.get('RETRIEVAL_WORKERS', 4)
+        if not workers:
+            return None
+        with _executor_lock:
+            if retrieval_executor is None:
+                retrieval_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='retrieval')
+    return retrieval_executor
+
+
+def build_candidate_pipeline(limits=None, executor=None):
+    """Construit le pipeline depuis {source: limite} (sources absentes ou à 0 ignorées)"""
+    limits = DEFAULT_CANDIDATE_LIMITS if limits is None else limits
+    return CandidatePipeline([
+        GENERATORS[name](limit) for name, limit in limits.items()
+        if limit and name in GENERATORS
+    ], executor=executor)
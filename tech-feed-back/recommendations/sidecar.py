@@ -0,0 +1,295 @@
+"""
+Processus recommandeur partagé par les workers web d'un même hôte
+Le processus `recommender_server.py` garde en mémoire catalogue, profils et
+modèles (TF-IDF, co-visitation, likes, tendances) une seule fois par hôte ;
+les workers l'interrogent par socket Unix et ne chargent que les contenus
+renvoyés. Il accumule aussi les vues de contenus de tous les workers avant
+leur écriture groupée (view_buffer.py). Sans socket configurée
+(RECOMMENDER_SOCKET) ou si le processus ne répond pas, le moteur calcule
+localement.
+
+Protocole binaire (entiers non signés, ordre réseau), une connexion servant
+plusieurs requêtes successives :
+    requête : op (1 octet), n (1 octet), n entiers 32 bits
+    réponse : statut (1 octet), source (1 octet), n (4 octets), n ids 32 bits
+"""
+
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+from recommendations.events import notify_interaction, notify_user_update, on_interaction, on_user_update
+
+logger = logging.getLogger(__name__)
+
+# Opérations (arguments entre parenthèses ; budget en ms, 0 = sans limite)
+OP_PING = 0             # ()
+OP_PERSONALIZED = 1     # (user_id, limit, budget)
+OP_SIMILAR = 2          # (content_id, limit, budget)
+OP_RELATED = 3          # (content_id, limit, budget)
+OP_COLLABORATIVE = 4    # (user_id, limit, budget)
+OP_TRENDING = 5         # (days, limit, budget)
+OP_INTERACTION = 6      # (user_id, content_id, type, added)
+OP_USER_UPDATE = 7      # (user_id)
+OP_VIEW = 8             # (content_id, user_id ou 0) : vue à accumuler (view_buffer.py)
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+STATUS_DEGRADED = 2     # classement partiel ou de repli (budget dépassé)
+
+# Origine du classement renvoyé (indice transmis dans la réponse)
+SOURCES = (None, 'cache', 'cohort', 'materialized', 'live', 'snapshot')
+
+# Codes des types d'interaction transmis par OP_INTERACTION
+INTERACTION_TYPES = ('view', 'like', 'dislike', 'favorite', 'share', 'bookmark')
+
+REQUEST_HEADER = struct.Struct('!BB')
+RESPONSE_HEADER = struct.Struct('!BBI')
+
+
+class SidecarUnavailable(Exception):
+    """Le processus recommandeur n'a pas pu répondre (calcul local à faire)"""
+
+
+def _recv_exact(sock, size):
+    """Lit exactement `size` octets ; EOFError si la connexion est fermée avant"""
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise EOFError('Connexion fermée')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def encode_request(op, values):
+    return REQUEST_HEADER.pack(op, len(values)) + struct.pack(f'!{len(values)}I', *values)
+
+
+def read_request(sock):
+    """Retourne (op, valeurs) de la prochaine requête"""
+    op, count = REQUEST_HEADER.unpack(_recv_exact(sock, REQUEST_HEADER.size))
+    return op, struct.unpack(f'!{count}I', _recv_exact(sock, 4 * count)) if count else ()
+
+
+def encode_response(status, source=None, ids=()):
+    return (RESPONSE_HEADER.pack(status, SOURCES.index(source), len(ids))
+            + struct.pack(f'!{len(ids)}I', *ids))
+
+
+def read_response(sock):
+    """Retourne (statut, source, ids) de la réponse"""
+    status, source, count = RESPONSE_HEADER.unpack(_recv_exact(sock, RESPONSE_HEADER.size))
+    ids = list(struct.unpack(f'!{count}I', _recv_exact(sock, 4 * count))) if count else []
+    return status, SOURCES[source] if source < len(SOURCES) else None, ids
+
+
+# ----------------------------------------------------------------------
+# Client (workers web)
+# ----------------------------------------------------------------------
+
+class SidecarClient:
+    """
+    Client du processus recommandeur avec pool de connexions
+    Après un échec, le processus est considéré indisponible pendant
+    `retry_interval` secondes : les requêtes échouent immédiatement et le
+    moteur calcule localement sans attendre de délai de connexion.
+    """
+
+    def __init__(self, path, pool_size=8, timeout=1.0, retry_interval=5.0):
+        self.path = path
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._down_until = 0.0
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _release(self, sock):
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+    def call(self, op, *values):
+        """
+        Exécute une opération ; retourne (source, ids, dégradé)
+        SidecarUnavailable si le processus est injoignable ou en erreur
+        """
+        if time.monotonic() < self._down_until:
+            raise SidecarUnavailable('Processus recommandeur indisponible')
+
+        request = encode_request(op, values)
+        while True:
+            # Une connexion du pool a pu être fermée par un redémarrage du
+            # processus : on réessaie alors une fois sur une connexion neuve
+            try:
+                sock, pooled = self._pool.get_nowait(), True
+            except queue.Empty:
+                sock, pooled = None, False
+            try:
+                if sock is None:
+                    sock = self._connect()
+                sock.sendall(request)
+                status, source, ids = read_response(sock)
+                break
+            except (OSError, EOFError, struct.error) as e:
+                if sock is not None:
+                    sock.close()
+                if pooled:
+                    continue
+                self._down_until = time.monotonic() + self.retry_interval
+                raise SidecarUnavailable(f'Processus recommandeur injoignable: {e}') from e
+
+        self._release(sock)
+        if status == STATUS_ERROR:
+            raise SidecarUnavailable('Erreur du processus recommandeur')
+        return source, ids, status == STATUS_DEGRADED
+
+    def close(self):
+        """Ferme les connexions du pool"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# Instance globale du client (une par processus)
+sidecar_client = None
+_client_lock = threading.Lock()
+
+def get_sidecar_client():
+    """Retourne le client du processus recommandeur, ou None s'il n'est pas configuré"""
+    global sidecar_client
+    from flask import current_app
+    path = current_app.config.get('RECOMMENDER_SOCKET')
+    if not path:
+        return None
+    if sidecar_client is None or sidecar_client.path != path:
+        with _client_lock:
+            if sidecar_client is None or sidecar_client.path != path:
+                sidecar_client = SidecarClient(
+                    path,
+                    pool_size=current_app.config.get('RECOMMENDER_POOL_SIZE', 8),
+                    timeout=current_app.config.get('RECOMMENDER_TIMEOUT', 1.0),
+                    retry_interval=current_app.config.get('RECOMMENDER_RETRY_INTERVAL', 5.0)
+                )
+    return sidecar_client
+
+
+@on_interaction
+def _forward_interaction(user_id, content_id, interaction_type, added):
+    """Répercute les écritures d'interactions sur l'état du processus recommandeur"""
+    from flask import has_app_context
+    client = get_sidecar_client() if has_app_context() else None
+    if client is None or interaction_type not in INTERACTION_TYPES:
+        return
+    try:
+        client.call(OP_INTERACTION, int(user_id), content_id,
+                    INTERACTION_TYPES.index(interaction_type), int(added))
+    except SidecarUnavailable as e:
+        logger.info(f"Interaction non transmise au processus recommandeur: {e}")
+
+@on_user_update
+def _forward_user_update(user_id):
+    """Répercute les changements de préférences sur le processus recommandeur"""
+    from flask import has_app_context
+    client = get_sidecar_client() if has_app_context() else None
+    if client is None:
+        return
+    try:
+        client.call(OP_USER_UPDATE, int(user_id))
+    except SidecarUnavailable as e:
+        logger.info(f"Mise à jour utilisateur non transmise au processus recommandeur: {e}")
+
+
+# ----------------------------------------------------------------------
+# Serveur (processus recommandeur)
+# ----------------------------------------------------------------------
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Sert les requêtes successives d'une connexion jusqu'à sa fermeture"""
+
+    def handle(self):
+        while True:
+            try:
+                op, values = read_request(self.request)
+            except (EOFError, OSError, struct.error):
+                return
+            self.request.sendall(self.server.dispatch(op, values))
+
+
+class SidecarServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serveur du processus recommandeur : un thread par connexion de worker"""
+
+    daemon_threads = True
+
+    def __init__(self, app, path):
+        self.app = app
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, _RequestHandler)
+        os.chmod(path, 0o660)
+
+    def dispatch(self, op, values):
+        """Exécute une opération et retourne la réponse encodée"""
+        from database import db
+        from recommendations.engine import RecommendationEngine
+
+        with self.app.app_context():
+            try:
+                if OP_PERSONALIZED <= op <= OP_TRENDING:
+                    *values, budget_ms = values
+                    engine = RecommendationEngine(budget_ms=budget_ms or None)
+                else:
+                    engine = RecommendationEngine()
+                if op == OP_PING:
+                    ids = []
+                elif op == OP_PERSONALIZED:
+                    ids = engine.get_personalized_ranking(*values)
+                elif op == OP_SIMILAR:
+                    ids = engine.get_similar_content_ids(*values)
+                elif op == OP_RELATED:
+                    ids = engine.get_related_content_ids(*values)
+                elif op == OP_COLLABORATIVE:
+                    ids = engine.get_collaborative_ids(*values)
+                elif op == OP_TRENDING:
+                    ids = engine.get_trending_ids(*values)
+                elif op == OP_INTERACTION:
+                    user_id, content_id, type_code, added = values
+                    # Écriture déjà faite par le worker : état en mémoire seulement
+                    notify_interaction(user_id, content_id, INTERACTION_TYPES[type_code], bool(added),
+                                       memory_only=True)
+                    ids = []
+                elif op == OP_USER_UPDATE:
+                    notify_user_update(*values, memory_only=True)
+                    ids = []
+                elif op == OP_VIEW:
+                    from view_buffer import buffer_view
+                    content_id, user_id = values
+                    buffer_view(content_id, user_id or None)
+                    ids = []
+                else:
+                    raise ValueError(f'Opération inconnue: {op}')
+                status = STATUS_DEGRADED if engine.degraded else STATUS_OK
+                return encode_response(status, engine.last_source, ids)
+            except Exception as e:
+                logger.warning(f"Erreur processus recommandeur (op {op}): {e}")
+                return encode_response(STATUS_ERROR)
+            finally:
+                db.session.remove()
@@ -0,0 +1,416 @@
+"""
+Index TF-IDF des contenus et voisins précalculés
+Chaque contenu publié est représenté par un vecteur TF-IDF (titre, extrait,
+tags, catégorie) ; les `top_k` voisins les plus proches sont précalculés,
+persistés sur disque et mis à jour incrémentalement lors des écritures admin.
+L'index persisté est un artefact versionné (`recommendations/artifacts.py`)
+projeté en mémoire et partagé par les workers, qui rechargent la version
+publiée par un autre processus ; une mise à jour repart de la dernière
+version publiée, sous le verrou du répertoire.
+"""
+
+import logging
+import os
+import threading
+import time
+import zlib
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from models.content import Content
+from recommendations.artifacts import (
+    ArtifactWatcher, artifact_lock, current_version, open_artifact, write_artifact
+)
+
+logger = logging.getLogger(__name__)
+
+
+def content_text(content):
+    """Texte indexé pour un contenu (tags et catégorie renforcés)"""
+    terms = [content.category or ''] + content.get_tags()
+    terms = ' '.join(term.replace('-', '_').replace(' ', '_') for term in terms if term)
+    return ' '.join([content.title or '', content.excerpt or '', terms, terms])
+
+
+class TfidfIndex:
+    """
+    Vecteurs TF-IDF et liste des `top_k` voisins de chaque contenu
+
+    Le vocabulaire et les IDF sont figés à la reconstruction complète ; les
+    contenus créés ou modifiés ensuite sont projetés avec le vectoriseur
+    existant et leurs voisins (ainsi que ceux des autres contenus) sont mis à
+    jour par un seul produit creux.
+    """
+
+    def __init__(self, top_k=20, max_features=50000, directory=None, reload_interval=5.0):
+        self.top_k = top_k
+        self.max_features = max_features
+        self.directory = directory
+        self._watcher = ArtifactWatcher(directory, reload_interval) if directory else None
+        self._lock = threading.RLock()
+        self._reset()
+
+        # Vrai une fois l'index construit ou chargé
+        self.built = False
+
+    def _reset(self):
+        """Vide l'index"""
+        self.vectorizer = None
+        self.vectors = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.checksums = np.zeros(0, dtype=np.int64)
+        self.neighbour_rows = np.zeros((0, self.top_k), dtype=np.int64)
+        self.neighbour_scores = np.zeros((0, self.top_k), dtype=np.float32)
+        self.id_to_row = {}
+        self.version = None
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def build(self, persist=True):
+        """Reconstruit entièrement l'index depuis les contenus publiés"""
+        started = time.perf_counter()
+        contents = Content.query.filter_by(is_published=True).order_by(Content.id).all()
+        texts = [content_text(content) for content in contents]
+
+        with self._lock:
+            self._reset()
+            self.ids = np.array([content.id for content in contents], dtype=np.int64)
+            self.checksums = np.array([zlib.crc32(text.encode('utf-8')) for text in texts],
+                                      dtype=np.int64)
+            self.id_to_row = {int(content_id): row for row, content_id in enumerate(self.ids)}
+
+            if contents:
+                self.vectorizer = TfidfVectorizer(
+                    max_features=self.max_features,
+                    strip_accents='unicode',
+                    sublinear_tf=True,
+                    dtype=np.float32
+                )
+                self.vectors = self.vectorizer.fit_transform(texts).tocsr()
+                self._compute_all_neighbours()
+
+            if persist and self.directory:
+                with artifact_lock(self.directory):
+                    self.save()
+            self.built = True
+
+        logger.info(f"Index TF-IDF construit: {len(self.ids)} contenus en "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def _compute_all_neighbours(self):
+        """Précalcule les voisins de tous les contenus par blocs de lignes"""
+        n = self.vectors.shape[0]
+        k = self.top_k
+        self.neighbour_rows = np.full((n, k), -1, dtype=np.int64)
+        self.neighbour_scores = np.zeros((n, k), dtype=np.float32)
+
+        # Taille des blocs pour borner la matrice dense de similarités
+        chunk = max(1, 10_000_000 // max(n, 1))
+        transposed = self.vectors.T.tocsc()
+        for start in range(0, n, chunk):
+            end = min(start + chunk, n)
+            similarities = (self.vectors[start:end] @ transposed).toarray()
+            similarities[np.arange(end - start), np.arange(start, end)] = 0.0
+
+            for offset, row_similarities in enumerate(similarities):
+                self._set_row_neighbours(start + offset, row_similarities)
+
+    def _set_row_neighbours(self, row, similarities):
+        """Conserve les `top_k` meilleurs voisins (similarité > 0) d'une ligne"""
+        k = min(self.top_k, len(similarities))
+        if k == 0:
+            return
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        top = top[similarities[top] > 0]
+
+        self.neighbour_rows[row] = -1
+        self.neighbour_scores[row] = 0.0
+        self.neighbour_rows[row, :len(top)] = top
+        self.neighbour_scores[row, :len(top)] = similarities[top]
+
+    # ------------------------------------------------------------------
+    # Mises à jour incrémentales
+    # ------------------------------------------------------------------
+
+    def update_content(self, content, persist=True):
+        """Indexe (ou réindexe) un contenu créé ou modifié"""
+        if persist:
+            self._publish(lambda: self._update_content(content))
+        else:
+            self._update_content(content)
+
+    def remove_content(self, content_id, persist=True):
+        """Retire un contenu dépublié ou supprimé (la ligne est neutralisée)"""
+        if persist:
+            self._publish(lambda: self._remove_content(content_id))
+        else:
+            self._remove_content(content_id)
+
+    def _publish(self, change):
+        """
+        Applique `change()` puis publie l'index s'il a changé
+        Sous le verrou du répertoire, l'index est d'abord rechargé depuis la
+        dernière version publiée : les mises à jour des autres processus ne
+        sont pas écrasées
+        """
+        if not self.directory:
+            change()
+            return
+        with self._lock, artifact_lock(self.directory):
+            version = current_version(self.directory)
+            if version and version != self.version:
+                self.load(version)
+            if change():
+                self.save()
+
+    def _update_content(self, content):
+        """Met à jour l'index en mémoire ; retourne True si l'index a changé"""
+        with self._lock:
+            if self.vectorizer is None:
+                self.build(persist=False)
+                return True
+
+            if not content.is_published:
+                return self._remove_content(content.id)
+
+            text = content_text(content)
+            checksum = zlib.crc32(text.encode('utf-8'))
+            row = self.id_to_row.get(content.id)
+            if row is not None and self.checksums[row] == checksum:
+                return False
+
+            vector = self.vectorizer.transform([text]).astype(np.float32).tocsr()
+            if row is None:
+                row = len(self.ids)
+                self.ids = np.append(self.ids, content.id)
+                self.checksums = np.append(self.checksums, checksum)
+                self.vectors = sparse.vstack([self.vectors, vector], format='csr')
+                self.neighbour_rows = np.vstack(
+                    [self.neighbour_rows, np.full((1, self.top_k), -1, dtype=np.int64)])
+                self.neighbour_scores = np.vstack(
+                    [self.neighbour_scores, np.zeros((1, self.top_k), dtype=np.float32)])
+                self.id_to_row[int(content.id)] = row
+            else:
+                self.checksums[row] = checksum
+                self.vectors = self._replace_row(self.vectors, row, vector)
+                self._drop_from_neighbours(row)
+
+            similarities = (self.vectors @ vector.T).toarray().ravel()
+            similarities[row] = 0.0
+            similarities[self.ids < 0] = 0.0
+            self._set_row_neighbours(row, similarities)
+            self._offer_neighbour(row, similarities)
+            return True
+
+    def _remove_content(self, content_id):
+        """Retire un contenu de l'index en mémoire ; retourne True s'il y était"""
+        with self._lock:
+            row = self.id_to_row.pop(content_id, None)
+            if row is None:
+                return False
+            self.ids[row] = -1
+            self.vectors = self._replace_row(
+                self.vectors, row, sparse.csr_matrix((1, self.vectors.shape[1]), dtype=np.float32))
+            self.neighbour_rows[row] = -1
+            self.neighbour_scores[row] = 0.0
+            self._drop_from_neighbours(row)
+            return True
+
+    @staticmethod
+    def _replace_row(matrix, row, vector):
+        return sparse.vstack([matrix[:row], vector, matrix[row + 1:]], format='csr')
+
+    def _drop_from_neighbours(self, row):
+        """
+        Retire `row` des listes de voisins où il apparaît
+        Les listes concernées sont recalculées en un seul produit creux
+        """
+        affected = np.flatnonzero((self.neighbour_rows == row).any(axis=1))
+        if len(affected) == 0:
+            return
+
+        similarities = (self.vectors[affected] @ self.vectors.T).toarray()
+        similarities[:, row] = 0.0
+        for offset, other in enumerate(affected):
+            similarities[offset, other] = 0.0
+            self._set_row_neighbours(other, similarities[offset])
+
+    def _offer_neighbour(self, row, similarities):
+        """Insère `row` dans les listes des contenus dont il bat le dernier voisin"""
+        weakest = self.neighbour_scores[:, -1]
+        for other in np.flatnonzero(similarities > weakest):
+            if other == row:
+                continue
+            self.neighbour_rows[other, -1] = row
+            self.neighbour_scores[other, -1] = similarities[other]
+            self._sort_row(other)
+
+    def _sort_row(self, row):
+        order = np.argsort(-self.neighbour_scores[row], kind='stable')
+        self.neighbour_rows[row] = self.neighbour_rows[row, order]
+        self.neighbour_scores[row] = self.neighbour_scores[row, order]
+
+    def sync(self):
+        """Rattrape les contenus modifiés depuis la dernière sauvegarde"""
+        self._publish(self._catch_up)
+
+    def _catch_up(self):
+        """Réindexe les contenus publiés modifiés ; retourne True si l'index a changé"""
+        with self._lock:
+            published = Content.query.filter_by(is_published=True).all()
+            published_ids = set()
+            changed = False
+            for content in published:
+                published_ids.add(content.id)
+                row = self.id_to_row.get(content.id)
+                checksum = zlib.crc32(content_text(content).encode('utf-8'))
+                if row is None or self.checksums[row] != checksum:
+                    changed = self._update_content(content) or changed
+            for content_id in set(self.id_to_row) - published_ids:
+                changed = self._remove_content(content_id) or changed
+            return changed
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def save(self):
+        """
+        Publie l'index comme nouvelle version de l'artefact de `directory`
+        (sous `artifact_lock`, voir `_publish`)
+        """
+        if not self.directory or self.vectorizer is None:
+            return
+        with self._lock:
+            vectorizer = self.vectorizer
+            self.version = write_artifact(
+                self.directory,
+                arrays={
+                    'ids': self.ids,
+                    'checksums': self.checksums,
+                    'neighbour_rows': self.neighbour_rows,
+                    'neighbour_scores': self.neighbour_scores,
+                    'vector_data': self.vectors.data,
+                    'vector_indices': self.vectors.indices,
+                    'vector_indptr': self.vectors.indptr
+                },
+                metadata={'top_k': self.top_k, 'vector_shape': list(self.vectors.shape)},
+                files={'vectorizer.joblib': lambda path: joblib.dump(vectorizer, path)}
+            )
+            self._watcher.version = self.version
+
+    def load(self, version=None):
+        """
+        Charge l'index persisté (version active par défaut) ; retourne False
+        s'il est absent ou illisible. Les tableaux sont projetés en copie à
+        l'écriture : les mises à jour incrémentales restent propres au processus.
+        """
+        if not self.directory:
+            return False
+        artifact = open_artifact(self.directory, version=version, mode='c')
+        if artifact is None:
+            return False
+        try:
+            vectorizer = joblib.load(artifact.file('vectorizer.joblib'))
+            vectors = sparse.csr_matrix(
+                (artifact['vector_data'], artifact['vector_indices'], artifact['vector_indptr']),
+                shape=tuple(artifact.metadata['vector_shape'])
+            )
+            ids, checksums = artifact['ids'], artifact['checksums']
+            rows, scores = artifact['neighbour_rows'], artifact['neighbour_scores']
+        except (OSError, ValueError, KeyError) as e:
+            logger.info(f"Index TF-IDF persisté indisponible: {e}")
+            return False
+
+        if rows.shape[1] != self.top_k or vectors.shape[0] != len(ids):
+            return False
+
+        with self._lock:
+            self.vectorizer = vectorizer
+            self.vectors = vectors
+            self.ids = ids
+            self.checksums = checksums
+            self.neighbour_rows = rows
+            self.neighbour_scores = scores
+            self.id_to_row = {int(content_id): row for row, content_id in enumerate(ids)
+                              if content_id >= 0}
+            self.version = artifact.version
+            self._watcher.version = artifact.version
+            self.built = True
+        return True
+
+    def reload_if_changed(self):
+        """
+        Bascule sur la version publiée par un autre processus, s'il y en a une
+        Les requêtes en cours terminent sur l'ancienne version (tableaux encore
+        projetés), les suivantes lisent la nouvelle
+        """
+        if self._watcher is None:
+            return False
+        version = self._watcher.poll()
+        if version is None:
+            return False
+        with self._lock:
+            if version == self.version:
+                return False
+            started = time.perf_counter()
+            if not self.load(version):
+                return False
+        logger.info(f"Index TF-IDF rechargé (version {version}) en "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms")
+        return True
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def neighbours(self, content_id, limit=None):
+        """Voisins précalculés d'un contenu [(content_id, similarité)]"""
+        # Lecture sous verrou : une version rechargée est vue entièrement ou pas du tout
+        with self._lock:
+            row = self.id_to_row.get(content_id)
+            if row is None:
+                return []
+            ids = self.ids
+            rows = self.neighbour_rows[row].copy()
+            scores = self.neighbour_scores[row].copy()
+        result = [(int(ids[r]), float(score)) for r, score in zip(rows, scores)
+                  if r >= 0 and ids[r] >= 0]
+        return result[:limit] if limit else result
+
+
+# Instance globale de l'index (une par processus)
+tfidf_index = None
+_index_lock = threading.Lock()
+
+def get_tfidf_index():
+    """Retourne l'index TF-IDF global, chargé depuis le disque ou reconstruit"""
+    global tfidf_index
+    if tfidf_index is None:
+        with _index_lock:
+            if tfidf_index is None:
+                from flask import current_app
+                directory = None
+                if current_app.config.get('TFIDF_PERSIST', True):
+                    directory = current_app.config.get('TFIDF_INDEX_DIR') or \
+                        os.path.join(current_app.instance_path, 'tfidf_index')
+                index = TfidfIndex(
+                    top_k=current_app.config.get('TFIDF_TOP_K', 20),
+                    max_features=current_app.config.get('TFIDF_MAX_FEATURES', 50000),
+                    directory=directory,
+                    reload_interval=current_app.config.get('MODEL_RELOAD_INTERVAL', 5)
+                )
+                if index.load():
+                    index.sync()
+                else:
+                    index.build()
+                tfidf_index = index
+                return tfidf_index
+    tfidf_index.reload_if_changed()
+    return tfidf_index
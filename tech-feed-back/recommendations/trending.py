@@ -0,0 +1,307 @@
+"""
+Compteurs de tendances en fenêtre glissante
+Chaque évènement du journal des interactions ajoute son poids dans un seau
+horaire et dans les totaux des fenêtres de 1 à `max_days` jours ; le passage
+à une nouvelle heure retire des totaux les seaux sortis de chaque fenêtre.
+Le top-K d'une fenêtre est une sélection partielle sur ses totaux, sans lire
+la table des interactions. Construction et mises à jour lisent le même
+journal (écrit par tous les processus) : chaque worker sert les mêmes
+tendances, à `INTERACTION_LOG_SYNC_INTERVAL` secondes près. La période que
+le journal ne couvre pas encore (déploiement sans --backfill) est lue dans
+la table interactions. Les vues sont lues dans cette table, qui n'en garde
+qu'une ligne par utilisateur et par contenu (datée de la première vue) :
+la base dédoublonne les vues répétées, sans état en mémoire par couple.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from database import db
+from models.interaction import Interaction
+from models.interaction_event import InteractionEvent
+from recommendations.events import InteractionLogCursor
+
+logger = logging.getLogger(__name__)
+
+# Poids des interactions dans le score de tendance
+TRENDING_WEIGHTS = {
+    'like': 3,
+    'favorite': 3,
+    'share': 4,
+    'view': 1
+}
+
+# Types lus dans le journal (les vues sont lues dans la table interactions)
+LOGGED_TYPES = tuple(interaction_type for interaction_type in TRENDING_WEIGHTS if interaction_type != 'view')
+
+BUCKET_SECONDS = 3600
+
+
+def bucket_of(at=None):
+    """Seau horaire d'une date UTC naïve (maintenant par défaut)"""
+    if at is None:
+        return int(time.time() // BUCKET_SECONDS)
+    return int(at.replace(tzinfo=timezone.utc).timestamp() // BUCKET_SECONDS)
+
+
+class FirstViewCursor(InteractionLogCursor):
+    """
+    Lecture incrémentale des premières vues : lignes `view` de la table
+    interactions créées depuis la dernière lecture, au format du journal
+    """
+
+    def _query(self, since, types):
+        return db.session.query(
+            Interaction.user_id, Interaction.content_id, Interaction.interaction_type,
+            db.literal(True).label('added'), Interaction.created_at
+        ).filter(
+            Interaction.interaction_type == 'view',
+            Interaction.created_at >= since
+        ).order_by(Interaction.created_at)
+
+
+class TrendingCounters:
+    """
+    Scores de tendance par contenu sur des fenêtres de 1 à `max_days` jours
+
+    `_buckets` garde les poids de chaque heure des `max_days` derniers jours
+    ({heure: {colonne: poids}}) ; `_totals[d - 1]` est la somme des seaux de
+    la fenêtre de d jours (les 24·d dernières heures, heure courante incluse).
+    Les poids sont entiers : ajouts et retraits sont exacts.
+    """
+
+    def __init__(self, max_days=30, sync_interval=5, sync_overlap=30):
+        self.max_days = max_days
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+        self._lock = threading.RLock()
+        self._cursor = None
+        self._views_cursor = None
+        self._reset()
+
+    def _reset(self):
+        """Vide les compteurs"""
+        self._buckets = {}
+        self._current = bucket_of()
+        self._totals = np.zeros((self.max_days, 0), dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.id_to_col = {}
+        self.built = False
+
+    def _col(self, content_id):
+        """Colonne d'un contenu (créée au besoin, tableaux agrandis par doublement)"""
+        col = self.id_to_col.get(content_id)
+        if col is None:
+            col = len(self.id_to_col)
+            if col >= self._totals.shape[1]:
+                capacity = max(64, self._totals.shape[1] * 2)
+                totals = np.zeros((self.max_days, capacity), dtype=np.int64)
+                totals[:, :self._totals.shape[1]] = self._totals
+                ids = np.full(capacity, -1, dtype=np.int64)
+                ids[:len(self.ids)] = self.ids
+                self._totals, self.ids = totals, ids
+            self.ids[col] = content_id
+            self.id_to_col[content_id] = col
+        return col
+
+    def _windows_containing(self, bucket):
+        """Indice de la plus petite fenêtre contenant le seau (max_days si aucune)"""
+        age = self._current - bucket
+        return min(self.max_days, max(0, age // 24))
+
+    # ------------------------------------------------------------------
+    # Fenêtre glissante
+    # ------------------------------------------------------------------
+
+    def _advance(self, now_bucket=None):
+        """Retire des totaux les seaux sortis des fenêtres depuis la dernière heure"""
+        now_bucket = bucket_of() if now_bucket is None else now_bucket
+        previous = self._current
+        if now_bucket <= previous:
+            return
+
+        for bucket, weights in list(self._buckets.items()):
+            # Fenêtres que le seau quitte : previous - 24d < bucket <= now - 24d
+            first = self._windows_containing(bucket)
+            for day in range(first + 1, self.max_days + 1):
+                if bucket > now_bucket - 24 * day:
+                    break
+                if bucket > previous - 24 * day:
+                    cols = np.fromiter(weights.keys(), dtype=np.int64, count=len(weights))
+                    values = np.fromiter(weights.values(), dtype=np.int64, count=len(weights))
+                    self._totals[day - 1, cols] -= values
+            if bucket <= now_bucket - 24 * self.max_days:
+                del self._buckets[bucket]
+
+        self._current = now_bucket
+
+    # ------------------------------------------------------------------
+    # Mises à jour
+    # ------------------------------------------------------------------
+
+    def add(self, content_id, interaction_type, at=None):
+        """Ajoute une interaction (à l'instant présent par défaut)"""
+        weight = TRENDING_WEIGHTS.get(interaction_type)
+        if weight is None:
+            return
+
+        with self._lock:
+            self._advance()
+            bucket = bucket_of(at) if at is not None else self._current
+            first = self._windows_containing(bucket)
+            if first >= self.max_days:
+                return
+
+            col = self._col(content_id)
+            weights = self._buckets.setdefault(bucket, {})
+            weights[col] = weights.get(col, 0) + weight
+            self._totals[first:, col] += weight
+
+    def remove(self, content_id, interaction_type):
+        """
+        Retire une interaction supprimée
+        Sa date n'étant pas connue, le poids est retiré du seau le plus récent
+        qui le contient (en pratique celui de l'ajout : like puis unlike)
+        """
+        weight = TRENDING_WEIGHTS.get(interaction_type)
+        col = self.id_to_col.get(content_id)
+        if weight is None or col is None:
+            return
+
+        with self._lock:
+            self._advance()
+            for bucket in sorted(self._buckets, reverse=True):
+                weights = self._buckets[bucket]
+                if weights.get(col, 0) >= weight:
+                    weights[col] -= weight
+                    if not weights[col]:
+                        del weights[col]
+                    self._totals[self._windows_containing(bucket):, col] -= weight
+                    return
+
+    def discard_content(self, content_id):
+        """Retire un contenu supprimé des compteurs"""
+        with self._lock:
+            col = self.id_to_col.get(content_id)
+            if col is None:
+                return
+            for weights in self._buckets.values():
+                weights.pop(col, None)
+            self._totals[:, col] = 0
+
+    def build(self):
+        """
+        Construit les compteurs depuis le journal des interactions des
+        `max_days` derniers jours (partitions récentes seulement sous
+        PostgreSQL) ; les retraits annulent les ajouts qui les précèdent.
+        Les jours antérieurs au premier évènement du journal sont lus dans la
+        table interactions (état courant, à la date de création), comme les
+        premières vues de toute la fenêtre
+        """
+        started = time.perf_counter()
+        since = datetime.utcnow() - timedelta(days=self.max_days)
+        log_start = InteractionEvent.first_event_at()
+        cursor = InteractionLogCursor(since, overlap=self.sync_overlap, interval=self.sync_interval)
+        views_cursor = FirstViewCursor(since, overlap=self.sync_overlap, interval=self.sync_interval)
+
+        with self._lock:
+            self._reset()
+            if log_start is None or log_start > since:
+                query = db.session.query(
+                    Interaction.user_id, Interaction.content_id, Interaction.interaction_type,
+                    Interaction.created_at
+                ).filter(
+                    Interaction.interaction_type.in_(list(LOGGED_TYPES)),
+                    Interaction.created_at >= since
+                )
+                if log_start is not None:
+                    query = query.filter(Interaction.created_at < log_start)
+                for user_id, content_id, interaction_type, created_at in query.yield_per(10000):
+                    self._apply_event(user_id, content_id, interaction_type, True, created_at)
+            for event in views_cursor.read():
+                self._apply_event(*event)
+            for event in cursor.read(types=LOGGED_TYPES):
+                self._apply_event(*event)
+            self._cursor = cursor
+            self._views_cursor = views_cursor
+            self.built = True
+
+        logger.info(f"Compteurs de tendances construits: {len(self.id_to_col)} contenus, "
+                    f"{len(self._buckets)} seaux en {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def sync(self):
+        """
+        Applique les évènements du journal et les premières vues écrits
+        depuis la dernière lecture (par ce processus ou un autre), si une
+        lecture est due. Retourne le nombre d'évènements lus
+        """
+        if self._cursor is None:
+            return 0
+        return self._cursor.sync(self._apply_event, types=LOGGED_TYPES) + \
+            self._views_cursor.sync(self._apply_event)
+
+    def _apply_event(self, user_id, content_id, interaction_type, added, created_at):
+        if not added:
+            self.remove(content_id, interaction_type)
+            return
+        self.add(content_id, interaction_type, at=created_at)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def top(self, days=7, limit=10, exclude_ids=()):
+        """
+        Contenus les plus engagés sur les `days` derniers jours (1 à max_days)
+        Retourne [(content_id, score)] par score décroissant (ex æquo par id)
+        """
+        days = min(max(int(days), 1), self.max_days)
+        with self._lock:
+            self._advance()
+            size = len(self.id_to_col)
+            scores = self._totals[days - 1, :size].copy()
+            ids = self.ids[:size]
+
+        if exclude_ids:
+            excluded = [self.id_to_col[content_id] for content_id in exclude_ids
+                        if content_id in self.id_to_col]
+            scores[excluded] = 0
+
+        cols = np.flatnonzero(scores > 0)
+        if limit < len(cols):
+            cols = cols[np.argpartition(-scores[cols], limit - 1)[:limit]]
+            # Ex æquo à la frontière : départagés par id comme le tri final
+            threshold = scores[cols].min()
+            tied = np.flatnonzero(scores == threshold)
+            cols = np.concatenate([cols[scores[cols] > threshold], tied])
+        cols = cols[np.lexsort((ids[cols], -scores[cols]))][:limit]
+        return [(int(ids[col]), int(scores[col])) for col in cols]
+
+
+# Instance globale des compteurs (une par processus)
+trending_counters = None
+_counters_lock = threading.Lock()
+
+def get_trending_counters():
+    """
+    Retourne les compteurs de tendances globaux, construits au premier accès
+    puis tenus à jour depuis le journal des interactions
+    """
+    global trending_counters
+    if trending_counters is None:
+        with _counters_lock:
+            if trending_counters is None:
+                from flask import current_app
+                counters = TrendingCounters(
+                    max_days=current_app.config.get('TRENDING_MAX_DAYS', 30),
+                    sync_interval=current_app.config.get('INTERACTION_LOG_SYNC_INTERVAL', 5),
+                    sync_overlap=current_app.config.get('INTERACTION_LOG_SYNC_OVERLAP', 30)
+                )
+                counters.build()
+                trending_counters = counters
+    trending_counters.sync()
+    return trending_counters
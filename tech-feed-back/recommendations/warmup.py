@@ -0,0 +1,65 @@
+"""
+Construction des structures en mémoire du moteur de recommandations
+(catalogue, matrice de likes, co-visitation, TF-IDF, tendances)
+Une requête soumise à un budget de temps ne construit pas elle-même une
+structure absente : elle lance la construction dans un thread de fond et
+sert une liste de repli en attendant.
+"""
+
+import logging
+import threading
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up_steps():
+    """Étapes de construction [(nom, fonction)], dans l'ordre de dépendance"""
+    from recommendations.catalog import get_content_catalog
+    from recommendations.collaborative import get_like_matrix
+    from recommendations.covisitation import get_covisitation_index
+    from recommendations.tfidf import get_tfidf_index
+    from recommendations.trending import get_trending_counters
+
+    return [('catalogue', get_content_catalog), ('likes', get_like_matrix),
+            ('co-visitation', lambda: get_covisitation_index(wait=True)), ('TF-IDF', get_tfidf_index),
+            ('tendances', get_trending_counters)]
+
+def models_ready():
+    """
+    Vrai si les structures lues pendant une requête ont terminé leur première
+    construction (l'instance globale peut être publiée avant, ex. catalogue)
+    """
+    from recommendations import catalog, collaborative, tfidf, trending
+
+    return all(instance is not None and instance.built for instance in (
+        catalog.content_catalog, collaborative.like_matrix, tfidf.tfidf_index, trending.trending_counters
+    ))
+
+
+_warm_up_thread = None
+_warm_up_lock = threading.Lock()
+
+def _warm_up(app):
+    global _warm_up_thread
+    name = None
+    with app.app_context():
+        try:
+            for name, build in warm_up_steps():
+                build()
+        except Exception as e:
+            logger.warning(f"Erreur construction des structures du moteur ({name}): {e}")
+        finally:
+            db.session.remove()
+            with _warm_up_lock:
+                _warm_up_thread = None
+
+def start_warm_up(app):
+    """Lance la construction dans un thread de fond (une seule à la fois)"""
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=_warm_up, args=(app,),
+                                               name='recommendations-warm-up', daemon=True)
+            _warm_up_thread.start()
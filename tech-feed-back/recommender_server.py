@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Processus recommandeur TechFeed
+Garde catalogue, profils et modèles en mémoire une seule fois par hôte et
+sert les workers web par socket Unix (voir recommendations/sidecar.py).
+Les workers utilisent ce processus quand RECOMMENDER_SOCKET désigne la même
+socket, et calculent localement s'il ne répond pas.
+"""
+
+import argparse
+import os
+import signal
+import threading
+import time
+
+from app import create_app
+from database import db
+from recommendations.sidecar import SidecarServer
+from recommendations.warmup import warm_up_steps
+
+def warm_up(app):
+    """Construit les structures en mémoire avant d'accepter des connexions"""
+    with app.app_context():
+        for name, build in warm_up_steps():
+            started = time.perf_counter()
+            build()
+            db.session.remove()
+            print(f"🔥 {name}: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+def serve(socket_path, config_name=None):
+    """Démarre le processus recommandeur sur `socket_path`"""
+    app = create_app(config_name)
+    # Ce processus calcule lui-même les classements
+    app.config['RECOMMENDER_SOCKET'] = None
+    warm_up(app)
+
+    server = SidecarServer(app, socket_path)
+    # SIGTERM : arrêt propre (le tampon des vues est vidé à la sortie)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    print(f"✅ Processus recommandeur à l'écoute sur {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Processus recommandeur partagé par les workers web')
+    parser.add_argument('--socket', default=os.environ.get('RECOMMENDER_SOCKET', '/tmp/techfeed-recommender.sock'),
+                        help='chemin de la socket Unix')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'),
+                        help='configuration Flask (development, production, testing)')
+    args = parser.parse_args()
+
+    print("🚀 Démarrage du processus recommandeur TechFeed...")
+    serve(args.socket, config_name=args.config)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Script de mise à jour des scores d'engagement TechFeed
+Les compteurs (vues, likes) mettent à jour `contents.engagement_score` à
+chaque écriture ; ce job, à lancer périodiquement (cron horaire par
+exemple), applique la pondération temporelle qui évolue avec l'âge des
+contenus.
+"""
+
+import argparse
+import os
+import time
+
+from app import create_app
+from models.content import Content
+
+def refresh(config_name=None, batch_size=1000, full=False):
+    """Recalcule les scores ; retourne le nombre de contenus mis à jour"""
+    app = create_app(config_name, background_workers=False)
+    with app.app_context():
+        return Content.refresh_engagement_scores(batch_size=batch_size, full=full)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mise à jour des scores d'engagement des contenus")
+    parser.add_argument('--full', action='store_true',
+                        help='recalculer tous les contenus (après ajout de la colonne par exemple)')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='nombre de contenus par écriture')
+    parser.add_argument('--config', default=os.environ.get('FLASK_ENV', 'development'),
+                        help='configuration Flask (development, production, testing)')
+    args = parser.parse_args()
+
+    print("🚀 Mise à jour des scores d'engagement TechFeed...")
+    started = time.perf_counter()
+    updated = refresh(config_name=args.config, batch_size=args.batch_size, full=args.full)
+    print(f"🎉 {updated} scores mis à jour en {time.perf_counter() - started:.1f} s")
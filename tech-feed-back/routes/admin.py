@@ -1,9 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User
 from models.content import Content
 from models.interaction import Interaction
 from database import db
+from recommendations.events import notify_user_update
 from datetime import datetime
 
 admin_bp = Blueprint('admin', __name__)
@@ -161,6 +162,7 @@ def update_user(user_id):
         
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        notify_user_update(user_id)
         
         return {
             'success': True,
@@ -231,6 +233,18 @@ def get_admin_contents():
     except Exception as e:
         return {'error': f'Erreur serveur: {str(e)}'}, 500
 
+def reindex_content(content):
+    """
+    Met à jour l'index TF-IDF après l'écriture (déjà validée) d'un contenu
+    Une erreur est journalisée sans faire échouer la requête : le contenu
+    sera réindexé par la synchronisation suivante
+    """
+    try:
+        from recommendations.tfidf import get_tfidf_index
+        get_tfidf_index().update_content(content)
+    except Exception as e:
+        current_app.logger.warning(f"Erreur d'indexation TF-IDF du contenu {content.id}: {e}")
+
 @admin_bp.route('/contents', methods=['POST'])
 @jwt_required()
 def create_content():
@@ -269,6 +283,9 @@ def create_content():
         db.session.add(content)
         db.session.commit()
         
+        # Indexer le nouveau contenu pour les contenus similaires
+        reindex_content(content)
+        
         return {
             'success': True,
             'message': 'Contenu créé',
@@ -298,7 +315,7 @@ def update_content(content_id):
         
         # Mise à jour des champs
         updatable_fields = [
-            'title', 'excerpt', 'content', 'author', 'category',
+            'title', 'excerpt', 'content', 'author', 'category', 'tags',
             'image_url', 'external_url', 'duration', 'difficulty_level',
             'is_published', 'is_featured'
         ]
@@ -313,6 +330,9 @@ def update_content(content_id):
         content.updated_at = datetime.utcnow()
         db.session.commit()
         
+        # Réindexer le contenu pour les contenus similaires
+        reindex_content(content)
+        
         return {
             'success': True,
             'message': 'Contenu mis à jour',
@@ -343,6 +363,20 @@ def delete_content(content_id):
         db.session.delete(content)
         db.session.commit()
         
+        # Retirer le contenu du catalogue de recommandations
+        from recommendations.catalog import content_catalog
+        from recommendations.covisitation import covisitation_index
+        from recommendations.tfidf import tfidf_index
+        from recommendations.trending import trending_counters
+        if content_catalog:
+            content_catalog.invalidate(content_id)
+        if covisitation_index:
+            covisitation_index.discard_content(content_id)
+        if tfidf_index:
+            tfidf_index.remove_content(content_id)
+        if trending_counters:
+            trending_counters.discard_content(content_id)
+        
         return {
             'success': True,
             'message': 'Contenu supprimé'
@@ -419,4 +453,53 @@ def get_admin_interactions():
         }, 200
         
     except Exception as e:
-        return {'error': f'Erreur serveur: {str(e)}'}, 500 
\ No newline at end of file
+        return {'error': f'Erreur serveur: {str(e)}'}, 500 
+
+@admin_bp.route('/recommendations/batch', methods=['POST'])
+@jwt_required()
+def batch_recommendations():
+    """Génère les recommandations d'une cohorte d'utilisateurs en un seul appel"""
+    try:
+        admin_check = require_admin()
+        if admin_check:
+            return admin_check
+        
+        data = request.get_json()
+        if not data:
+            return {'error': 'Données JSON requises'}, 400
+        
+        user_ids = data.get('user_ids')
+        if not isinstance(user_ids, list) or not user_ids:
+            return {'error': 'Champ requis: user_ids (liste)'}, 400
+        
+        if len(user_ids) > 10000:
+            return {'error': 'Maximum 10000 utilisateurs par appel'}, 400
+        
+        try:
+            user_ids = [int(user_id) for user_id in user_ids]
+        except (TypeError, ValueError):
+            return {'error': 'user_ids doit contenir des identifiants entiers'}, 400
+        
+        try:
+            limit = int(data.get('limit', 10))
+        except (TypeError, ValueError):
+            return {'error': 'limit doit être un entier'}, 400
+        if limit < 1:
+            return {'error': 'limit doit être positif'}, 400
+        limit = min(limit, 50)
+        
+        from recommendations.engine import RecommendationEngine
+        engine = RecommendationEngine()
+        recommendations = engine.recommend_many(user_ids, limit=limit)
+        
+        return {
+            'success': True,
+            'limit': limit,
+            'recommendations': {
+                str(user_id): content_ids for user_id, content_ids in recommendations.items()
+            },
+            'missing_user_ids': [user_id for user_id in user_ids if user_id not in recommendations]
+        }, 200
+        
+    except Exception as e:
+        return {'error': f'Erreur serveur: {str(e)}'}, 500
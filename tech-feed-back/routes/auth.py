@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, create_access_token, create_refresh_token, get_jwt_identity
 from datetime import datetime
 import re
@@ -7,6 +7,8 @@ import re
 from models.user import User
 from database import db
 from kafka_producer import track_user_event
+from recommendations.events import notify_user_update
+from recommendations.refresh import enqueue_cohort_warm_up
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -154,6 +156,12 @@ def signup():
         except Exception as e:
             print(f"Erreur lors du tracking Kafka signup: {e}")
         
+        # Préparer le classement de la cohorte de préférences (premier fil d'actualité), hors requête
+        try:
+            enqueue_cohort_warm_up(user.get_preferences())
+        except Exception as e:
+            current_app.logger.warning(f"Erreur de planification du calcul de la cohorte: {e}")
+        
         # Créer les tokens
         access_token = create_access_token(identity=user.id)
         refresh_token = create_refresh_token(identity=user.id)
@@ -253,6 +261,7 @@ def update_profile():
         if updated:
             user.updated_at = datetime.utcnow()
             db.session.commit()
+            notify_user_update(user.id)
         
         return {
             'success': True,
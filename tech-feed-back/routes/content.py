@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, jwt_required
 from models.content import Content
+from models.tag import Tag
 from models.user import User
 from models.interaction import Interaction
 from database import db
 from kafka_producer import track_user_interaction, track_search, track_new_content
+from recommendations.engine import RecommendationEngine
+from view_buffer import record_view
 
 content_bp = Blueprint('content', __name__)
 
@@ -19,6 +22,8 @@ def get_contents():
         search = request.args.get('search')
         sort_by = request.args.get('sort_by', 'recent')  # recent, popular, engagement
         difficulty = request.args.get('difficulty')
+        tags = request.args.get('tags')  # tags séparés par des virgules
+        tag_match = request.args.get('tag_match', 'any')  # any, all
         
         # Limiter per_page pour éviter les abus
         per_page = min(per_page, 100)
@@ -37,11 +42,15 @@ def get_contents():
         if difficulty:
             query = query.filter_by(difficulty_level=difficulty)
         
+        if tags:
+            query = Content.filter_by_tags(query, tags.split(','), match_all=tag_match == 'all')
+        
         # Tri
         if sort_by == 'popular':
             query = query.order_by(Content.view_count.desc())
         elif sort_by == 'engagement':
-            query = query.order_by(Content.like_count.desc())
+            # Score stocké, parcours de l'index idx_published_engagement
+            query = query.order_by(Content.engagement_score.desc(), Content.id.desc())
         elif sort_by == 'featured':
             query = query.order_by(Content.is_featured.desc(), Content.created_at.desc())
         else:  # recent par défaut
@@ -56,7 +65,7 @@ def get_contents():
         
         return {
             'success': True,
-            'contents': [content.to_dict() for content in contents.items],
+            'contents': [content.to_dict() for content in Content.load_pending_counts(contents.items)],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -79,35 +88,30 @@ def get_content(content_id):
         if not content or not content.is_published:
             return {'error': 'Contenu non trouvé'}, 404
         
-        # Incrémenter le compteur de vues
-        content.increment_view_count()
-        
-        # Si l'utilisateur est connecté, enregistrer l'interaction de vue
+        # Utilisateur connecté (optionnel) : sa vue est aussi une interaction
         try:
             from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
             verify_jwt_in_request(optional=True)
             current_user_id = get_jwt_identity()
-            
-            if current_user_id:
-                Interaction.create_or_update(
+        except:
+            # Pas d'utilisateur connecté, pas de problème
+            current_user_id = None
+        
+        # Compteur de vues et interaction de vue (écriture différée groupée)
+        record_view(content_id, current_user_id)
+        
+        if current_user_id:
+            # Tracker dans Kafka
+            try:
+                track_user_interaction(
                     user_id=current_user_id,
                     content_id=content_id,
                     interaction_type='view'
                 )
-                
-                # Tracker dans Kafka
-                try:
-                    track_user_interaction(
-                        user_id=current_user_id,
-                        content_id=content_id,
-                        interaction_type='view'
-                    )
-                except Exception as e:
-                    print(f"Erreur tracking Kafka view: {e}")
-        except:
-            # Pas d'utilisateur connecté, pas de problème
-            pass
+            except Exception as e:
+                print(f"Erreur tracking Kafka view: {e}")
         
+        Content.load_pending_counts([content])
         return {
             'success': True,
             'content': content.to_dict(include_content=True)
@@ -193,6 +197,29 @@ def get_categories():
     except Exception as e:
         return {'error': f'Erreur serveur: {str(e)}'}, 500
 
+@content_bp.route('/tags', methods=['GET'])
+def get_tags():
+    """Récupère les tags les plus utilisés avec le nombre de contenus"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        limit = min(limit, 200)
+        
+        tags = [
+            {
+                'name': name,
+                'count': count
+            }
+            for name, count in Tag.get_counts(limit=limit)
+        ]
+        
+        return {
+            'success': True,
+            'tags': tags
+        }, 200
+        
+    except Exception as e:
+        return {'error': f'Erreur serveur: {str(e)}'}, 500
+
 @content_bp.route('/category/<category_name>', methods=['GET'])
 def get_contents_by_category(category_name):
     """Récupère les contenus d'une catégorie spécifique"""
@@ -213,7 +240,7 @@ def get_contents_by_category(category_name):
         return {
             'success': True,
             'category': category_name,
-            'contents': [content.to_dict() for content in contents.items],
+            'contents': [content.to_dict() for content in Content.load_pending_counts(contents.items)],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -332,29 +359,13 @@ def get_related_contents(content_id):
         limit = request.args.get('limit', 5, type=int)
         limit = min(limit, 20)
         
-        # Recherche de contenus similaires par catégorie et tags
-        content_tags = content.get_tags()
-        
-        query = Content.query.filter(
-            Content.id != content_id,
-            Content.is_published == True
+        # Voisins TF-IDF précalculés (titre, extrait, tags, catégorie)
+        engine = RecommendationEngine()
+        related_contents = engine.get_related_content_recommendations(
+            content_id=content_id,
+            limit=limit
         )
         
-        # Prioriser la même catégorie
-        same_category = query.filter_by(category=content.category).limit(limit).all()
-        
-        # Si pas assez de résultats, rechercher par tags
-        if len(same_category) < limit and content_tags:
-            remaining = limit - len(same_category)
-            # Cette requête est simplifiée - dans une vraie app, on utiliserait une recherche full-text
-            tag_based = query.filter(
-                Content.category != content.category
-            ).order_by(Content.created_at.desc()).limit(remaining).all()
-            
-            related_contents = same_category + tag_based
-        else:
-            related_contents = same_category
-        
         return {
             'success': True,
             'content_id': content_id,
@@ -384,9 +395,9 @@ def get_content_stats(content_id):
         stats = {
             'content_id': content_id,
             'title': content.title,
-            'total_views': content.view_count,
-            'total_likes': content.like_count,
-            'engagement_score': content.get_engagement_score(),
+            'total_views': content.get_view_count(),
+            'total_likes': content.get_like_count(),
+            'engagement_score': content.engagement_score,
             'interactions_by_type': {}
         }
         
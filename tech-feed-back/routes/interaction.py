@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.interaction import Interaction
+from models.interaction_event import InteractionEvent
 from models.content import Content
 from models.user import User
 from database import db
 from kafka_producer import track_user_interaction
+from recommendations.events import notify_interaction
+from view_buffer import record_view
 
 interaction_bp = Blueprint('interaction', __name__)
 
@@ -41,7 +44,7 @@ def create_interaction():
             return {'error': 'Le rating doit être entre 1 et 5'}, 400
         
         # Créer ou mettre à jour l'interaction
-        interaction = Interaction.create_or_update(
+        interaction, created = Interaction.upsert(
             user_id=current_user_id,
             content_id=content_id,
             interaction_type=interaction_type,
@@ -49,11 +52,12 @@ def create_interaction():
             duration=duration
         )
         
-        # Mettre à jour les compteurs du contenu
+        # Mettre à jour les compteurs du contenu (un like n'est compté qu'à sa création)
         if interaction_type == 'like':
-            content.increment_like_count()
+            if created:
+                content.increment_like_count()
         elif interaction_type == 'view':
-            content.increment_view_count()
+            record_view(content.id)
         
         return {
             'success': True,
@@ -66,6 +70,117 @@ def create_interaction():
     except Exception as e:
         return {'error': f'Erreur serveur: {str(e)}'}, 500
 
+def _validate_batch_item(item):
+    """Retourne l'item normalisé d'un lot ; ValueError s'il est invalide"""
+    if not isinstance(item, dict):
+        raise ValueError('Objet JSON attendu')
+    content_id = item.get('content_id')
+    interaction_type = item.get('interaction_type')
+    rating = item.get('rating')
+    duration = item.get('duration')
+    if not content_id or not interaction_type:
+        raise ValueError('content_id et interaction_type requis')
+    if not isinstance(content_id, int) or isinstance(content_id, bool):
+        raise ValueError('content_id doit être un entier')
+    if rating is not None and (not isinstance(rating, int) or isinstance(rating, bool)):
+        raise ValueError('Le rating doit être entre 1 et 5')
+    if duration is not None and (not isinstance(duration, int) or isinstance(duration, bool) or duration < 0):
+        raise ValueError('La durée doit être un entier positif')
+    Interaction.validate(interaction_type, rating)
+    return {'content_id': content_id, 'interaction_type': interaction_type,
+            'rating': rating, 'duration': duration}
+
+@interaction_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def create_interactions_batch():
+    """
+    Enregistre un lot d'interactions en une transaction
+    Corps : {"interactions": [{content_id, interaction_type, rating?, duration?}, ...]}
+    Les items invalides sont rejetés individuellement ; les autres sont
+    écrits par un seul upsert et des compteurs mis à jour en lot. La réponse
+    donne un résultat par item, dans l'ordre du lot.
+    """
+    try:
+        from flask import current_app
+        from models.content_counter import ContentCounter
+        
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('interactions'), list):
+            return {'error': 'Liste interactions requise'}, 400
+        
+        items = data['interactions']
+        max_items = current_app.config.get('INTERACTION_BATCH_MAX', 500)
+        if not items:
+            return {'error': 'Liste interactions vide'}, 400
+        if len(items) > max_items:
+            return {'error': f'Au plus {max_items} interactions par lot'}, 400
+        
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, _validate_batch_item(item)))
+            except ValueError as e:
+                results[index] = {'index': index, 'status': 'error', 'error': str(e)}
+        
+        # Contenus publiés du lot (une requête)
+        published_ids = {content_id for (content_id,) in db.session.query(Content.id).filter(
+            Content.id.in_({item['content_id'] for _, item in valid}),
+            Content.is_published.is_(True)
+        )} if valid else set()
+        accepted = []
+        for index, item in valid:
+            if item['content_id'] in published_ids:
+                accepted.append((index, item))
+            else:
+                results[index] = {'index': index, 'status': 'error', 'error': 'Contenu non trouvé'}
+        
+        upserted = Interaction.upsert_many(current_user_id, [item for _, item in accepted])
+        
+        # Compteurs : chaque vue compte, un like seulement à sa création ; les
+        # doublons d'une interaction créée par ce lot sont des mises à jour
+        views, likes = {}, {}
+        seen, created_keys = set(), []
+        for index, item in accepted:
+            key = (item['content_id'], item['interaction_type'])
+            interaction, created = upserted[key]
+            created = created and key not in seen
+            seen.add(key)
+            if created:
+                created_keys.append(key)
+                if item['interaction_type'] == 'like':
+                    likes[key[0]] = 1
+            if item['interaction_type'] == 'view':
+                views[key[0]] = views.get(key[0], 0) + 1
+            results[index] = {
+                'index': index,
+                'status': 'created' if created else 'updated',
+                'interaction': interaction.to_dict()
+            }
+        ContentCounter.add_many('view', views)
+        ContentCounter.add_many('like', likes)
+        db.session.commit()
+        
+        for content_id, interaction_type in created_keys:
+            notify_interaction(current_user_id, content_id, interaction_type, added=True)
+        
+        return {
+            'success': True,
+            'results': results,
+            'created': sum(1 for result in results if result['status'] == 'created'),
+            'updated': sum(1 for result in results if result['status'] == 'updated'),
+            'errors': sum(1 for result in results if result['status'] == 'error')
+        }, 200
+        
+    except ValueError as e:
+        db.session.rollback()
+        return {'error': str(e)}, 400
+    except Exception as e:
+        db.session.rollback()
+        return {'error': f'Erreur serveur: {str(e)}'}, 500
+
 @interaction_bp.route('/<int:interaction_id>', methods=['DELETE'])
 @jwt_required()
 def delete_interaction(interaction_id):
@@ -86,6 +201,7 @@ def delete_interaction(interaction_id):
         
         # Supprimer l'interaction
         db.session.delete(interaction)
+        InteractionEvent.append(current_user_id, content_id, interaction_type, added=False)
         
         # Mettre à jour les compteurs du contenu
         content = Content.query.get(content_id)
@@ -94,6 +210,7 @@ def delete_interaction(interaction_id):
                 content.decrement_like_count()
         
         db.session.commit()
+        notify_interaction(current_user_id, content_id, interaction_type, added=False)
         
         return {
             'success': True,
@@ -136,6 +253,7 @@ def toggle_interaction():
         if existing:
             # Supprimer l'interaction existante
             db.session.delete(existing)
+            InteractionEvent.append(current_user_id, content_id, interaction_type, added=False)
             if interaction_type == 'like':
                 content.decrement_like_count()
             action = 'removed'
@@ -147,11 +265,13 @@ def toggle_interaction():
                 interaction_type=interaction_type
             )
             db.session.add(interaction)
+            InteractionEvent.append(current_user_id, content_id, interaction_type)
             if interaction_type == 'like':
                 content.increment_like_count()
             action = 'added'
         
         db.session.commit()
+        notify_interaction(current_user_id, content_id, interaction_type, added=(action == 'added'))
         
         # Tracker l'interaction dans Kafka (seulement si ajoutée)
         if action == 'added':
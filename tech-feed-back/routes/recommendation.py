@@ -1,12 +1,25 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User
 from models.content import Content
 from models.interaction import Interaction
+from models.refresh_job import RefreshJob
 from recommendations.engine import RecommendationEngine
+from recommendations.refresh import enqueue_refresh
 
 recommendation_bp = Blueprint('recommendation', __name__)
 
+def get_budget_ms():
+    """
+    Budget de temps de la requête : RECOMMENDATION_BUDGET_MS, que le paramètre
+    budget_ms peut seulement réduire (0 ou négatif = budget configuré)
+    """
+    configured = max(current_app.config.get('RECOMMENDATION_BUDGET_MS', 0), 0)
+    requested = request.args.get('budget_ms', 0, type=int) or 0
+    if requested > 0 and (not configured or requested < configured):
+        return requested
+    return configured or None
+
 @recommendation_bp.route('/for-you', methods=['GET'])
 @jwt_required()
 def get_personalized_recommendations():
@@ -20,21 +33,32 @@ def get_personalized_recommendations():
         
         limit = request.args.get('limit', 10, type=int)
         limit = min(limit, 50)
+        cursor = request.args.get('cursor')
         
-        # Utiliser le moteur de recommandations
-        engine = RecommendationEngine()
-        recommendations = engine.get_personalized_recommendations(
+        # Utiliser le moteur de recommandations (pages suivantes lues dans le classement figé)
+        engine = RecommendationEngine(budget_ms=get_budget_ms())
+        page = engine.get_personalized_page(
             user_id=current_user_id,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
+        if page is None:
+            return {'error': 'Curseur expiré'}, 410
+        recommendations, next_cursor = page
         
         return {
             'success': True,
             'user_id': current_user_id,
             'recommendations': [rec.to_dict() for rec in recommendations],
-            'algorithm': 'content-based + collaborative'
+            'next_cursor': next_cursor,
+            'algorithm': 'content-based + collaborative + trending',
+            'source': engine.last_source,
+            'pipeline': engine.last_pipeline,
+            'degraded': engine.degraded
         }, 200
         
+    except ValueError as e:
+        return {'error': str(e)}, 400
     except Exception as e:
         return {'error': f'Erreur serveur: {str(e)}'}, 500
 
@@ -49,7 +73,7 @@ def get_similar_content_recommendations(content_id):
         limit = request.args.get('limit', 5, type=int)
         limit = min(limit, 20)
         
-        engine = RecommendationEngine()
+        engine = RecommendationEngine(budget_ms=get_budget_ms())
         similar_contents = engine.get_similar_content_recommendations(
             content_id=content_id,
             limit=limit
@@ -59,7 +83,8 @@ def get_similar_content_recommendations(content_id):
             'success': True,
             'base_content_id': content_id,
             'similar_contents': [content.to_dict() for content in similar_contents],
-            'algorithm': 'content-similarity'
+            'algorithm': 'co-visitation + content-similarity',
+            'degraded': engine.degraded
         }, 200
         
     except Exception as e:
@@ -162,7 +187,7 @@ def get_user_recommendations(user_id):
         limit = request.args.get('limit', 10, type=int)
         limit = min(limit, 50)
         
-        engine = RecommendationEngine()
+        engine = RecommendationEngine(budget_ms=get_budget_ms())
         recommendations = engine.get_personalized_recommendations(
             user_id=user_id,
             limit=limit
@@ -171,7 +196,9 @@ def get_user_recommendations(user_id):
         return {
             'success': True,
             'target_user_id': user_id,
-            'recommendations': [rec.to_dict() for rec in recommendations]
+            'recommendations': [rec.to_dict() for rec in recommendations],
+            'source': engine.last_source,
+            'degraded': engine.degraded
         }, 200
         
     except Exception as e:
@@ -180,7 +207,7 @@ def get_user_recommendations(user_id):
 @recommendation_bp.route('/refresh', methods=['POST'])
 @jwt_required()
 def refresh_user_recommendations():
-    """Force le rafraîchissement des recommandations utilisateur"""
+    """Planifie le rafraîchissement des recommandations utilisateur (job asynchrone)"""
     try:
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
@@ -188,44 +215,44 @@ def refresh_user_recommendations():
         if not user:
             return {'error': 'Utilisateur non trouvé'}, 404
         
-        engine = RecommendationEngine()
-        
-        # Analyser les préférences récentes basées sur les interactions
-        recent_preferences = Interaction.get_user_preferences_from_interactions(
-            user_id=current_user_id,
-            limit_days=30
-        )
-        
-        # Mettre à jour les préférences si nécessaire
-        if recent_preferences['categories']:
-            # Combiner les préférences explicites et implicites
-            explicit_prefs = user.get_preferences()
-            implicit_prefs = recent_preferences['categories']
-            
-            # Merge intelligemment (garder les préférences explicites et ajouter les nouvelles implicites)
-            updated_prefs = list(set(explicit_prefs + implicit_prefs[:3]))  # Top 3 nouvelles
-            
-            if updated_prefs != explicit_prefs:
-                user.set_preferences(updated_prefs)
-                from database import db
-                db.session.commit()
-        
-        # Générer de nouvelles recommandations
-        recommendations = engine.get_personalized_recommendations(
-            user_id=current_user_id,
-            limit=20
-        )
+        # Les demandes répétées sont rattachées au job en cours ou récent
+        job, created = enqueue_refresh(current_user_id)
         
         return {
             'success': True,
-            'message': 'Recommandations rafraîchies',
-            'updated_preferences': user.get_preferences(),
-            'recommendations': [rec.to_dict() for rec in recommendations],
-            'analysis': {
-                'recent_categories': recent_preferences['categories'],
-                'recent_tags': recent_preferences['tags']
-            }
-        }, 200
+            'message': 'Rafraîchissement planifié' if created else 'Rafraîchissement déjà planifié',
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f'/api/recommendation/refresh/{job.id}'
+        }, 202
+        
+    except Exception as e:
+        return {'error': f'Erreur serveur: {str(e)}'}, 500
+
+@recommendation_bp.route('/refresh/<job_id>', methods=['GET'])
+@jwt_required()
+def get_refresh_status(job_id):
+    """Récupère l'état d'un rafraîchissement (et son résultat une fois terminé)"""
+    try:
+        current_user_id = get_jwt_identity()
+        job = RefreshJob.query.get(job_id)
+        
+        if not job or job.user_id != current_user_id:
+            return {'error': 'Job non trouvé'}, 404
+        
+        response = {'success': True, 'job': job.to_dict()}
+        
+        result = job.get_result()
+        if job.status == 'done' and result:
+            engine = RecommendationEngine()
+            recommendations = engine.load_contents(result['recommendation_ids'])
+            response.update({
+                'updated_preferences': result['updated_preferences'],
+                'recommendations': [rec.to_dict() for rec in recommendations],
+                'analysis': result['analysis']
+            })
+        
+        return response, 200
         
     except Exception as e:
         return {'error': f'Erreur serveur: {str(e)}'}, 500
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('KAFKA_ENABLED', 'false')
+
+from app import create_app
+from database import db as _db
+
+
+@pytest.fixture
+def app():
+    """Application de test (SQLite en mémoire, données initiales créées)"""
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        _db.session.remove()
+
+
+@pytest.fixture
+def db(app):
+    return _db
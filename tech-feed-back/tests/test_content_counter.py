@@ -0,0 +1,47 @@
+from models.content import Content
+from models.content_counter import ContentCounter
+
+
+def pending(content_id):
+    return ContentCounter.get_pending([content_id])[content_id]
+
+
+def test_fold_moves_increments_to_content(db):
+    content = Content.query.first()
+    views, likes = content.view_count or 0, content.like_count or 0
+    ContentCounter.add_many('view', {content.id: 5})
+    ContentCounter.add_many('like', {content.id: 2})
+    db.session.commit()
+
+    assert ContentCounter.fold() == 1
+    db.session.refresh(content)
+    assert (content.view_count, content.like_count) == (views + 5, likes + 2)
+    assert pending(content.id) == {'view': 0, 'like': 0}
+
+
+def test_fold_keeps_increments_written_during_the_fold(db, monkeypatch):
+    content = Content.query.first()
+    views = content.view_count or 0
+    ContentCounter.add_many('view', {content.id: 4})
+    db.session.commit()
+
+    add_counts = Content.add_counts
+
+    def add_counts_then_write(deltas, now=None):
+        updated = add_counts(deltas, now)
+        # Vue écrite entre la lecture des shards et leur décrément
+        ContentCounter.add_many('view', {content.id: 3})
+        return updated
+
+    monkeypatch.setattr(Content, 'add_counts', staticmethod(add_counts_then_write))
+    ContentCounter.fold()
+    monkeypatch.undo()
+
+    db.session.refresh(content)
+    assert content.view_count == views + 4
+    assert pending(content.id)['view'] == 3
+
+    ContentCounter.fold()
+    db.session.refresh(content)
+    assert content.view_count == views + 7
+    assert pending(content.id)['view'] == 0
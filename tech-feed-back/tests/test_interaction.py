@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from models.content import Content
+from models.interaction import Interaction
+from models.interaction_event import interaction_events
+from models.user import User
+
+
+def test_upsert_many_reports_created_rows(db):
+    user = User.query.filter_by(email='user@example.com').first()
+    first, second = [content.id for content in Content.query.order_by(Content.id).limit(2)]
+    now = datetime.utcnow()
+
+    results = Interaction.upsert_many(user.id, [
+        {'content_id': first, 'interaction_type': 'like'},
+        {'content_id': second, 'interaction_type': 'view', 'duration': 30},
+        {'content_id': second, 'interaction_type': 'view', 'duration': 45},
+    ], now=now)
+    db.session.commit()
+
+    assert {key: created for key, (interaction, created) in results.items()} == {
+        (first, 'like'): True, (second, 'view'): True
+    }
+    assert results[(second, 'view')][0].duration == 45
+
+    # Même horodatage : la ligne existante n'est pas reportée comme créée
+    results = Interaction.upsert_many(user.id, [{'content_id': first, 'interaction_type': 'like'}], now=now)
+    db.session.commit()
+    assert results[(first, 'like')][1] is False
+
+    later = now + timedelta(seconds=5)
+    results = Interaction.upsert_many(user.id, [
+        {'content_id': first, 'interaction_type': 'like'},
+        {'content_id': second, 'interaction_type': 'view', 'duration': 60},
+        {'content_id': second, 'interaction_type': 'share'},
+    ], now=later)
+    db.session.commit()
+
+    assert {key: created for key, (interaction, created) in results.items()} == {
+        (first, 'like'): False, (second, 'view'): False, (second, 'share'): True
+    }
+    view = results[(second, 'view')][0]
+    assert (view.created_at, view.updated_at, view.duration) == (now, later, 60)
+    assert results[(first, 'like')][0].updated_at == now
+
+    # Un évènement du journal par item, doublons compris
+    events = db.session.execute(
+        db.select(db.func.count()).select_from(interaction_events).where(interaction_events.c.user_id == user.id)
+    ).scalar()
+    assert events == 7
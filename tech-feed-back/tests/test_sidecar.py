@@ -0,0 +1,36 @@
+from models.content import Content
+from models.interaction import Interaction
+from models.user import User
+from models.user_profile import UserProfile
+from recommendations import events
+from recommendations.events import notify_interaction, on_interaction
+from recommendations.sidecar import INTERACTION_TYPES, OP_INTERACTION, SidecarServer
+
+
+def test_forwarded_interaction_updates_profile_once(app, db, tmp_path, monkeypatch):
+    monkeypatch.setattr(events, '_interaction_listeners', list(events._interaction_listeners))
+    monkeypatch.setattr(events, '_memory_listeners', set(events._memory_listeners))
+    replayed = []
+    on_interaction(lambda *args: replayed.append(args), memory=True)
+
+    user = User.query.filter_by(email='user@example.com').first()
+    content = Content.query.order_by(Content.id).first()
+    UserProfile.build_many([user.id])
+    db.session.commit()
+    before = db.session.get(UserProfile, user.id).interaction_count
+
+    # Écriture dans le worker, puis transmission au processus recommandeur
+    Interaction.upsert_many(user.id, [{'content_id': content.id, 'interaction_type': 'like'}])
+    db.session.commit()
+    notify_interaction(user.id, content.id, 'like')
+
+    server = SidecarServer(app, str(tmp_path / 'sidecar.sock'))
+    try:
+        server.dispatch(OP_INTERACTION, (user.id, content.id, INTERACTION_TYPES.index('like'), 1))
+    finally:
+        server.server_close()
+
+    db.session.expire_all()
+    assert db.session.get(UserProfile, user.id).interaction_count == before + 1
+    # Les listeners en mémoire sont rejoués par le processus recommandeur
+    assert replayed == [(user.id, content.id, 'like', True)] * 2
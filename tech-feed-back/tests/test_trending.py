@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from models.content import Content
+from models.user import User
+from recommendations.trending import TrendingCounters
+from view_buffer import write_views
+
+
+def at(bucket):
+    """Date UTC naïve au début du seau horaire `bucket`"""
+    return datetime(1970, 1, 1) + timedelta(hours=bucket)
+
+
+def test_window_totals_slide_with_buckets():
+    counters = TrendingCounters(max_days=3)
+    now = counters._current
+    counters.add(1, 'like', at=at(now))
+    counters.add(2, 'share', at=at(now - 30))
+
+    assert counters.top(days=1) == [(1, 3)]
+    assert counters.top(days=2) == [(2, 4), (1, 3)]
+
+    # Un jour plus tard : le like sort de la fenêtre d'un jour, le partage de celle de deux
+    counters._advance(now + 24)
+    assert counters.top(days=1) == []
+    assert counters.top(days=2) == [(1, 3)]
+    assert counters.top(days=3) == [(2, 4), (1, 3)]
+
+    # Au-delà de max_days, les seaux sont supprimés
+    counters._advance(now + 24 * 3 + 30)
+    assert counters.top(days=3) == []
+    assert counters._buckets == {}
+
+
+def test_add_outside_largest_window_is_ignored():
+    counters = TrendingCounters(max_days=2)
+    counters.add(1, 'like', at=at(counters._current - 48))
+    assert counters.top(days=2) == []
+    assert counters._buckets == {}
+
+
+def test_remove_takes_weight_from_latest_bucket():
+    counters = TrendingCounters(max_days=3)
+    now = counters._current
+    counters.add(1, 'like', at=at(now - 30))
+    counters.add(1, 'like', at=at(now))
+
+    counters.remove(1, 'like')
+    assert counters.top(days=1) == []
+    assert counters.top(days=2) == [(1, 3)]
+
+    counters.remove(1, 'like')
+    assert counters.top(days=3) == []
+
+    # Retrait sans ajout correspondant : aucun effet
+    counters.remove(1, 'like')
+    counters.remove(99, 'like')
+    assert counters.top(days=3) == []
+
+
+def test_repeated_views_count_once_per_user(db):
+    user, other = User.query.order_by(User.id).limit(2)
+    content = Content.query.order_by(Content.id).first()
+    write_views({content.id: 2}, {(user.id, content.id): 2})
+
+    counters = TrendingCounters(max_days=3, sync_interval=0)
+    counters.build()
+    assert dict(counters.top(days=1)).get(content.id) == 1
+
+    # Vue répétée : pas de nouvelle ligne ; vue d'un autre utilisateur : comptée
+    write_views({content.id: 2}, {(user.id, content.id): 1, (other.id, content.id): 1})
+    counters.sync()
+    assert dict(counters.top(days=1)).get(content.id) == 2
@@ -0,0 +1,17 @@
+from recommendations import catalog
+from recommendations.catalog import ContentCatalog
+from recommendations.warmup import models_ready, warm_up_steps
+
+
+def test_models_ready_waits_for_first_catalog_refresh(app, monkeypatch):
+    for name, build in warm_up_steps():
+        build()
+    assert models_ready()
+
+    # Catalogue publié mais pas encore rafraîchi : la requête doit servir le repli
+    pending = ContentCatalog()
+    monkeypatch.setattr(catalog, 'content_catalog', pending)
+    assert not models_ready()
+
+    pending.refresh()
+    assert models_ready()
@@ -0,0 +1,205 @@
+"""
+Écriture différée des vues de contenus
+Chaque lecture de contenu incrémentait view_count et enregistrait
+l'interaction 'view' par deux commits dans la requête. Les vues sont
+désormais accumulées en mémoire (ou dans le processus recommandeur partagé
+quand RECOMMENDER_SOCKET est configurée) et écrites toutes les
+VIEW_FLUSH_INTERVAL_MS millisecondes : un ajout groupé aux compteurs
+répartis (content_counters), un INSERT … ON CONFLICT DO NOTHING des
+interactions de vue et l'ajout de chaque vue au journal interaction_events.
+
+Pertes bornées : un arrêt brutal perd au plus les vues d'un intervalle ;
+l'écriture est avancée dès que le tampon est à moitié plein, et au-delà de
+VIEW_BUFFER_MAX couples (utilisateur, contenu) en attente, les nouvelles
+interactions de vue sont abandonnées (les compteurs restent comptés). Le
+tampon est vidé à l'arrêt du processus.
+"""
+
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from database import db
+from recommendations.events import notify_interaction
+
+logger = logging.getLogger(__name__)
+
+
+def write_views(counts, viewers):
+    """
+    Écrit des vues accumulées : {content_id: vues} et {(user_id, content_id): vues}
+    Chaque vue d'un utilisateur est ajoutée au journal interaction_events ;
+    retourne le nombre d'interactions de vue créées
+    """
+    from models.content import Content
+    from models.content_counter import ContentCounter
+    from models.interaction import Interaction
+    from models.interaction_event import InteractionEvent
+    from models.user import User
+
+    now = datetime.utcnow()
+    # Contenus ou utilisateurs supprimés depuis la vue : vue ignorée
+    content_ids = {content_id for (content_id,) in db.session.query(Content.id).filter(
+        Content.id.in_(counts.keys())
+    )}
+    ContentCounter.add_many('view', {content_id: views for content_id, views in counts.items()
+                                     if content_id in content_ids})
+
+    pairs = [(user_id, content_id) for user_id, content_id in viewers if content_id in content_ids]
+    if pairs:
+        user_ids = {user_id for (user_id,) in db.session.query(User.id).filter(
+            User.id.in_({user_id for user_id, _ in pairs})
+        )}
+        pairs = [pair for pair in pairs if pair[0] in user_ids]
+    inserted = Interaction.insert_views(pairs, now)
+    InteractionEvent.append_many([
+        InteractionEvent.event(user_id, content_id, 'view', at=now)
+        for user_id, content_id in pairs for _ in range(viewers[(user_id, content_id)])
+    ])
+    db.session.commit()
+
+    for user_id, content_id in inserted:
+        notify_interaction(user_id, content_id, 'view', added=True)
+    return len(inserted)
+
+
+class ViewBuffer:
+    """
+    Tampon des vues d'un processus, écrit par un thread de fond toutes les
+    `interval_ms` millisecondes (ou dès que la moitié de `max_pending` est
+    atteinte). Un lot en échec est remis dans le tampon pour l'écriture
+    suivante, dans la limite de `max_pending` couples.
+    """
+
+    def __init__(self, app, interval_ms=1000, max_pending=10000):
+        self.app = app
+        self.interval = interval_ms / 1000
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counts = {}       # content_id -> vues en attente
+        self._viewers = {}      # (user_id, content_id) -> vues en attente
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='view-buffer', daemon=True)
+        self.dropped = 0
+
+    def start(self):
+        self._thread.start()
+
+    def add(self, content_id, user_id=None):
+        """Compte une vue (et l'interaction de vue si l'utilisateur est connu)"""
+        with self._lock:
+            self._counts[content_id] = self._counts.get(content_id, 0) + 1
+            if user_id:
+                pair = (int(user_id), content_id)
+                if pair in self._viewers or len(self._viewers) < self.max_pending:
+                    self._viewers[pair] = self._viewers.get(pair, 0) + 1
+                else:
+                    self.dropped += 1
+            pending = len(self._viewers)
+        if pending * 2 >= self.max_pending:
+            self._wakeup.set()
+
+    def pending_views(self, content_ids):
+        """Vues pas encore écrites {content_id: vues} de plusieurs contenus"""
+        with self._lock:
+            return {content_id: self._counts.get(content_id, 0) for content_id in content_ids}
+
+    def _restore(self, counts, viewers):
+        """Remet un lot en échec dans le tampon"""
+        with self._lock:
+            for content_id, views in counts.items():
+                self._counts[content_id] = self._counts.get(content_id, 0) + views
+            for pair, views in viewers.items():
+                if pair in self._viewers or len(self._viewers) < self.max_pending:
+                    self._viewers[pair] = self._viewers.get(pair, 0) + views
+                else:
+                    self.dropped += views
+
+    def flush(self):
+        """Écrit les vues en attente ; retourne le nombre de vues écrites"""
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, {}
+                viewers, self._viewers = self._viewers, {}
+            if not counts:
+                return 0
+
+            with self.app.app_context():
+                try:
+                    write_views(counts, viewers)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"Erreur écriture des vues ({sum(counts.values())} en attente): {e}")
+                    self._restore(counts, viewers)
+                    return 0
+                finally:
+                    db.session.remove()
+            return sum(counts.values())
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if not self._stopped:
+                self.flush()
+
+    def stop(self):
+        """Arrête le thread d'écriture et vide le tampon"""
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+        if self.dropped:
+            logger.warning(f"{self.dropped} interactions de vue abandonnées (tampon plein)")
+
+
+# Instance globale du tampon (une par processus, None = écriture immédiate)
+view_buffer = None
+
+def init_view_buffer(app):
+    """Démarre le tampon des vues si VIEW_FLUSH_INTERVAL_MS est non nul"""
+    global view_buffer
+    interval_ms = app.config.get('VIEW_FLUSH_INTERVAL_MS', 1000)
+    if not interval_ms or view_buffer is not None:
+        return
+    view_buffer = ViewBuffer(app, interval_ms, app.config.get('VIEW_BUFFER_MAX', 10000))
+    view_buffer.start()
+    atexit.register(view_buffer.stop)
+
+
+def buffer_view(content_id, user_id=None):
+    """Enregistre une vue dans le tampon de ce processus (ou l'écrit immédiatement)"""
+    if view_buffer is not None:
+        view_buffer.add(content_id, user_id)
+        return
+    write_views({content_id: 1}, {(int(user_id), content_id): 1} if user_id else {})
+
+
+def pending_views(content_ids):
+    """Vues de ce processus pas encore écrites {content_id: vues}"""
+    if view_buffer is None:
+        return {content_id: 0 for content_id in content_ids}
+    return view_buffer.pending_views(content_ids)
+
+
+def record_view(content_id, user_id=None):
+    """
+    Enregistre la vue d'un contenu, par un utilisateur connecté ou non
+    Avec un processus recommandeur configuré, la vue lui est transmise pour
+    être accumulée une seule fois par hôte ; s'il ne répond pas, elle est
+    gardée dans le tampon local.
+    """
+    from recommendations.sidecar import OP_VIEW, SidecarUnavailable, get_sidecar_client
+
+    client = get_sidecar_client()
+    if client is not None:
+        try:
+            client.call(OP_VIEW, content_id, int(user_id or 0))
+            return
+        except SidecarUnavailable as e:
+            logger.info(f"Vue gardée localement: {e}")
+    buffer_view(content_id, user_id)